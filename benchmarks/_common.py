@@ -0,0 +1,32 @@
+"""Utilitaires communs aux benchmarks (copie des bases, chronométrage)."""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+DATA_DIR = os.path.join(ROOT_DIR, 'data')
+
+
+def copy_data_dir() -> str:
+    """
+    Copie les bases de data/ dans un dossier temporaire.
+    Les benchmarks travaillent sur la copie pour ne jamais modifier les bases versionnées.
+    """
+    tmp = tempfile.mkdtemp(prefix="bench_data_")
+    for name in os.listdir(DATA_DIR):
+        if name.endswith('.db') or name.endswith('.json'):
+            shutil.copy(os.path.join(DATA_DIR, name), os.path.join(tmp, name))
+    return tmp
+
+
+def rate(fn, n: int) -> float:
+    """Exécute fn() n fois et retourne le nombre d'appels par seconde."""
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
@@ -0,0 +1,157 @@
+"""
+Benchmark des rapports de scripts/tools.py : agrégats SQL (GROUP BY à chaque appel)
+vs instantané en colonnes NumPy (core.analytics, chargé une fois).
+
+Génère des tables de vols et d'hôtels dans un dossier temporaire, vérifie que
+les deux versions renvoient les mêmes résultats, puis mesure chaque rapport.
+
+    python -m benchmarks.bench_analytics [--sizes 10000 1000000 10000000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.bench_flight_search import build_db as build_flights_db
+from benchmarks.bench_hotel_search import AMENITIES, BASE_CITIES
+from core.analytics import flights_snapshot, hotels_snapshot
+from core.cities import amenity_key, city_key
+from core.db import get_pool
+from core.schema import HOTELS_DDL, amenity_filter, hotel_key_sets
+
+SQL_REPORTS = {
+    "top 3 destinations": (
+        "flights",
+        "SELECT destination, MIN(price) AS min_price, airline FROM flights "
+        "GROUP BY destination ORDER BY min_price ASC LIMIT 3", ()),
+    "top 5 compagnies": (
+        "flights",
+        "SELECT airline, ROUND(AVG(price), 2) AS avg_price FROM flights "
+        "GROUP BY airline ORDER BY avg_price ASC LIMIT 5", ()),
+    "confort (3+ services)": (
+        "hotels",
+        "SELECT name, price, amenities FROM hotels WHERE LOWER(city) = LOWER(?) "
+        "AND (LENGTH(amenities) - LENGTH(REPLACE(amenities, ',', '')) + 1) >= ? ORDER BY price ASC, id",
+        ("Tokyo", 3)),
+    "services d'une ville": (
+        "hotels", "SELECT amenities FROM hotels WHERE LOWER(city) = LOWER(?)", ("Tokyo",)),
+}
+
+
+def build_hotels_db(path: str, rows: int, n_cities: int, seed: int = 42):
+    """Table hotels avec city_key / amenity_mask déjà calculés (sans R*Tree : inutile ici)."""
+    rng = random.Random(seed)
+    cities = BASE_CITIES + [f"City{i:03d}" for i in range(n_cities - len(BASE_CITIES))]
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("""
+        CREATE TABLE hotels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, city TEXT, name TEXT, price REAL, amenities TEXT,
+            available_start DATE, available_end DATE, city_key TEXT, amenity_mask INTEGER
+        )
+    """)
+    for ddl in HOTELS_DDL:
+        conn.execute(ddl)
+    conn.executemany("INSERT INTO hotel_amenity_bits (bit, key, label) VALUES (?, ?, ?)",
+                     [(bit, amenity_key(a), a) for bit, a in enumerate(AMENITIES)])
+    conn.executemany("INSERT INTO hotel_cities (key) VALUES (?)", [(city_key(c),) for c in cities])
+    bits = {a: 1 << bit for bit, a in enumerate(AMENITIES)}
+
+    def gen():
+        for i in range(rows):
+            city = rng.choice(cities)
+            start = date(2026, 1, 1) + timedelta(days=rng.randint(0, 300))
+            chosen = rng.sample(AMENITIES, k=rng.randint(2, 4))
+            yield (city, f"{city} Hotel {i}", rng.randint(60, 500), ", ".join(chosen),
+                   start.isoformat(), (start + timedelta(days=rng.randint(5, 30))).isoformat(),
+                   city_key(city), sum(bits[a] for a in chosen))
+
+    conn.executemany(
+        "INSERT INTO hotels (city, name, price, amenities, available_start, available_end, city_key, amenity_mask)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        gen(),
+    )
+    conn.commit()
+    conn.close()
+
+
+def sql_amenities(pool, city):
+    services = set()
+    for (amenities,) in pool.fetchall(SQL_REPORTS["services d'une ville"][1], (city,)):
+        services.update(s.strip() for s in amenities.split(","))
+    return services
+
+
+def sql_with_amenities(pool, city: str, requested: str, best: bool = False):
+    sql, params = amenity_filter(hotel_key_sets(pool)[1], requested)
+    if best:
+        return pool.fetchall("SELECT h.name, h.city, h.price, h.amenities FROM hotels h WHERE 1 = 1"
+                             + sql + " ORDER BY h.price ASC, h.id LIMIT 1", params)
+    return pool.fetchall("SELECT h.name, h.price, h.amenities FROM hotels h WHERE h.city_key = ?"
+                         + sql + " ORDER BY h.price ASC, h.id", [city_key(city)] + params)
+
+
+def timed_ms(fn, repeat: int):
+    result = fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return result, (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_analytics_")
+    print(f"{'lignes':>10}  {'rapport':<24}{'SQL (ms)':>10}{'NumPy (ms)':>12}{'gain':>8}  résultats")
+    for size in args.sizes:
+        paths = {"flights": os.path.join(tmp, f"flights_{size}.db"), "hotels": os.path.join(tmp, f"hotels_{size}.db")}
+        build_flights_db(paths["flights"], size, args.cities)
+        build_hotels_db(paths["hotels"], size, args.cities)
+        pools = {kind: get_pool(path) for kind, path in paths.items()}
+
+        start = time.perf_counter()
+        flights = flights_snapshot(pools["flights"])
+        flights_load = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        hotels = hotels_snapshot(pools["hotels"])
+        hotels_load = (time.perf_counter() - start) * 1000
+
+        numpy_reports = {
+            "top 3 destinations": lambda: flights_snapshot(pools["flights"]).cheapest_destinations(3),
+            "top 5 compagnies": lambda: flights_snapshot(pools["flights"]).cheapest_airlines(5),
+            "confort (3+ services)": lambda: hotels_snapshot(pools["hotels"]).by_comfort("Tokyo", 3),
+            "services d'une ville": lambda: hotels_snapshot(pools["hotels"]).amenities_in("Tokyo"),
+            "meilleur rapport": lambda: hotels_snapshot(pools["hotels"]).cheapest_with_amenities("Spa, Piscine"),
+            "multi-services": lambda: hotels_snapshot(pools["hotels"]).with_amenities("Tokyo", "WiFi, Spa"),
+        }
+        sql_reports = {name: (lambda kind=kind, q=q, p=p: pools[kind].fetchall(q, p))
+                       for name, (kind, q, p) in SQL_REPORTS.items()}
+        sql_reports["services d'une ville"] = lambda: sql_amenities(pools["hotels"], "Tokyo")
+        sql_reports["meilleur rapport"] = lambda: sql_with_amenities(pools["hotels"], "", "Spa, Piscine", best=True)
+        sql_reports["multi-services"] = lambda: sql_with_amenities(pools["hotels"], "Tokyo", "WiFi, Spa")
+
+        for name, numpy_fn in numpy_reports.items():
+            expected, sql_ms = timed_ms(sql_reports[name], args.repeat)
+            got, numpy_ms = timed_ms(numpy_fn, args.repeat)
+            same = "identiques" if [tuple(r) for r in expected] == [tuple(r) for r in got] \
+                or expected == got else "DIFFÉRENTS"
+            print(f"{size:>10}  {name:<24}{sql_ms:>10.2f}{numpy_ms:>12.2f}{sql_ms / numpy_ms:>7.0f}x  {same}")
+        print(f"{size:>10}  {'chargement instantanés':<24}{'':>10}{flights_load + hotels_load:>12.0f}"
+              f"  (vols {flights_load:.0f} ms, hôtels {hotels_load:.0f} ms, "
+              f"{(flights.destination.nbytes + flights.airline.nbytes + flights.price.nbytes) / 1e6:.0f} + "
+              f"{sum(a.nbytes for a in (hotels.id, hotels.city, hotels.price, hotels.mask, hotels.amenity_count)) / 1e6:.0f} Mo)")
+        for path in paths.values():
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
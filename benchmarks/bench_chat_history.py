@@ -0,0 +1,133 @@
+"""
+Benchmark de la taille des prompts sur une longue conversation de raffinement (50 tours),
+modèle simulé (benchmarks.fake_llm) qui mesure ce qu'on lui envoie :
+
+- session ADK persistante : refine_supervisor sur une seule session gardée d'un tour à
+  l'autre (tous les événements, transferts et sorties d'outils restent dans l'historique)
+- /chat_refine, historique borné : session ADK jetable à chaque tour, échanges précédents
+  résumés par core.conversation (CHAT_HISTORY_TOKENS / CHAT_HISTORY_TURNS)
+- /chat_refine sans historique : CHAT_HISTORY_TOKENS=0 (référence)
+
+Par tour : plus gros historique envoyé au modèle pendant le tour (caractères, et tokens
+estimés à 4 caractères par token). Le filtre sur la session (REFINE_CACHE) est coupé :
+chaque tour passe par un agent.
+
+    python -m benchmarks.bench_chat_history [--turns 50] [--latency-ms 0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks._common import copy_data_dir
+
+os.environ["TRAVEL_DATA_DIR"] = copy_data_dir()
+os.environ.setdefault("LOG_LEVEL", "off")
+os.environ.setdefault("RESPONSE_CACHE", "0")
+os.environ["REFINE_CACHE"] = "0"
+
+import httpx  # noqa: E402
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai.types import Content, Part  # noqa: E402
+
+import core.conversation  # noqa: E402
+import main  # noqa: E402
+from benchmarks.fake_llm import fake_llms, install_fake_llm  # noqa: E402
+from core.metrics import STAGE_SECONDS, reset_metrics  # noqa: E402
+
+ORIGIN, DESTINATION = "Paris", "New York"
+MESSAGES = [
+    "un hôtel avec spa", "un restaurant japonais", "un vol moins cher", "un musée",
+    "un hôtel avec piscine", "un restaurant vegan", "un vol le soir", "des activités pour enfants",
+    "un hôtel avec salle de sport", "un bar à cocktails",
+]
+REPORTED_TURNS = (1, 2, 5, 10, 20, 30, 40, 50)
+
+
+def turn_start():
+    for llm in fake_llms():
+        llm.max_prompt_chars = 0
+
+
+def turn_max_chars() -> int:
+    return max((llm.max_prompt_chars for llm in fake_llms()), default=0)
+
+
+def chat_prompt(message: str) -> str:
+    """Prompt de /chat_refine avant l'historique borné (routage par refine_supervisor)."""
+    return (f"CONTEXTE : Voyage de {ORIGIN} vers {DESTINATION}. Aucune date précise n'est fixée. "
+            f"DEMANDE DE RAFFINEMENT : \"{message}\". "
+            f"Si c'est une demande d'hôtel ou de vol, utilise la date ci-dessus si pertinente. "
+            f"Transfère au bon agent spécialisé.")
+
+
+async def persistent_session(turns: int) -> list:
+    from test_agent.agent import refine_supervisor
+
+    service = InMemorySessionService()
+    await service.create_session(app_name="bench", user_id="bench", session_id="chat")
+    runner = Runner(agent=refine_supervisor, app_name="bench", session_service=service)
+    sizes = []
+    for turn in range(turns):
+        turn_start()
+        message = Content(role="user", parts=[Part(text=chat_prompt(MESSAGES[turn % len(MESSAGES)]))])
+        async for _ in runner.run_async(user_id="bench", session_id="chat", new_message=message):
+            pass
+        sizes.append(turn_max_chars())
+    return sizes
+
+
+async def chat_refine(client: httpx.AsyncClient, turns: int, budget: int) -> tuple:
+    """(tailles par tour, durée moyenne de l'étape chat.history en µs)."""
+    core.conversation.CHAT_HISTORY_TOKENS = budget
+    async with client.stream("GET", "/stream_search", params={"origin": ORIGIN, "destination": DESTINATION}) as resp:
+        session_id = None
+        async for line in resp.aiter_lines():
+            if line.startswith("data: ") and json.loads(line[6:]).get("type") == "complete":
+                session_id = json.loads(line[6:])["session_id"]
+    reset_metrics()
+    sizes = []
+    for turn in range(turns):
+        turn_start()
+        async with client.stream("GET", "/chat_refine", params={
+                "message": MESSAGES[turn % len(MESSAGES)], "origin": ORIGIN, "destination": DESTINATION,
+                "session_id": session_id}) as resp:
+            async for _ in resp.aiter_lines():
+                pass
+        sizes.append(turn_max_chars())
+    stage = STAGE_SECONDS.snapshot().get("chat.history", {"sum": 0.0, "count": 0})
+    return sizes, stage["sum"] / max(stage["count"], 1) * 1e6
+
+
+async def main_async(args):
+    install_fake_llm(latency_ms=args.latency_ms, jitter_ms=0)
+    start = time.perf_counter()
+    results = {"session ADK persistante": await persistent_session(args.turns)}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        bounded, history_us = await chat_refine(client, args.turns, core.conversation.CHAT_HISTORY_TOKENS)
+        results[f"historique borné ({core.conversation.CHAT_HISTORY_TOKENS} tokens)"] = bounded
+        results["sans historique"], _ = await chat_refine(client, args.turns, 0)
+
+    turns = [t for t in REPORTED_TURNS if t <= args.turns]
+    print(f"{args.turns} tours de raffinement, plus gros historique envoyé au modèle par tour "
+          f"(caractères / ~tokens)\n")
+    print(f"{'tour':<32}" + "".join(f"{t:>15}" for t in turns))
+    for name, sizes in results.items():
+        print(f"{name:<32}" + "".join(f"{sizes[t - 1]:>9} /{sizes[t - 1] // 4:>5}" for t in turns))
+    print(f"\nhistorique borné : rendu {history_us:.0f} µs / tour ; "
+          f"bench en {time.perf_counter() - start:.1f} s")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,129 @@
+"""
+Benchmark de /stream_search sous rafale : coalescence des recherches identiques
+et limite globale équitable.
+
+Le supervisor est remplacé par un pipeline simulé (--llm-ms de "LLM" puis un vol) :
+aucun appel réseau, seul le nombre de pipelines lancés et les temps comptent.
+
+1. rafale : --clients requêtes simultanées réparties sur --routes trajets,
+   avec et sans coalescence -> pipelines lancés, p50/p95 de fin de flux.
+2. équité : le client A envoie --burst recherches distinctes, puis le client B une seule ;
+   temps d'attente de B avec la file round-robin vs une file FIFO (un seul client).
+
+    python -m benchmarks.bench_coalescing [--clients 50] [--routes 5] [--limit 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from benchmarks._common import copy_data_dir
+
+os.environ["TRAVEL_DATA_DIR"] = copy_data_dir()
+os.environ.setdefault("LOG_LEVEL", "off")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from core.concurrency import FairLimiter, SingleFlight  # noqa: E402
+
+CITIES = ["Tokyo", "Rome", "London", "Madrid", "Berlin", "Lisbonne", "New York", "Sydney"]
+
+
+def fake_supervisor(llm_seconds: float, counter: dict):
+    async def run(prompt_text, agent=None, records=None, sections=None, progressive=False):
+        counter["pipelines"] += 1
+        counter["active"] += 1
+        counter["max_active"] = max(counter["max_active"], counter["active"])
+        try:
+            yield f"data: {json.dumps({'type': 'tool', 'message': 'fake LLM'})}\n\n"
+            await asyncio.sleep(llm_seconds)
+            flight = {"airline": "Air Test (AT1)", "origin": "Paris", "destination": prompt_text[26:40],
+                      "departure": "2026-04-01 08:00", "arrival": "2026-04-01 10:00", "price": 100.0}
+            records.add({"result": "", "flights": [flight]})
+            yield f"__DONE__{prompt_text}"
+        finally:
+            counter["active"] -= 1
+    return run
+
+
+async def search(client: httpx.AsyncClient, destination: str) -> float:
+    start = time.perf_counter()
+    # Budget en texte libre -> chemin supervisor (ni fast path ni branches directes)
+    params = {"origin": "Paris", "destination": destination, "budget_max": "raisonnable",
+              "activities": "quelque chose de calme ?"}
+    async with client.stream("GET", "/stream_search", params=params) as resp:
+        async for line in resp.aiter_lines():
+            if line.startswith("data: ") and json.loads(line[6:]).get("type") == "complete":
+                break
+    return time.perf_counter() - start
+
+
+def make_client(host: str) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=main.app, client=(host, 1234))
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120)
+
+
+def reset(limit: int, coalesce: bool, llm_seconds: float) -> dict:
+    counter = {"pipelines": 0, "active": 0, "max_active": 0}
+    main._run_supervisor_streaming = fake_supervisor(llm_seconds, counter)
+    main.search_limiter = FairLimiter(limit=limit, max_waiting=10_000)
+    main.inflight_searches = SingleFlight()
+    main.COALESCE_ENABLED = coalesce
+    return counter
+
+
+async def burst(n_clients: int, n_routes: int, limit: int, coalesce: bool, llm_seconds: float):
+    counter = reset(limit, coalesce, llm_seconds)
+    clients = [make_client(f"10.0.0.{i}") for i in range(n_clients)]
+    timings = await asyncio.gather(*(search(c, CITIES[i % n_routes]) for i, c in enumerate(clients)))
+    for c in clients:
+        await c.aclose()
+    return counter, sorted(t * 1000 for t in timings)
+
+
+async def fairness(burst_size: int, limit: int, llm_seconds: float, fair: bool):
+    """Temps de fin de la recherche unique de B, lancée juste après la rafale de A."""
+    reset(limit, coalesce=True, llm_seconds=llm_seconds)
+    client_a = make_client("10.0.1.1")
+    # FIFO : B partage la clé d'équité de A (même adresse) -> file servie dans l'ordre d'arrivée
+    client_b = make_client("10.0.2.2" if fair else "10.0.1.1")
+    tasks = [asyncio.create_task(search(client_a, f"{CITIES[i % len(CITIES)]} {i}")) for i in range(burst_size)]
+    await asyncio.sleep(0.05)  # la rafale de A est en file avant B
+    b_time = await search(client_b, "Nice")
+    await asyncio.gather(*tasks)
+    await client_a.aclose()
+    await client_b.aclose()
+    return b_time * 1000
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--routes", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=4)
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--llm-ms", type=float, default=200.0)
+    args = parser.parse_args()
+    llm = args.llm_ms / 1000
+
+    print(f"{args.clients} requêtes simultanées, {args.routes} trajets, limite {args.limit}, LLM simulé {args.llm_ms:.0f} ms")
+    print(f"{'mode':<22}{'pipelines':>10}{'actifs max':>12}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for coalesce in (False, True):
+        counter, ms = asyncio.run(burst(args.clients, args.routes, args.limit, coalesce, llm))
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        label = "coalescence" if coalesce else "sans coalescence"
+        print(f"{label:<22}{counter['pipelines']:>10}{counter['max_active']:>12}"
+              f"{statistics.median(ms):>10.0f}{p95:>10.0f}")
+
+    print(f"\nclient A : {args.burst} recherches distinctes, puis client B : 1 recherche")
+    for fair in (False, True):
+        b_ms = asyncio.run(fairness(args.burst, args.limit, llm, fair))
+        label = "round-robin" if fair else "FIFO"
+        print(f"{label:<22} attente de B : {b_ms:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,82 @@
+"""
+Benchmark : une connexion SQLite par appel (ancien code) vs pool partagé (core.db).
+
+Lance la requête de search_flights en boucle, en mono-thread, en multi-thread
+et via asyncio, et affiche le nombre d'appels par seconde.
+
+    python -m benchmarks.bench_db_pool [--calls 5000] [--threads 16]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._common import copy_data_dir, rate
+from core.db import ConnectionPool
+
+QUERY = (
+    "SELECT airline, flight_number, origin, destination, departure_time, arrival_time, price "
+    "FROM flights WHERE origin LIKE ? AND destination LIKE ? ORDER BY price ASC"
+)
+PARAMS = ("%Paris%", "%Tokyo%")
+
+
+def legacy_call(path):
+    # Reproduction fidèle de l'ancien code : connect -> execute -> close
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute(QUERY, PARAMS)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def threaded_rate(fn, calls: int, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        for _ in ex.map(lambda _: fn(), range(calls)):
+            pass
+    return calls / (time.perf_counter() - start)
+
+
+async def asyncio_rate(pool: ConnectionPool, calls: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await pool.afetchall(QUERY, PARAMS)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    data_dir = copy_data_dir()
+    path = os.path.join(data_dir, 'flights.db')
+    pool = ConnectionPool(path, max_size=8)
+
+    results = [
+        ("mono-thread", rate(lambda: legacy_call(path), args.calls),
+         rate(lambda: pool.fetchall(QUERY, PARAMS), args.calls)),
+        (f"{args.threads} threads", threaded_rate(lambda: legacy_call(path), args.calls, args.threads),
+         threaded_rate(lambda: pool.fetchall(QUERY, PARAMS), args.calls, args.threads)),
+    ]
+    async_after = asyncio.run(asyncio_rate(pool, args.calls, args.threads))
+    pool.close()
+
+    print(f"{'scénario':<14} {'avant (appels/s)':>18} {'après (appels/s)':>18} {'gain':>7}")
+    for label, before, after in results:
+        print(f"{label:<14} {before:>18.0f} {after:>18.0f} {after / before:>6.1f}x")
+    print(f"{'asyncio':<14} {'-':>18} {async_after:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
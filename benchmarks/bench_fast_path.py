@@ -0,0 +1,121 @@
+"""
+Benchmark de /stream_search : fast path déterministe (outils appelés en direct)
+vs supervisor LLM, mesuré de bout en bout jusqu'à l'événement "complete".
+
+Le chemin LLM n'est mesuré que si une clé d'API Gemini est configurée
+(GOOGLE_API_KEY) ; sinon seul le fast path est chronométré.
+
+    python -m benchmarks.bench_fast_path [--requests 50] [--llm-requests 3]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+
+from benchmarks._common import copy_data_dir
+
+os.environ["TRAVEL_DATA_DIR"] = copy_data_dir()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from core.cache import clear_caches  # noqa: E402
+from core.records import RecordCollector  # noqa: E402
+
+SEARCHES = [
+    {"origin": "Paris", "destination": "London", "departure_date": "2026-04-01", "budget_max": "800",
+     "hotel_budget_max": "300", "amenities": "WiFi"},
+    {"origin": "Berlin", "destination": "Rome", "departure_date": "2026-04-20", "activities": "restaurant"},
+    {"origin": "Paris", "destination": "Tokyo", "activities": "musée", "amenities": "Piscine"},
+]
+
+
+RESULT_EVENTS = {"flight", "hotel", "activity"}
+
+
+def timed_search(client, params) -> tuple:
+    """(secondes jusqu'à 'complete', secondes jusqu'au premier résultat, taille de l'événement 'complete')."""
+    start = time.perf_counter()
+    first_result = None
+    with client.stream("GET", "/stream_search", params=params) as resp:
+        for line in resp.iter_lines():
+            if not line.startswith("data: "):
+                continue
+            kind = json.loads(line[6:]).get("type")
+            if kind in RESULT_EVENTS and first_result is None:
+                first_result = time.perf_counter() - start
+            elif kind == "complete":
+                elapsed = time.perf_counter() - start
+                return elapsed, first_result or elapsed, len(line.encode())
+    elapsed = time.perf_counter() - start
+    return elapsed, first_result or elapsed, 0
+
+
+def run(client, mode: str, n: int, cold: bool) -> list:
+    main.FAST_PATH_MODE = mode
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):  # logs du serveur
+        for i in range(n):
+            if cold:
+                clear_caches()
+            timings.append(timed_search(client, SEARCHES[i % len(SEARCHES)]))
+    return timings
+
+
+def report_search(label: str, samples: list):
+    report(label, [total for total, _, _ in samples])
+    report("  1er résultat", [first for _, first, _ in samples])
+
+
+async def _drain(source):
+    async for _ in source:
+        pass
+
+
+def run_planner_only(n: int) -> list:
+    """_plan_search + _run_fast_path seuls : coût propre du fast path, hors HTTP et rendu."""
+    main.FAST_PATH_MODE = "auto"
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(n):
+            clear_caches()
+            start = time.perf_counter()
+            asyncio.run(_drain(main._run_fast_path(main._plan_search(**SEARCHES[i % len(SEARCHES)]),
+                                                   RecordCollector())))
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list):
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"{label:<28} {statistics.median(ms):>10.1f} {p95:>10.1f} {len(ms):>6}")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--llm-requests", type=int, default=3)
+    args = parser.parse_args()
+
+    client = TestClient(main.app)
+    run(client, "auto", len(SEARCHES), cold=False)  # migrations + pools
+
+    print(f"{'mode':<28} {'p50 (ms)':>10} {'p95 (ms)':>10} {'n':>6}")
+    cold = run(client, "auto", args.requests, cold=True)
+    report_search("fast path (cache froid)", cold)
+    report_search("fast path (cache chaud)", run(client, "auto", args.requests, cold=False))
+    report("fast path (outils seuls)", run_planner_only(args.requests))
+    if os.environ.get("GOOGLE_API_KEY"):
+        report_search("supervisor LLM", run(client, "off", args.llm_requests, cold=True))
+    else:
+        print("supervisor LLM               non mesuré (GOOGLE_API_KEY absente)")
+    print(f"événement 'complete' : {max(size for _, _, size in cold)} octets max")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,104 @@
+"""
+Benchmark de passage à l'échelle de search_flights : LIKE '%x%' (scan complet)
+vs clés normalisées + index idx_flights_route (index seek).
+
+Génère des tables de 10k, 100k et 1M vols dans un dossier temporaire.
+
+    python -m benchmarks.bench_flight_search [--sizes 10000 100000 1000000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import benchmarks._common  # noqa: F401  (ajoute la racine du projet au sys.path)
+from core.cities import airline_key, city_key
+from core.schema import create_flights_indexes
+
+BASE_CITIES = ["Paris", "Tokyo", "New York", "Berlin", "London", "Bangkok", "Lisbonne", "Rome", "Madrid", "Sydney"]
+AIRLINES = ["Air France", "ANA", "Delta", "Lufthansa", "British Airways", "Emirates", "Japan Airlines", "United"]
+
+OLD_QUERY = (
+    "SELECT airline, flight_number, origin, destination, departure_time, arrival_time, price FROM flights "
+    "WHERE origin LIKE ? AND destination LIKE ? AND departure_time >= ? ORDER BY price ASC"
+)
+NEW_QUERY = (
+    "SELECT airline, flight_number, origin, destination, departure_time, arrival_time, price FROM flights "
+    "WHERE origin_key = ? AND destination_key = ? AND departure_time >= ? ORDER BY price ASC"
+)
+
+
+def build_db(path: str, rows: int, n_cities: int, seed: int = 42):
+    rng = random.Random(seed)
+    cities = BASE_CITIES + [f"City{i:03d}" for i in range(n_cities - len(BASE_CITIES))]
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("""
+        CREATE TABLE flights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT, destination TEXT, departure_time TEXT, arrival_time TEXT,
+            price REAL, airline TEXT, flight_number TEXT,
+            origin_key TEXT, destination_key TEXT, airline_key TEXT
+        )
+    """)
+
+    def gen():
+        for _ in range(rows):
+            o, d = rng.sample(cities, 2)
+            a = rng.choice(AIRLINES)
+            day = rng.randint(1, 28)
+            dep = f"2026-{rng.randint(3, 8):02d}-{day:02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+            yield (o, d, dep, dep, rng.randint(350, 1400), a, f"AF{rng.randint(100, 999)}",
+                   city_key(o), city_key(d), airline_key(a))
+
+    conn.executemany(
+        "INSERT INTO flights (origin, destination, departure_time, arrival_time, price, airline, flight_number,"
+        " origin_key, destination_key, airline_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        gen(),
+    )
+    create_flights_indexes(conn)
+    conn.commit()
+    conn.close()
+    return cities
+
+
+def avg_ms(conn, query, params_list) -> float:
+    start = time.perf_counter()
+    for params in params_list:
+        conn.execute(query, params).fetchall()
+    return (time.perf_counter() - start) * 1000 / len(params_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_flights_")
+    print(f"{'lignes':>10} {'génération (s)':>15} {'LIKE (ms/req)':>14} {'index (ms/req)':>15} {'gain':>8}")
+    for size in args.sizes:
+        path = os.path.join(tmp, f"flights_{size}.db")
+        t0 = time.perf_counter()
+        cities = build_db(path, size, args.cities)
+        build_s = time.perf_counter() - t0
+
+        rng = random.Random(7)
+        pairs = [rng.sample(cities, 2) for _ in range(args.queries)]
+        old_params = [(f"%{o}%", f"%{d}%", "2026-05-01") for o, d in pairs]
+        new_params = [(city_key(o), city_key(d), "2026-05-01") for o, d in pairs]
+
+        conn = sqlite3.connect(path)
+        old_ms = avg_ms(conn, OLD_QUERY, old_params[: max(5, args.queries // 10)])
+        new_ms = avg_ms(conn, NEW_QUERY, new_params)
+        conn.close()
+        os.remove(path)
+        print(f"{size:>10} {build_s:>15.1f} {old_ms:>14.3f} {new_ms:>15.3f} {old_ms / new_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark de passage à l'échelle de search_hotels :
+LIKE sur city + comparaisons de dates texte + LIKE '%service%' (scan complet)
+vs R*Tree (ville, dispo, prix) + bitmask des services.
+
+    python -m benchmarks.bench_hotel_search [--sizes 10000 100000 1000000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+import benchmarks._common  # noqa: F401  (ajoute la racine du projet au sys.path)
+from core.cities import city_key
+from core.schema import amenity_filter, date_to_day, index_hotels, migrate_hotels, price_to_cents
+
+BASE_CITIES = ["Paris", "Tokyo", "New York", "Berlin", "London", "Bangkok", "Lisbonne", "Rome", "Madrid", "Sydney"]
+AMENITIES = ["WiFi", "Petit-déjeuner inclus", "Piscine", "Spa", "Salle de sport", "Climatisation", "Vue sur mer"]
+
+OLD_QUERY = (
+    "SELECT city, name, price, amenities, available_start, available_end FROM hotels "
+    "WHERE city LIKE ? AND price <= ? AND amenities LIKE ? AND amenities LIKE ? "
+    "AND available_start <= ? AND available_end >= ?"
+)
+NEW_QUERY = (
+    "SELECT h.city, h.name, h.price, h.amenities, h.available_start, h.available_end "
+    "FROM hotels_rtree r JOIN hotels h ON h.id = r.id "
+    "WHERE r.city_min >= ? AND r.city_max <= ? AND r.price_max <= ? "
+    "AND r.day_min <= ? AND r.day_max >= ?"
+)
+
+
+def build_db(path: str, rows: int, n_cities: int, seed: int = 42):
+    rng = random.Random(seed)
+    cities = BASE_CITIES + [f"City{i:03d}" for i in range(n_cities - len(BASE_CITIES))]
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("""
+        CREATE TABLE hotels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, city TEXT, name TEXT, price REAL, amenities TEXT,
+            available_start DATE, available_end DATE, city_key TEXT, amenity_mask INTEGER
+        )
+    """)
+    migrate_hotels(conn)
+
+    def gen():
+        for i in range(rows):
+            city = rng.choice(cities)
+            start = date(2026, 1, 1) + timedelta(days=rng.randint(0, 300))
+            end = start + timedelta(days=rng.randint(5, 30))
+            yield (city, f"{city} Hotel {i}", rng.randint(60, 500),
+                   ", ".join(rng.sample(AMENITIES, k=rng.randint(2, 4))), start.isoformat(), end.isoformat())
+
+    conn.executemany(
+        "INSERT INTO hotels (city, name, price, amenities, available_start, available_end) VALUES (?, ?, ?, ?, ?, ?)",
+        gen(),
+    )
+    index_hotels(conn)
+    conn.commit()
+    conn.close()
+    return cities
+
+
+def avg_ms(conn, query, params_list) -> float:
+    start = time.perf_counter()
+    for params in params_list:
+        conn.execute(query, params).fetchall()
+    return (time.perf_counter() - start) * 1000 / len(params_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_hotels_")
+    print(f"{'hôtels':>10} {'génération (s)':>15} {'LIKE (ms/req)':>14} {'R*Tree (ms/req)':>16} {'gain':>8}")
+    for size in args.sizes:
+        path = os.path.join(tmp, f"hotels_{size}.db")
+        t0 = time.perf_counter()
+        cities = build_db(path, size, args.cities)
+        build_s = time.perf_counter() - t0
+
+        conn = sqlite3.connect(path)
+        city_ids = dict(conn.execute("SELECT key, id FROM hotel_cities"))
+        bits = dict(conn.execute("SELECT key, bit FROM hotel_amenity_bits"))
+
+        rng = random.Random(7)
+        old_params, new_params = [], []
+        for _ in range(args.queries):
+            city = rng.choice(cities)
+            budget = rng.randint(150, 400)
+            a1, a2 = rng.sample(AMENITIES, 2)
+            start = date(2026, 1, 1) + timedelta(days=rng.randint(0, 300))
+            end = start + timedelta(days=3)
+            old_params.append((f"%{city}%", budget, f"%{a1}%", f"%{a2}%", start.isoformat(), end.isoformat()))
+            cid = city_ids[city_key(city)]
+            sql, mask_params = amenity_filter(bits, f"{a1}, {a2}")
+            new_params.append((NEW_QUERY + sql, [cid, cid, price_to_cents(budget),
+                                                  date_to_day(start.isoformat()), date_to_day(end.isoformat())]
+                               + mask_params))
+
+        old_ms = avg_ms(conn, OLD_QUERY, old_params[: max(5, args.queries // 10)])
+        t0 = time.perf_counter()
+        for query, params in new_params:
+            conn.execute(query, params).fetchall()
+        new_ms = (time.perf_counter() - t0) * 1000 / len(new_params)
+        conn.close()
+        os.remove(path)
+        print(f"{size:>10} {build_s:>15.1f} {old_ms:>14.3f} {new_ms:>16.3f} {old_ms / new_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
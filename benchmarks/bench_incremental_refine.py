@@ -0,0 +1,122 @@
+"""
+Benchmark du raffinement incrémental (core.refine) : une recherche structurée (sans LLM)
+remplit la session, puis chaque demande du chat est servie par /chat_refine avec
+REFINE_CACHE=0 (agents et outils à chaque message) ou REFINE_CACHE=1 (filtre en mémoire
+quand la session suffit). Modèle simulé (benchmarks.fake_llm), bases copiées.
+
+Par mode : part des demandes servies par la session, appels au modèle et aux outils
+par demande, durée p50 / moyenne d'une demande.
+
+    python -m benchmarks.bench_incremental_refine [--latency-ms 300] [--rounds 3] [--verbose]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from benchmarks._common import copy_data_dir
+
+os.environ["TRAVEL_DATA_DIR"] = copy_data_dir()
+os.environ.setdefault("LOG_LEVEL", "off")
+os.environ.setdefault("RESPONSE_CACHE", "0")
+os.environ.setdefault("TOOL_CACHE", "0")
+
+import httpx  # noqa: E402
+
+import core.refine  # noqa: E402
+import main  # noqa: E402
+from benchmarks.fake_llm import fake_llm_calls, install_fake_llm  # noqa: E402
+from core.metrics import STAGE_SECONDS, reset_metrics  # noqa: E402
+
+# Trajet le mieux fourni des bases de démo (vols, hôtels, activités et restaurants)
+SEARCH = {"origin": "Paris", "destination": "New York"}
+
+# Conversation type : filtres sur ce qui est affiché, et demandes qui exigent une nouvelle recherche
+MESSAGES = [
+    "un hôtel avec spa",
+    "moins de 150€ la nuit",
+    "un vol moins cher",
+    "un vol le soir",
+    "un restaurant",
+    "uniquement des musées",
+    "un hôtel avec salle de sport",
+    "les activités à moins de 30€",
+    "avec Air France",
+    "un vol direct",
+    "d'autres restaurants",
+    "un hôtel 5 étoiles",
+    "quelque chose de calme",
+    "un restaurant vegan",
+]
+
+
+async def new_session(client: httpx.AsyncClient) -> str:
+    async with client.stream("GET", "/stream_search", params=SEARCH) as resp:
+        async for line in resp.aiter_lines():
+            if line.startswith("data: "):
+                event = json.loads(line[6:])
+                if event.get("type") == "complete":
+                    return event["session_id"]
+    raise RuntimeError("recherche sans événement complete")
+
+
+async def refine(client: httpx.AsyncClient, session_id: str, message: str) -> tuple:
+    """(durée, texte de la réponse) d'une demande /chat_refine."""
+    start = time.perf_counter()
+    answer = ""
+    async with client.stream("GET", "/chat_refine", params={
+            "message": message, "origin": SEARCH["origin"], "destination": SEARCH["destination"],
+            "session_id": session_id}) as resp:
+        async for line in resp.aiter_lines():
+            if line.startswith("data: "):
+                event = json.loads(line[6:])
+                if event.get("type") == "response":
+                    answer = event["message"]
+    return time.perf_counter() - start, answer
+
+
+def tool_calls() -> int:
+    return sum(v["count"] for k, v in STAGE_SECONDS.snapshot().items()
+               if k.startswith("tool.") and k != "tool.queue")
+
+
+async def main_async(args):
+    install_fake_llm(latency_ms=args.latency_ms, jitter_ms=0)
+    transport = httpx.ASGITransport(app=main.app)
+    print(f"modèle simulé {args.latency_ms:.0f} ms / appel, {len(MESSAGES)} demandes x {args.rounds} sessions\n")
+    print(f"{'REFINE_CACHE':<14}{'session':>9}{'appels LLM':>12}{'outils':>8}{'p50 (ms)':>10}{'moyenne (ms)':>14}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for enabled in (False, True):
+            core.refine.REFINE_CACHE_ENABLED = enabled
+            durations, llm, tools, cached = [], 0, 0, 0
+            for _ in range(args.rounds):
+                # Session neuve par demande : chaque mode filtre exactement les mêmes résultats
+                for message in MESSAGES:
+                    session_id = await new_session(client)
+                    reset_metrics()
+                    calls, cache_hits = fake_llm_calls(), main.refine_routes["cache"]
+                    duration, answer = await refine(client, session_id, message)
+                    durations.append(duration)
+                    llm += fake_llm_calls() - calls
+                    tools += tool_calls()
+                    cached += main.refine_routes["cache"] - cache_hits
+                    if args.verbose and enabled:
+                        print(f"  {message!r:34} {duration * 1000:7.1f} ms  {answer}")
+            n = len(durations)
+            print(f"{'1' if enabled else '0':<14}{cached / n:>9.0%}{llm / n:>12.2f}{tools / n:>8.2f}"
+                  f"{statistics.median(durations) * 1000:>10.1f}{statistics.mean(durations) * 1000:>14.1f}")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--verbose", action="store_true", help="réponse de chaque demande servie par la session")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,226 @@
+"""
+Benchmark du routage local des demandes de raffinement (core.intent) :
+
+1. Sur un jeu de demandes annotées (agent attendu), part des demandes routées sans LLM,
+   exactitude de ces décisions, et ce qui reste au refine_supervisor (ambiguës, sans indice).
+2. De bout en bout (/chat_refine, modèle simulé) : appels au modèle et durée par demande,
+   REFINE_ROUTER=llm (toujours le supervisor) contre REFINE_ROUTER=local.
+
+    python -m benchmarks.bench_intent_router [--latency-ms 300] [--requests 40] [--verbose]
+
+Le supervisor est supposé router juste : la colonne "exactitude" ne mesure que les erreurs
+ajoutées par le routeur local.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks._common import copy_data_dir
+
+os.environ["TRAVEL_DATA_DIR"] = copy_data_dir()
+os.environ.setdefault("LOG_LEVEL", "off")
+
+import httpx  # noqa: E402
+
+from core.intent import classify_refine  # noqa: E402
+
+# (demande, agent attendu) ; écrites comme dans le chat, avec ou sans accents
+LABELED = [
+    # -- vols --
+    ("un vol moins cher", "flight"),
+    ("je veux un vol direct", "flight"),
+    ("des vols le matin", "flight"),
+    ("un vol sans escale", "flight"),
+    ("avec Air France plutôt", "flight"),
+    ("une autre compagnie", "flight"),
+    ("un billet d'avion moins cher", "flight"),
+    ("partir plus tôt", "flight"),
+    ("un départ l'après-midi", "flight"),
+    ("arrivée avant midi", "flight"),
+    ("le retour le dimanche", "flight"),
+    ("en classe business", "flight"),
+    ("avec un bagage en soute", "flight"),
+    ("un vol en classe economique", "flight"),
+    ("change de compagnie aérienne", "flight"),
+    ("un aller simple", "flight"),
+    ("depuis un autre aéroport", "flight"),
+    ("le vol de 7h est trop tôt", "flight"),
+    ("des avions plus récents", "flight"),
+    ("budget vol 300 euros", "flight"),
+    ("je préfère décoller le soir", "flight"),
+    ("atterrir avant 18h", "flight"),
+    ("un vol direct pas trop cher", "flight"),
+    ("un billet flexible", "flight"),
+    ("une escale courte", "flight"),
+    ("quel vol arrive le plus tôt ?", "flight"),
+    ("un vol le 12", "flight"),
+    ("vols du vendredi", "flight"),
+    ("un autre vol", "flight"),
+    ("les compagnies low cost", "flight"),
+    # -- hôtels --
+    ("un hôtel avec piscine", "hotel"),
+    ("un hotel moins cher", "hotel"),
+    ("un hôtel avec spa", "hotel"),
+    ("un hôtel 4 étoiles", "hotel"),
+    ("avec parking", "hotel"),
+    ("une chambre avec vue", "hotel"),
+    ("un logement près du centre", "hotel"),
+    ("un hébergement avec wifi", "hotel"),
+    ("une auberge de jeunesse", "hotel"),
+    ("un airbnb", "hotel"),
+    ("avec petit déjeuner inclus", "hotel"),
+    ("avec salle de sport", "hotel"),
+    ("un hôtel avec climatisation", "hotel"),
+    ("budget hotel 120 euros", "hotel"),
+    ("moins de 100€ la nuit", "hotel"),
+    ("où dormir pas cher ?", "hotel"),
+    ("une suite pour deux", "hotel"),
+    ("un hôtel avec jacuzzi et sauna", "hotel"),
+    ("un hôtel avec spa près de la plage", "hotel"),
+    ("des hôtels 5 étoiles", "hotel"),
+    ("un hôtel calme", "hotel"),
+    ("un grand lit", "hotel"),
+    ("un hotel avec fitness", "hotel"),
+    ("réception ouverte 24h", "hotel"),
+    ("une chambre familiale", "hotel"),
+    ("un hôtel de charme", "hotel"),
+    ("3 nuits seulement", "hotel"),
+    ("un hôtel proche de la gare", "hotel"),
+    ("hébergement moins cher", "hotel"),
+    ("un autre hôtel", "hotel"),
+    # -- activités / restaurants --
+    ("un restaurant japonais", "activity"),
+    ("un restaurant vegan", "activity"),
+    ("des tapas", "activity"),
+    ("un musée", "activity"),
+    ("des musées gratuits", "activity"),
+    ("où manger des sushis ?", "activity"),
+    ("un bon restaurant italien", "activity"),
+    ("de la street food", "activity"),
+    ("une pizza", "activity"),
+    ("un restaurant végétarien", "activity"),
+    ("une visite guidée", "activity"),
+    ("des monuments historiques", "activity"),
+    ("un parc pour se promener", "activity"),
+    ("un brunch le dimanche", "activity"),
+    ("un bar à cocktails", "activity"),
+    ("une exposition d'art", "activity"),
+    ("des activités pour enfants", "activity"),
+    ("un concert ce soir", "activity"),
+    ("un dîner romantique", "activity"),
+    ("une balade au bord de la plage", "activity"),
+    ("une excursion à la journée", "activity"),
+    ("visiter un château", "activity"),
+    ("du shopping", "activity"),
+    ("un restaurant avec terrasse", "activity"),
+    ("la cathédrale", "activity"),
+    ("de la cuisine locale", "activity"),
+    ("un restaurant gastronomique", "activity"),
+    ("des galeries", "activity"),
+    ("un marché local", "activity"),
+    ("un spectacle", "activity"),
+    # -- ambiguës ou sans indice : le supervisor doit trancher --
+    ("un restaurant près de l'hôtel", "activity"),
+    ("un hôtel près d'un musée", "hotel"),
+    ("moins cher", "hotel"),
+    ("autre chose", "activity"),
+    ("plus proche du centre", "hotel"),
+    ("pas trop loin", "activity"),
+    ("quelque chose de calme", "activity"),
+    ("un hôtel avec restaurant", "hotel"),
+    ("un vol et un hôtel moins chers", "flight"),
+    ("pour deux personnes", "hotel"),
+    ("le week-end prochain", "flight"),
+    ("plus de choix", "activity"),
+    ("un endroit sympa", "activity"),
+    ("avec vue sur la mer", "hotel"),
+    ("un truc romantique pour le soir", "activity"),
+    ("pour des enfants", "activity"),
+    ("le moins cher possible", "flight"),
+    ("un spa", "hotel"),
+    ("un vol de nuit", "flight"),
+    ("un dîner à l'hôtel", "hotel"),
+]
+
+
+def offline_report(verbose: bool) -> dict:
+    routed = correct = 0
+    by_intent = {}
+    mistakes, deferred = [], []
+    start = time.perf_counter()
+    routes = [(message, expected, classify_refine(message)) for message, expected in LABELED]
+    per_call_us = (time.perf_counter() - start) / len(LABELED) * 1e6
+    for message, expected, route in routes:
+        stats = by_intent.setdefault(expected, [0, 0, 0])  # demandes, routées localement, justes
+        stats[0] += 1
+        if not route.confident:
+            deferred.append(message)
+            continue
+        routed += 1
+        stats[1] += 1
+        if route.intent == expected:
+            correct += 1
+            stats[2] += 1
+        else:
+            mistakes.append((message, expected, route.intent))
+
+    total = len(LABELED)
+    print(f"{total} demandes annotées, classification locale {per_call_us:.1f} µs / demande\n")
+    print(f"{'agent attendu':<16}{'demandes':>10}{'routées local':>15}{'justes':>9}")
+    for intent, (n, local, ok) in sorted(by_intent.items()):
+        print(f"{intent:<16}{n:>10}{local:>15}{ok:>9}")
+    print(f"\nroutées sans LLM : {routed}/{total} ({routed / total:.0%}), "
+          f"exactitude {correct}/{routed} ({correct / max(routed, 1):.1%})")
+    print(f"laissées au refine_supervisor : {len(deferred)}")
+    # Un appel de routage (transfer_to_agent) économisé par demande routée localement
+    print(f"appels de routage LLM économisés : {routed}/{total} ({routed / total:.0%})")
+    if verbose:
+        for message, expected, got in mistakes:
+            print(f"  erreur : {message!r} attendu {expected}, routé {got}")
+        for message in deferred:
+            print(f"  supervisor : {message!r}")
+    return {"routed": routed, "correct": correct, "total": total}
+
+
+async def end_to_end(latency_ms: float, requests: int):
+    import main
+    from benchmarks.fake_llm import fake_llm_calls, install_fake_llm
+
+    install_fake_llm(latency_ms=latency_ms, jitter_ms=0)
+    messages = [message for message, _ in LABELED]
+    transport = httpx.ASGITransport(app=main.app)
+    print(f"\nde bout en bout (/chat_refine), modèle simulé {latency_ms:.0f} ms / appel, {requests} demandes")
+    print(f"{'REFINE_ROUTER':<16}{'appels LLM / demande':>22}{'p50 (ms)':>10}{'moyenne (ms)':>14}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for mode in ("llm", "local"):
+            main.REFINE_ROUTER = mode
+            calls = fake_llm_calls()
+            durations = []
+            for i in range(requests):
+                start = time.perf_counter()
+                response = await client.get("/chat_refine", params={
+                    "message": messages[i * 7 % len(messages)], "origin": "Paris", "destination": "Rome",
+                    "date": "2026-03-01"})
+                response.raise_for_status()
+                durations.append(time.perf_counter() - start)
+            per_request = (fake_llm_calls() - calls) / requests
+            print(f"{mode:<16}{per_request:>22.2f}{statistics.median(durations) * 1000:>10.1f}"
+                  f"{statistics.mean(durations) * 1000:>14.1f}")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--verbose", action="store_true", help="liste les erreurs et les demandes laissées au LLM")
+    parser.add_argument("--offline", action="store_true", help="jeu annoté seulement (sans /chat_refine)")
+    args = parser.parse_args()
+    offline_report(args.verbose)
+    if not args.offline:
+        asyncio.run(end_to_end(args.latency_ms, args.requests))
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,232 @@
+"""
+Test de charge de bout en bout : N clients SSE simultanés sur /stream_search et /chat_refine,
+supervisor ADK réel (Runner, sessions, outils, bases) mais modèle simulé (benchmarks.fake_llm).
+
+L'application tourne dans un vrai serveur uvicorn (port local, même processus que les clients) :
+httpx.ASGITransport attend la fin de la réponse et ne permet pas de mesurer le premier événement.
+
+Par endpoint : débit, p50 / p95 / p99 du temps jusqu'au premier événement (TTFE)
+et jusqu'à la fin du flux, appels au modèle par requête, mémoire par session
+(RSS du processus : pic pendant la charge / clients simultanés, et résidu après la charge).
+
+    python -m benchmarks.bench_load [--clients 50] [--requests 4] [--latency-ms 300] [--jitter-ms 100]
+    python -m benchmarks.bench_load --url http://127.0.0.1:8000   # serveur lancé par python -m benchmarks.fake_llm
+
+Chaque requête a un prompt distinct (ni coalescence ni cache des runs) ; --same envoie
+le même prompt partout pour mesurer la coalescence.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import socket
+import statistics
+import time
+import tracemalloc
+
+from benchmarks._common import copy_data_dir
+
+os.environ["TRAVEL_DATA_DIR"] = copy_data_dir()
+os.environ.setdefault("LOG_LEVEL", "off")
+os.environ.setdefault("RESPONSE_CACHE", "0")
+
+import httpx  # noqa: E402
+
+CITIES = ["Tokyo", "Rome", "London", "Madrid", "Berlin", "Lisbonne", "New York", "Sydney", "Bangkok"]
+CHAT_MESSAGES = ["un hôtel avec piscine", "un vol moins cher", "un restaurant japonais", "un musée"]
+
+
+def rss_bytes() -> int:
+    """Mémoire résidente du processus (Linux : /proc/self/statm), 0 si indisponible."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class MemorySampler:
+    """Pic de RSS pendant la charge, relevé toutes les `interval` secondes."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = 0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, rss_bytes())
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.peak = rss_bytes()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def request_for(endpoint: str, client_index: int, n: int, same: bool):
+    """(chemin, paramètres) de la n-ième requête du client : prompts distincts sauf --same."""
+    tag = 0 if same else client_index * 1000 + n
+    city = CITIES[tag % len(CITIES)]
+    if endpoint == "/stream_search":
+        # Budget en texte libre : la demande part au supervisor (ni fast path ni branches directes)
+        return endpoint, {"origin": "Paris", "destination": city, "budget_max": "raisonnable",
+                          "activities": f"quelque chose de calme n{tag} ?"}
+    return endpoint, {"message": f"{CHAT_MESSAGES[tag % len(CHAT_MESSAGES)]} {tag}",
+                      "origin": "Paris", "destination": city}
+
+
+async def one_request(client: httpx.AsyncClient, path: str, params: dict) -> dict:
+    start = time.perf_counter()
+    first = None
+    events = 0
+    completed = False
+    async with client.stream("GET", path, params=params) as resp:
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            events += 1
+            if first is None:
+                first = time.perf_counter() - start
+            event_type = json.loads(line[6:]).get("type")
+            if event_type == "complete":
+                completed = True
+                break
+            if event_type == "error":
+                break
+    return {"ttfe": first, "total": time.perf_counter() - start, "events": events, "ok": completed}
+
+
+async def start_server(app):
+    """uvicorn dans la boucle courante, sur un port libre -> (serveur, tâche, url)."""
+    import uvicorn
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.get_running_loop().create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+async def run_endpoint(endpoint: str, args) -> dict:
+    clients = [httpx.AsyncClient(base_url=args.url, timeout=300) for _ in range(args.clients)]
+
+    async def client_loop(i: int, client: httpx.AsyncClient):
+        results = []
+        for n in range(args.requests):
+            path, params = request_for(endpoint, i, n, args.same)
+            try:
+                results.append(await one_request(client, path, params))
+            except httpx.HTTPError as e:
+                results.append({"ttfe": None, "total": 0.0, "events": 0, "ok": False, "error": str(e)})
+        return results
+
+    gc.collect()
+    baseline = rss_bytes()
+    sampler = MemorySampler()
+    sampler.start()
+    if args.tracemalloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    per_client = await asyncio.gather(*(client_loop(i, c) for i, c in enumerate(clients)))
+    elapsed = time.perf_counter() - start
+    traced_peak = 0
+    if args.tracemalloc:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    await sampler.stop()
+    for c in clients:
+        await c.aclose()
+    gc.collect()
+    return {"results": [r for rs in per_client for r in rs], "elapsed": elapsed, "baseline": baseline,
+            "peak": sampler.peak, "after": rss_bytes(), "traced_peak": traced_peak}
+
+
+def percentiles(values: list) -> tuple:
+    if not values:
+        return (float("nan"),) * 3
+    ms = sorted(v * 1000 for v in values)
+    pick = lambda q: ms[min(len(ms) - 1, int(len(ms) * q))]  # noqa: E731
+    return statistics.median(ms), pick(0.95), pick(0.99)
+
+
+def report(endpoint: str, run: dict, llm_calls: int, in_process: bool, args):
+    results = run["results"]
+    ok = [r for r in results if r["ok"]]
+    ttfe = percentiles([r["ttfe"] for r in ok])
+    total = percentiles([r["total"] for r in ok])
+    print(f"\n{endpoint} : {len(results)} requêtes, {args.clients} clients simultanés, "
+          f"{len(results) - len(ok)} échecs, {len(ok) / run['elapsed']:.1f} req/s")
+    print(f"  {'':<22}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    print(f"  {'premier événement':<22}{ttfe[0]:>9.1f}{ttfe[1]:>9.1f}{ttfe[2]:>9.1f}")
+    print(f"  {'fin du flux':<22}{total[0]:>9.1f}{total[1]:>9.1f}{total[2]:>9.1f}")
+    if llm_calls is not None:
+        print(f"  appels au modèle      {llm_calls / max(len(results), 1):.1f} / requête")
+    if in_process:
+        mb = 1024 * 1024
+        per_session = (run["peak"] - run["baseline"]) / args.clients / 1024
+        retained = (run["after"] - run["baseline"]) / max(len(results), 1) / 1024
+        print(f"  mémoire (RSS)         base {run['baseline'] / mb:.0f} Mo, pic {run['peak'] / mb:.0f} Mo -> "
+              f"{per_session:.0f} Ko par session active, {retained:.1f} Ko résiduels par requête")
+        if run["traced_peak"]:
+            print(f"  tas Python (tracemalloc) : pic {run['traced_peak'] / mb:.1f} Mo -> "
+                  f"{run['traced_peak'] / args.clients / 1024:.0f} Ko par session active")
+
+
+async def main_async(args):
+    endpoints = {"search": ["/stream_search"], "chat": ["/chat_refine"],
+                 "both": ["/stream_search", "/chat_refine"]}[args.endpoint]
+    fake_llm_calls = server = None
+    in_process = not args.url
+    if in_process:
+        import main
+        from benchmarks.fake_llm import fake_llm_calls, install_fake_llm
+        from core.concurrency import FairLimiter
+        install_fake_llm(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+        main.search_limiter = FairLimiter(limit=args.limit, max_waiting=100_000)
+        print(f"en processus : modèle simulé {args.latency_ms:.0f} ± {args.jitter_ms:.0f} ms par appel, "
+              f"{args.limit} pipelines actifs max")
+        server, task, args.url = await start_server(main.app)
+        # Tour de chauffe (imports paresseux d'ADK, pools SQLite) hors mesure
+        async with httpx.AsyncClient(base_url=args.url, timeout=300) as client:
+            for endpoint in endpoints:
+                await one_request(client, *request_for(endpoint, 999_999, 0, False))
+
+    for endpoint in endpoints:
+        calls_before = fake_llm_calls() if fake_llm_calls else None
+        run = await run_endpoint(endpoint, args)
+        calls = fake_llm_calls() - calls_before if fake_llm_calls else None
+        report(endpoint, run, calls, in_process, args)
+
+    if server is not None:
+        server.should_exit = True
+        await task
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=4, help="requêtes successives par client")
+    parser.add_argument("--endpoint", choices=("search", "chat", "both"), default="both")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=50, help="SEARCH_CONCURRENCY du serveur en processus")
+    parser.add_argument("--same", action="store_true", help="même prompt pour toutes les requêtes")
+    parser.add_argument("--tracemalloc", action="store_true", help="mesure aussi le tas Python (plus lent)")
+    parser.add_argument("--url", default="", help="serveur externe (sinon application en processus)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,86 @@
+"""
+Benchmark du coût des logs sur le chemin critique (boucle d'events du supervisor) :
+print() synchrone vs core.log (file + thread d'écriture) à différents niveaux.
+
+La sortie simule un terminal ou un collecteur lent (--write-us microsecondes par écriture) :
+avec print(), chaque event attend l'écriture ; avec core.log, seul le thread d'écriture attend.
+
+    python -m benchmarks.bench_logging [--events 2000] [--write-us 50]
+"""
+import argparse
+import io
+import logging
+import statistics
+import time
+
+from core.log import bind_request, get_logger, setup_logging, stop_logging
+
+RESPONSE = {"result": "- Air France (AF1234) : Paris -> Rome | départ 2026-04-01 08:00 arrivée 2026-04-01 10:05 "
+                      "pour 129.0€\n" * 20}
+
+
+class SlowStream(io.TextIOBase):
+    """Sortie qui bloque `delay` secondes à chaque écriture."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay)  # comme un vrai write() bloquant : le GIL est relâché
+        self.lines += 1
+        return len(text)
+
+
+def events_with_print(n: int, out):
+    """Ancienne boucle : 3 print() par event, dont un aperçu tronqué de la réponse."""
+    for i in range(n):
+        print(f"\n--- Event #{i} | Auteur: flight_agent ---", file=out)
+        print(f"  >> TOOL CALL: search_flights({{'origin': 'Paris'}})", file=out)
+        resp_str = str(RESPONSE)
+        if len(resp_str) > 200:
+            resp_str = resp_str[:200] + "..."
+        print(f"  << TOOL RESPONSE (search_flights): {resp_str}", file=out)
+
+
+def events_with_logger(n: int, log: logging.Logger):
+    for i in range(n):
+        log.debug("event #%d | auteur : %s", i, "flight_agent")
+        log.debug(">> tool call : %s(%s)", "search_flights", {"origin": "Paris"})
+        log.debug("<< tool response (%s) : %.200s", "search_flights", RESPONSE)
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--write-us", type=float, default=50.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    delay = args.write_us / 1e6
+
+    log = get_logger("bench")
+    bind_request("bench")
+    rows = [("print()", lambda: timed(events_with_print, args.events, SlowStream(delay)))]
+    for level in ("DEBUG", "INFO", "off"):
+        def run(level=level):
+            setup_logging(level=level, stream=SlowStream(delay))
+            elapsed = timed(events_with_logger, args.events, log)
+            stop_logging()  # vide la file hors chronométrage
+            return elapsed
+        rows.append((f"core.log LOG_LEVEL={level}", run))
+
+    print(f"{args.events} events, écriture à {args.write_us:.0f} µs")
+    print(f"{'mode':<28}{'total (ms)':>12}{'µs / event':>12}")
+    for label, run in rows:
+        elapsed = statistics.median(run() for _ in range(args.repeat))
+        print(f"{label:<28}{elapsed * 1000:>12.2f}{elapsed / args.events * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark : retard de la boucle asyncio pendant N recherches concurrentes.
+
+- "sync"  : outils synchrones appelés dans la boucle (comportement d'ADK pour un outil non-async)
+- "async" : variantes async_tool (pool de threads borné), la boucle reste libre
+
+Chaque recherche appelle les 4 outils comme le supervisor (cache des outils désactivé).
+--rows remplace les vols et hôtels de la copie par des tables générées plus grosses.
+
+    python -m benchmarks.bench_loop_lag [--searches 100] [--rounds 3] [--rows 200000]
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import os
+import time
+
+from benchmarks._common import copy_data_dir
+
+DATA_COPY = copy_data_dir()
+os.environ["TRAVEL_DATA_DIR"] = DATA_COPY
+os.environ["TOOL_CACHE"] = "0"
+
+from benchmarks import bench_flight_search, bench_hotel_search  # noqa: E402
+
+from core.aio import LoopLagMonitor  # noqa: E402
+from test_agent.activity_agent import (  # noqa: E402
+    search_activities, search_activities_async, search_restaurants, search_restaurants_async,
+)
+from test_agent.flight_agent import search_flights, search_flights_async  # noqa: E402
+from test_agent.hotel_agent import search_hotels, search_hotels_async  # noqa: E402
+
+ROUTES = [("Paris", "London"), ("Berlin", "Rome"), ("Paris", "Tokyo"), ("Paris", "New York")]
+
+
+async def search_sync(origin, destination):
+    search_flights(origin, destination)
+    search_hotels(destination)
+    search_activities(destination, "musée")
+    search_restaurants(destination)
+
+
+async def search_async(origin, destination):
+    await asyncio.gather(
+        search_flights_async(origin, destination),
+        search_hotels_async(destination),
+        search_activities_async(destination, "musée"),
+        search_restaurants_async(destination),
+    )
+
+
+async def run(search, n: int) -> tuple:
+    monitor = LoopLagMonitor(interval=0.005)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    await asyncio.gather(*(search(*ROUTES[i % len(ROUTES)]) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+    return elapsed, monitor.snapshot()["max_lag_ms"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--searches", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.rows:
+        for name, module in (("flights.db", bench_flight_search), ("hotels.db", bench_hotel_search)):
+            path = os.path.join(DATA_COPY, name)
+            os.remove(path)
+            module.build_db(path, args.rows, n_cities=50)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(run(search_sync, 4))  # migrations + pools
+    # Les objets d'import (ADK, genai) sont figés : les pauses du GC complet ne faussent pas les mesures
+    gc.collect()
+    gc.freeze()
+
+    print(f"{'mode':<8} {'total (ms)':>12} {'retard max de la boucle (ms)':>30}")
+    for label, search in (("sync", search_sync), ("async", search_async)):
+        for _ in range(args.rounds):
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, max_lag = asyncio.run(run(search, args.searches))
+            print(f"{label:<8} {elapsed * 1000:>12.1f} {max_lag:>30.1f}")
+
+
+if __name__ == "__main__":
+    main()
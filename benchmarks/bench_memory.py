@@ -0,0 +1,112 @@
+"""
+Benchmark de la mémoire des préférences : table unique sans index (ancien code) vs
+core.memory (une ligne par utilisateur et préférence, index UNIQUE, lecture en cache).
+
+Les deux bases contiennent USERS x PREFS préférences. Mesures :
+- sauvegarde de 5 préférences (3 déjà connues, 2 nouvelles) pour un utilisateur ;
+- lecture des préférences injectées dans le prompt (ancien code : toute la table,
+  core.memory : celles de l'utilisateur, depuis le cache ou depuis la base) ;
+- taille du texte de préférences lu pour un utilisateur.
+
+    python -m benchmarks.bench_memory [--users 5000] [--prefs 10] [--calls 300]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+
+from benchmarks._common import copy_data_dir
+from core.memory import MemoryStore, format_preferences
+from core.schema import migrate_memory
+
+WORDS = ["vegan", "terrasse", "japonais", "pas cher", "spa", "piscine", "vol direct", "hublot",
+         "musée", "calme", "centre-ville", "petit-déjeuner", "cocktails", "randonnée", "5 étoiles"]
+
+
+def user_prefs(user: int, prefs: int) -> list:
+    return [f"{WORDS[(user + k) % len(WORDS)]} {k}" for k in range(prefs)]
+
+
+def build_legacy(path: str, users: int, prefs: int):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE memory (id INTEGER PRIMARY KEY AUTOINCREMENT, preferences TEXT)")
+    conn.executemany("INSERT INTO memory (preferences) VALUES (?)",
+                     ((f"u{u} {p}",) for u in range(users) for p in user_prefs(u, prefs)))
+    conn.commit()
+    conn.close()
+
+
+def build_store(path: str, users: int, prefs: int):
+    now = time.time()
+    conn = sqlite3.connect(path)
+    migrate_memory(conn)
+    conn.executemany("INSERT INTO memory (user_id, preferences, created_at, last_seen_at, hits) VALUES (?, ?, ?, ?, 1)",
+                     ((f"u{u}", p, now, now) for u in range(users) for p in user_prefs(u, prefs)))
+    conn.commit()
+    conn.close()
+
+
+def legacy_save(conn, user: int, items: list):
+    # Reproduction fidèle de l'ancien save_memory : un SELECT (sans index) + un INSERT par préférence
+    for item in items:
+        item = f"u{user} {item}"
+        if not conn.execute("SELECT 1 FROM memory WHERE preferences = ?", (item,)).fetchone():
+            conn.execute("INSERT INTO memory (preferences) VALUES (?)", (item,))
+    conn.commit()
+
+
+def legacy_load(conn) -> str:
+    # Ancien load_memory : toute la table, quel que soit l'utilisateur
+    return format_preferences(row[0] for row in conn.execute("SELECT preferences FROM memory"))
+
+
+def timed(fn, calls: int) -> float:
+    """Durée moyenne d'un appel, en µs."""
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--prefs", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+
+    tmp = copy_data_dir()
+    legacy_path, store_path = os.path.join(tmp, "memory_legacy.db"), os.path.join(tmp, "memory_store.db")
+    build_legacy(legacy_path, args.users, args.prefs)
+    build_store(store_path, args.users, args.prefs)
+    rng = random.Random(0)
+    users = [rng.randrange(args.users) for _ in range(args.calls)]
+
+    def items(i):
+        # 3 préférences connues + 2 nouvelles, propres à l'appel
+        return user_prefs(users[i], args.prefs)[:3] + [f"nouvelle {i} a", f"nouvelle {i} b"]
+
+    legacy = sqlite3.connect(legacy_path, check_same_thread=False)
+    store = MemoryStore(store_path)
+    store.preferences("u0")   # migration et connexion hors mesure
+
+    legacy_save_us = timed(lambda i: legacy_save(legacy, users[i], items(i)), args.calls)
+    store_save_us = timed(lambda i: store.save(f"u{users[i]}", items(i)), args.calls)
+    legacy_load_us = timed(lambda i: legacy_load(legacy), min(args.calls, 50))
+    miss_us = timed(lambda i: (store._cache.delete(f"u{users[i]}"), store.preferences(f"u{users[i]}")), args.calls)
+    hit_us = timed(lambda i: store.preferences(f"u{users[i]}"), args.calls)
+    legacy_chars, store_chars = len(legacy_load(legacy)), len(store.prompt(f"u{users[0]}"))
+
+    rows = legacy.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+    print(f"{args.users} utilisateurs x {args.prefs} préférences ({rows} lignes), {args.calls} appels\n")
+    print(f"{'':<34}{'ancien code':>14}{'core.memory':>14}")
+    print(f"{'sauvegarde 5 préférences (µs)':<34}{legacy_save_us:>14.0f}{store_save_us:>14.0f}")
+    print(f"{'lecture, base (µs)':<34}{legacy_load_us:>14.0f}{miss_us:>14.0f}")
+    print(f"{'lecture, cache (µs)':<34}{'-':>14}{hit_us:>14.1f}")
+    print(f"{'texte injecté dans le prompt':<34}{legacy_chars:>14}{store_chars:>14}")
+    legacy.close()
+
+
+if __name__ == "__main__":
+    main()
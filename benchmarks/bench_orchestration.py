@@ -0,0 +1,126 @@
+"""
+Benchmark de l'orchestration des branches de /stream_search (modèle simulé, sans réseau) :
+
+- formulaire structuré         : outils en branches parallèles, hôtel après le vol (0 appel LLM)
+- activités en texte libre     : mêmes branches + activity_agent seul pour ce champ
+- supervisor complet           : root_agent décide des appels (budget en texte libre)
+
+Par scénario : durée du pipeline (p50), appels au modèle, et pour les branches la somme
+de leurs durées vs le temps total (chemin critique).
+
+    python -m benchmarks.bench_orchestration [--requests 20] [--latency-ms 300] [--tool-latency-ms 0]
+
+--tool-latency-ms ajoute une attente à chaque outil (base distante, API de réservation) :
+montre que le temps total suit le chemin critique, pas la somme des étapes.
+"""
+import argparse
+import asyncio
+import functools
+import os
+import statistics
+import time
+
+from benchmarks._common import copy_data_dir
+
+os.environ["TRAVEL_DATA_DIR"] = copy_data_dir()
+os.environ.setdefault("LOG_LEVEL", "off")
+os.environ.setdefault("RESPONSE_CACHE", "0")
+os.environ.setdefault("TOOL_CACHE", "0")
+
+import main  # noqa: E402
+from benchmarks.fake_llm import fake_llm_calls, install_fake_llm  # noqa: E402
+from core.metrics import STAGE_SECONDS, reset_metrics  # noqa: E402
+
+SCENARIOS = {
+    "formulaire structuré": {"departure_date": "2026-03-01", "activities": "musée"},
+    "activités en texte libre": {"departure_date": "2026-03-01", "activities": "quelque chose de calme ?"},
+    "supervisor complet": {"departure_date": "2026-03-01", "budget_max": "raisonnable",
+                           "activities": "quelque chose de calme ?"},
+}
+CITIES = ["Tokyo", "Rome", "London", "Madrid", "Berlin"]
+
+
+def slow_tools(delay: float):
+    """Ajoute `delay` secondes à chaque outil async (fast path et agents utilisent les mêmes objets)."""
+    from test_agent import activity_agent, flight_agent, hotel_agent
+    from test_agent.agent import refine_supervisor, root_agent
+
+    replaced = {}
+    for module, names in ((flight_agent, ["search_flights_async"]), (hotel_agent, ["search_hotels_async"]),
+                          (activity_agent, ["search_activities_async", "search_restaurants_async"])):
+        for name in names:
+            tool = getattr(module, name)
+
+            @functools.wraps(tool)
+            async def wrapper(*args, _tool=tool, **kwargs):
+                await asyncio.sleep(delay)
+                return await _tool(*args, **kwargs)
+
+            replaced[tool] = wrapper
+            setattr(module, name, wrapper)
+            setattr(main, name, wrapper)
+
+    def swap(agent, seen=set()):
+        if id(agent) in seen:
+            return
+        seen.add(id(agent))
+        if getattr(agent, "tools", None):
+            agent.tools = [replaced.get(t, t) for t in agent.tools]
+        for sub in getattr(agent, "sub_agents", ()):
+            swap(sub)
+
+    swap(root_agent)
+    swap(refine_supervisor)
+
+
+async def one_search(params: dict) -> float:
+    start = time.perf_counter()
+    async for _ in main._search_pipeline("bench", "Paris", **params):
+        pass
+    return time.perf_counter() - start
+
+
+def branch_totals() -> tuple:
+    """(somme des durées de branches, nombre de branches) depuis le dernier reset."""
+    series = STAGE_SECONDS.snapshot()
+    branches = {k: v for k, v in series.items() if k.startswith("branch.")}
+    return sum(v["sum"] for v in branches.values()), sum(v["count"] for v in branches.values())
+
+
+async def main_async(args):
+    install_fake_llm(latency_ms=args.latency_ms, jitter_ms=0)
+    if args.tool_latency_ms:
+        slow_tools(args.tool_latency_ms / 1000)
+    await one_search({"destination": "Paris", **SCENARIOS["activités en texte libre"]})  # chauffe
+
+    print(f"modèle simulé {args.latency_ms:.0f} ms / appel, outils +{args.tool_latency_ms:.0f} ms, "
+          f"{args.requests} recherches par scénario\n")
+    print(f"{'scénario':<28}{'p50 (ms)':>10}{'appels LLM':>12}{'somme branches':>16}{'gain parallèle':>16}")
+    for name, scenario in SCENARIOS.items():
+        reset_metrics()
+        calls = fake_llm_calls()
+        durations = []
+        for i in range(args.requests):
+            durations.append(await one_search({"destination": CITIES[i % len(CITIES)], **scenario}))
+        calls = (fake_llm_calls() - calls) / args.requests
+        branches_sum, branches = branch_totals()
+        p50 = statistics.median(durations) * 1000
+        if branches:
+            per_search = branches_sum / args.requests * 1000
+            gain = f"{per_search / (sum(durations) / args.requests * 1000):.2f}x"
+            print(f"{name:<28}{p50:>10.1f}{calls:>12.1f}{per_search:>14.1f}ms{gain:>16}")
+        else:
+            print(f"{name:<28}{p50:>10.1f}{calls:>12.1f}{'-':>16}{'-':>16}")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--tool-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,61 @@
+"""
+Benchmark du cache persistant des runs du supervisor (core.response_cache).
+
+Même supervisor simulé que bench_coalescing (--llm-ms de "LLM") :
+1re recherche (miss) puis --requests recherches identiques (hits), puis une
+écriture dans flights.db -> la recherche suivante doit repartir au "LLM".
+
+    python -m benchmarks.bench_response_cache [--requests 50] [--llm-ms 1500]
+"""
+import argparse
+import asyncio
+import sqlite3
+import statistics
+
+from benchmarks.bench_coalescing import make_client, reset, search
+
+import main
+from core.db import FLIGHTS_DB_PATH
+
+
+def touch_flights_db():
+    """Une écriture quelconque dans la base des vols (comme un import du générateur)."""
+    conn = sqlite3.connect(FLIGHTS_DB_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS bench_touch (x INTEGER)")
+    conn.execute("INSERT INTO bench_touch VALUES (1)")
+    conn.commit()
+    conn.close()
+
+
+async def run(n: int, llm_seconds: float):
+    counter = reset(limit=8, coalesce=True, llm_seconds=llm_seconds)
+    main.response_cache.clear()
+    client = make_client("10.0.0.1")
+
+    miss = await search(client, "Tokyo")
+    hits = [await search(client, "Tokyo") for _ in range(n)]
+    pipelines_after_hits = counter["pipelines"]
+    touch_flights_db()
+    after_write = await search(client, "Tokyo")
+    await client.aclose()
+    return miss, hits, pipelines_after_hits, after_write, counter["pipelines"]
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--llm-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    miss, hits, pipelines, after_write, total = asyncio.run(run(args.requests, args.llm_ms / 1000))
+    ms = sorted(t * 1000 for t in hits)
+    print(f"LLM simulé {args.llm_ms:.0f} ms")
+    print(f"1re recherche (miss)          {miss * 1000:>8.1f} ms")
+    print(f"{args.requests} recherches identiques  p50 {statistics.median(ms):>6.1f} ms  "
+          f"p95 {ms[min(len(ms) - 1, int(len(ms) * 0.95))]:>6.1f} ms  (pipelines LLM lancés : {pipelines})")
+    print(f"après écriture dans flights.db {after_write * 1000:>7.1f} ms  (pipelines LLM lancés : {total})")
+    print(f"stats : {main.response_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main_bench()
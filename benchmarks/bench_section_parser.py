@@ -0,0 +1,130 @@
+"""
+Benchmark du parsing des réponses du supervisor : ancienne extraction par regex
+sur le texte complet (re.search '(.*?)' par section + regex JSON imbriquées)
+vs SectionParser alimenté au fil du stream (morceaux de ~20 caractères).
+
+Entrées :
+- normal       : réponse bien formée, N vols/hôtels/activités
+- json_ouvert  : section VOLS remplie de '{"a": ' jamais refermés (JSON tronqué par le LLM)
+- debut_sans_fin : '### DEBUT_VOLS ###' répété sans '### FIN_VOLS ###'
+
+Un coût linéaire double quand la taille double ; un coût quadratique quadruple.
+
+    python -m benchmarks.bench_section_parser [--sizes 10000 20000 40000 80000]
+"""
+import argparse
+import re
+import time
+
+from core.parsing import SectionParser, parse_activities, parse_flights, parse_hotels
+
+CHUNK = 20
+
+
+# ────────────────────────────────────────────
+# Référence : extraction historique de main.py (avant SectionParser)
+# ────────────────────────────────────────────
+
+def legacy_extract_section(text: str, start_marker: str, end_marker: str) -> str:
+    pattern = re.escape(start_marker) + r"(.*?)" + re.escape(end_marker)
+    m = re.search(pattern, text, re.DOTALL)
+    if not m:
+        return ""
+    raw = m.group(1).strip()
+    if "```json" in raw or '{"' in raw:
+        cleaned = re.sub(r'```json\s*', '', raw)
+        cleaned = re.sub(r'```\s*', '', cleaned)
+        extracted_parts = []
+        for json_match in re.finditer(r'\{[^{}]*"result"\s*:\s*"((?:[^"\\]|\\.)*)"\s*\}', cleaned, re.DOTALL):
+            result_text = json_match.group(1)
+            result_text = result_text.replace('\\n', '\n').replace("\\'", "'").replace('\\"', '"')
+            extracted_parts.append(result_text)
+        for json_block in re.finditer(r'\{[^{]*?\{[^}]*"result"\s*:\s*"((?:[^"\\]|\\.)*)"\s*\}[^}]*\}', cleaned, re.DOTALL):
+            result_text = json_block.group(1)
+            result_text = result_text.replace('\\n', '\n').replace("\\'", "'").replace('\\"', '"')
+            if result_text not in extracted_parts:
+                extracted_parts.append(result_text)
+        if extracted_parts:
+            return '\n'.join(extracted_parts).strip()
+        return cleaned.strip()
+    return raw
+
+
+def legacy_parse(text: str) -> tuple:
+    flights_text = legacy_extract_section(text, "### DEBUT_VOLS ###", "### FIN_VOLS ###")
+    hotels_text = legacy_extract_section(text, "### DEBUT_HOTELS ###", "### FIN_HOTELS ###")
+    act_text = legacy_extract_section(text, "### DEBUT_ACTIVITES ###", "### FIN_ACTIVITES ###")
+    resto_text = legacy_extract_section(text, "### DEBUT_RESTAURANTS ###", "### FIN_RESTAURANTS ###")
+    if not (flights_text or hotels_text or act_text or resto_text):
+        return parse_flights(text), parse_activities(text), parse_hotels(text)
+    return (parse_flights(flights_text), parse_activities(act_text + "\n" + resto_text),
+            parse_hotels(hotels_text))
+
+
+def streamed_parse(text: str) -> tuple:
+    parser = SectionParser()
+    for i in range(0, len(text), CHUNK):
+        parser.feed(text[i:i + CHUNK])
+    return parser.finish(fallback_text=text)
+
+
+# ────────────────────────────────────────────
+# Entrées
+# ────────────────────────────────────────────
+
+def _repeat_to(unit: str, size: int) -> str:
+    return unit * max(1, size // len(unit))
+
+
+def normal_text(size: int) -> str:
+    flight = ("- Air France (AF1234) : Paris -> Rome | départ 2026-04-01 08:00 "
+              "arrivée 2026-04-01 10:05 pour 129.0€\n")
+    hotel = ("- Hotel Roma à Rome pour 85.0€/nuit "
+             "(Dispo: 2026-01-01 au 2026-12-31, Services: WiFi, Piscine)\n")
+    activity = "Activité, Colisée, 16.0€, Visite guidée du Colisée\n"
+    third = size // 3
+    return ("Voici votre séjour.\n"
+            f"### DEBUT_VOLS ###\n{_repeat_to(flight, third)}### FIN_VOLS ###\n"
+            f"### DEBUT_HOTELS ###\n{_repeat_to(hotel, third)}### FIN_HOTELS ###\n"
+            f"### DEBUT_ACTIVITES ###\n{_repeat_to(activity, third)}### FIN_ACTIVITES ###\n")
+
+
+def open_json_text(size: int) -> str:
+    return "### DEBUT_VOLS ###\n" + _repeat_to('{"a": ', size) + "\n### FIN_VOLS ###\n"
+
+
+def unclosed_markers_text(size: int) -> str:
+    return _repeat_to("### DEBUT_VOLS ### pas de vol\n", size)
+
+
+CASES = {"normal": normal_text, "json_ouvert": open_json_text, "debut_sans_fin": unclosed_markers_text}
+
+
+def best_of(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 20_000, 40_000, 80_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'entrée':<16}{'taille':>9}{'regex (ms)':>14}{'stream (ms)':>14}{'gain':>9}")
+    for name, build in CASES.items():
+        for size in args.sizes:
+            text = build(size)
+            assert legacy_parse(text) == streamed_parse(text), f"résultats différents ({name}, {size})"
+            legacy = best_of(legacy_parse, text, args.repeat)
+            streamed = best_of(streamed_parse, text, args.repeat)
+            print(f"{name:<16}{len(text):>9}{legacy * 1000:>14.2f}{streamed * 1000:>14.2f}"
+                  f"{legacy / streamed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
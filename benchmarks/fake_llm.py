@@ -0,0 +1,228 @@
+"""
+Modèle local déterministe qui remplace Gemini dans les agents ADK (tests de charge, sans réseau).
+
+    from benchmarks.fake_llm import install_fake_llm
+    install_fake_llm(latency_ms=300)        # root_agent, refine_supervisor et tous leurs sous-agents
+
+Le scénario suit les instructions des agents, à partir des prompts construits par main.py :
+- agent avec outils métier (search_*) : 1er tour = appels d'outils, arguments lus dans le prompt
+  ("de X vers Y", "Date souhaitee", "Budget hotel max", "Services hotel souhaites") ;
+  date fixée -> vols / activités / restaurants d'abord, puis search_hotels à la date d'arrivée du vol,
+  comme l'exige le prompt du supervisor ; dernier tour = texte des outils dans les balises ### DEBUT_X ###.
+- routeur (refine_supervisor) : transfer_to_agent vers l'agent du sujet de la demande (mots-clés).
+
+Chaque appel au "modèle" attend latency_ms (+ jitter_ms tiré avec une graine fixe).
+En streaming, le texte final est découpé en morceaux (partial=True) séparés de chunk_ms.
+
+Servir l'application avec ce modèle (serveur réel pour bench_load --url) :
+
+    python -m benchmarks.fake_llm [--port 8000] [--latency-ms 300]
+"""
+import argparse
+import asyncio
+import random
+import re
+from typing import AsyncGenerator
+
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+ROUTE_RE = re.compile(r"de (.+?) vers (.+?)\.")
+DATE_RE = re.compile(r"Date (?:souhaitee|du voyage initialement prévue) : (\d{4}-\d{2}-\d{2})")
+HOTEL_BUDGET_RE = re.compile(r"Budget hotel max : ([\d.,]+)")
+AMENITIES_RE = re.compile(r"Services hotel souhaites : (.+?)\.")
+REQUEST_RE = re.compile(r'DEMANDE DE RAFFINEMENT : "(.+?)"')
+
+# Sujet de la demande -> mot présent dans le nom de l'agent spécialisé
+ROUTES = (
+    (("vol", "vols", "avion", "compagnie", "flight"), "flight"),
+    (("hotel", "hôtel", "hôtels", "hotels", "logement", "nuit", "spa", "piscine"), "hotel"),
+)
+DEFAULT_ROUTE = "activit"
+
+SECTIONS = (("search_flights", "VOLS"), (("search_activities", "search_restaurants"), "ACTIVITES"),
+            ("search_hotels", "HOTELS"))
+
+
+def _texts(content: types.Content) -> str:
+    return "".join(p.text for p in content.parts or () if p.text)
+
+
+def request_chars(llm_request: LlmRequest) -> int:
+    """Taille de l'historique envoyé au modèle : textes, appels et réponses d'outils (hors instructions)."""
+    size = 0
+    for content in llm_request.contents:
+        for part in content.parts or ():
+            if part.text:
+                size += len(part.text)
+            if part.function_call:
+                size += len(str(part.function_call.args))
+            if part.function_response:
+                size += len(str(part.function_response.response))
+    return size
+
+
+def _function_responses(llm_request: LlmRequest) -> list:
+    """Réponses d'outils de l'agent courant (ADK réécrit celles des autres agents en texte)."""
+    return [p.function_response for c in llm_request.contents for p in c.parts or () if p.function_response]
+
+
+class FakeLlm(BaseLlm):
+    """Modèle scripté : mêmes appels d'outils et même format de réponse qu'un supervisor bien élevé."""
+
+    model: str = "fake-llm"
+    latency_ms: float = 300.0
+    jitter_ms: float = 0.0
+    chunk_ms: float = 20.0
+    chunks: int = 4
+    seed: int = 0
+    sub_agents: list[str] = []  # noms des agents vers lesquels transfer_to_agent peut router
+    calls: int = 0
+    prompt_chars: int = 0      # cumul de request_chars() sur tous les appels
+    max_prompt_chars: int = 0
+
+    def _delay(self) -> float:
+        # Graine fixe + numéro d'appel : même séquence de latences d'un run à l'autre
+        jitter = random.Random(self.seed * 1_000_003 + self.calls).uniform(-1, 1) * self.jitter_ms
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def _prompt(self, llm_request: LlmRequest) -> str:
+        for content in llm_request.contents:
+            if content.role == "user" and _texts(content).strip():
+                return _texts(content)
+        return ""
+
+    def _plan(self, llm_request: LlmRequest) -> list:
+        """Appels d'outils du prochain tour ([] = l'agent a fini et répond en texte)."""
+        tools = set(llm_request.tools_dict)
+        prompt = self._prompt(llm_request)
+        answered = {r.name: r.response for r in _function_responses(llm_request)}
+        business = sorted(t for t in tools if t.startswith("search_"))
+
+        if not business and "transfer_to_agent" in tools and "transfer_to_agent" not in answered:
+            request = REQUEST_RE.search(prompt)
+            words = set(re.findall(r"\w+", (request.group(1) if request else prompt).lower()))
+            route = next((target for keys, target in ROUTES if words & set(keys)), DEFAULT_ROUTE)
+            agents = [a for a in self.sub_agents if route in a.lower()]
+            return [("transfer_to_agent", {"agent_name": agents[0] if agents else DEFAULT_ROUTE})]
+
+        route = ROUTE_RE.search(prompt)
+        origin, destination = (route.group(1), route.group(2)) if route else ("Paris", "Tokyo")
+        date = DATE_RE.search(prompt)
+        date = date.group(1) if date else None
+        calls = []
+        if "search_flights" in business and "search_flights" not in answered:
+            calls.append(("search_flights", {"origin": origin, "destination": destination, "preferred_date": date}))
+        for tool in ("search_activities", "search_restaurants"):
+            if tool in business and tool not in answered:
+                calls.append((tool, {"city": destination}))
+        if "search_hotels" in business and "search_hotels" not in answered:
+            flights = answered.get("search_flights")
+            # Date fixée : l'hôtel attend l'arrivée du vol (tour suivant)
+            if not (date and "search_flights" in business and flights is None):
+                args = {"city": destination}
+                if flights and flights.get("flights"):
+                    args["date_start"] = flights["flights"][0]["arrival"][:10]
+                budget = HOTEL_BUDGET_RE.search(prompt)
+                if budget:
+                    args["budget"] = float(budget.group(1).replace(",", "."))
+                amenities = AMENITIES_RE.search(prompt)
+                if amenities:
+                    args["amenities"] = amenities.group(1)
+                calls.append(("search_hotels", args))
+        return [(name, {k: v for k, v in args.items() if v is not None}) for name, args in calls]
+
+    def _answer(self, llm_request: LlmRequest) -> str:
+        answered = {r.name: r.response for r in _function_responses(llm_request)}
+        blocks = []
+        for tools, section in SECTIONS:
+            tools = (tools,) if isinstance(tools, str) else tools
+            texts = [str((answered[t] or {}).get("result", "")).strip() for t in tools if t in answered]
+            if texts:
+                blocks.append(f"### DEBUT_{section} ###\n" + "\n".join(texts) + f"\n### FIN_{section} ###")
+        return "\n".join(blocks) or "Aucun résultat."
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        size = request_chars(llm_request)
+        self.prompt_chars += size
+        self.max_prompt_chars = max(self.max_prompt_chars, size)
+        await asyncio.sleep(self._delay())
+        calls = self._plan(llm_request)
+        if calls:
+            parts = [types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args in calls]
+            yield LlmResponse(content=types.Content(role="model", parts=parts))
+            return
+
+        text = self._answer(llm_request)
+        if stream and self.chunks > 1:
+            size = -(-len(text) // self.chunks)
+            for i in range(0, len(text), size):
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text[i:i + size])]),
+                                  partial=True)
+                await asyncio.sleep(self.chunk_ms / 1000)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), turn_complete=True)
+
+
+def _walk(agent, seen: set):
+    if id(agent) in seen:
+        return
+    seen.add(id(agent))
+    yield agent
+    for sub in getattr(agent, "sub_agents", ()):
+        yield from _walk(sub, seen)
+
+
+def install_fake_llm(agents=None, **settings) -> FakeLlm:
+    """
+    Remplace le modèle de chaque LlmAgent (agents donnés et sous-agents) par un FakeLlm.
+    agents=None : root_agent et refine_supervisor de test_agent.agent.
+    Retourne le dernier modèle installé (compteur `calls` par agent, voir fake_llm_calls).
+    """
+    if agents is None:
+        from test_agent.agent import refine_supervisor, root_agent
+        agents = (root_agent, refine_supervisor)
+    llm, seen = None, set()
+    for root in agents:
+        for agent in _walk(root, seen):
+            if isinstance(agent, LlmAgent):
+                llm = FakeLlm(model=f"fake-{agent.name}", sub_agents=[a.name for a in agent.sub_agents], **settings)
+                agent.model = llm
+    return llm
+
+
+def fake_llms(agents=None) -> list:
+    """Modèles simulés installés sur les agents (et leurs sous-agents)."""
+    if agents is None:
+        from test_agent.agent import refine_supervisor, root_agent
+        agents = (root_agent, refine_supervisor)
+    seen = set()
+    return [a.model for root in agents for a in _walk(root, seen) if isinstance(getattr(a, "model", None), FakeLlm)]
+
+
+def fake_llm_calls(agents=None) -> int:
+    """Nombre total d'appels au modèle simulé depuis l'installation."""
+    return sum(llm.calls for llm in fake_llms(agents))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    import main as app_module
+    install_fake_llm(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    uvicorn.run(app_module.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Briques techniques partagées par les agents, les scripts et l'API (accès SQLite, etc.)."""
@@ -0,0 +1,122 @@
+"""
+Outils synchrones (sqlite3) exécutés hors de la boucle asyncio.
+
+Sans cela, ADK appelle les outils synchrones directement dans la boucle qui sert
+tous les StreamingResponse : une requête SQL lente fige chaque client SSE connecté.
+
+    search_flights_async = async_tool(search_flights)   # même nom, même docstring pour le LLM
+    rows = await run_blocking(pool.fetchall, query, params)
+
+Chaque appel d'un outil async_tool est mesuré (core.metrics) : attente d'un thread libre
+("tool.queue") et exécution ("tool.<nom>").
+
+LoopLagMonitor mesure le retard de planification de la boucle (tâche qui se réveille
+toutes les `interval` secondes) : max, dernier et moyenne récente, exposés par l'API.
+
+Variables d'environnement :
+    TOOL_THREADS   taille du pool de threads des outils (défaut 4 : au-delà, la contention
+                   sur le GIL allonge les réveils de la boucle plus qu'elle ne fait gagner)
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from core.metrics import record
+
+TOOL_THREADS = int(os.environ.get("TOOL_THREADS", "4"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="tool")
+    return _executor
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Exécute fn dans le pool borné des outils (le contexte contextvars est propagé)."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+def async_tool(fn):
+    """Variante async d'un outil synchrone : signature, nom et docstring conservés (déclaration ADK identique)."""
+
+    stage = f"tool.{fn.__name__}"
+
+    def measured(submitted: float, *args, **kwargs):
+        started = time.perf_counter()
+        record("tool.queue", started - submitted)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record(stage, time.perf_counter() - started)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(measured, time.perf_counter(), *args, **kwargs)
+
+    return wrapper
+
+
+class LoopLagMonitor:
+    """Retard entre le réveil prévu et le réveil réel d'une tâche périodique."""
+
+    def __init__(self, interval: float = 0.05, window: int = 200):
+        self.interval = interval
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.samples = 0
+        self._recent = deque(maxlen=window)
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.samples += 1
+            self._recent.append(lag)
+
+    def reset(self):
+        self.max_lag = 0.0
+        self._recent.clear()
+
+    def snapshot(self) -> dict:
+        recent = list(self._recent)
+        return {
+            "interval_ms": self.interval * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "recent_avg_ms": round(sum(recent) / len(recent) * 1000, 3) if recent else 0.0,
+            "samples": self.samples,
+        }
+
+
+loop_monitor = LoopLagMonitor()
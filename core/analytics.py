@@ -0,0 +1,249 @@
+"""
+Instantanés en colonnes (NumPy) des vols et des hôtels pour les rapports de scripts/tools.py.
+
+Les rapports (destinations les moins chères, prix moyen par compagnie, hôtels par
+niveau de confort, meilleur rapport prestation/prix...) sont des agrégats sur
+toute la table : en SQL, chaque appel refait un GROUP BY complet. Ici la table
+est chargée une fois en tableaux NumPy, puis chaque rapport est un group-by vectorisé
+(bincount, minimum.at, masques booléens) :
+
+    snap = flights_snapshot(get_pool(FLIGHTS_DB_PATH))
+    snap.cheapest_destinations(3)
+
+- Texte répétitif (villes, compagnies) -> codes entiers + tables de libellés.
+- Hôtels triés par (ville, prix) : une ville est une tranche contiguë des colonnes.
+- Seuls les identifiants des hôtels sont gardés en mémoire ; les lignes renvoyées
+  (nom, services...) sont relues en une requête, dans l'ordre du résultat.
+- L'instantané est reconstruit dès que la base change (core.db.db_signature),
+  comme les ensembles de clés de core.schema.
+"""
+import json
+import threading
+
+import numpy as np
+
+from core.cities import city_key, split_amenities
+from core.db import ConnectionPool, db_signature
+from core.schema import amenity_masks, ensure_hotels_schema, hotel_key_sets
+
+# Lignes lues par fetchmany pendant le chargement (borne la mémoire des tuples Python)
+LOAD_CHUNK_ROWS = 100_000
+
+_snapshots = {}
+_snapshot_lock = threading.Lock()
+
+
+class _Codes(dict):
+    """Texte -> code entier ; une valeur inconnue reçoit le prochain code libre."""
+
+    def __missing__(self, value):
+        code = self[value] = len(self)
+        return code
+
+
+def _encode(values, codes: _Codes, dtype=np.int32) -> np.ndarray:
+    # map + méthode C : pas de frame Python par ligne (chargement ~3x plus rapide qu'un générateur)
+    return np.fromiter(map(codes.__getitem__, values), dtype, len(values))
+
+
+def _labels(codes: dict) -> tuple:
+    """(libellés indexés par code, rang alphabétique de chaque code) pour départager les ex aequo."""
+    labels = np.empty(len(codes), dtype=object)
+    for value, code in codes.items():
+        labels[code] = value
+    rank = np.empty(len(codes), dtype=np.int64)
+    rank[sorted(range(len(codes)), key=lambda c: str(labels[c]))] = np.arange(len(codes))
+    return labels, rank
+
+
+def _cached(kind: str, pool: ConnectionPool, build):
+    sig = db_signature(pool.path)
+    cache_key = (kind, pool.path)
+    cached = _snapshots.get(cache_key)
+    if cached and cached[0] == sig:
+        return cached[1]
+    with _snapshot_lock:
+        cached = _snapshots.get(cache_key)
+        if cached and cached[0] == sig:
+            return cached[1]
+        snapshot = build(pool)
+        _snapshots[cache_key] = (sig, snapshot)
+        return snapshot
+
+
+# ────────────────────────────────────────────
+# FLIGHTS
+# ────────────────────────────────────────────
+
+class FlightsSnapshot:
+    """Colonnes destination (code), compagnie (code) et prix de tous les vols, dans l'ordre des id."""
+
+    def __init__(self, pool: ConnectionPool):
+        destinations, airlines = _Codes(), _Codes()
+        dest_chunks, airline_chunks, price_chunks = [], [], []
+        with pool.connection() as conn:
+            cursor = conn.execute("SELECT destination, airline, price FROM flights")
+            while rows := cursor.fetchmany(LOAD_CHUNK_ROWS):
+                dest, airline, price = zip(*rows)
+                dest_chunks.append(_encode(dest, destinations))
+                airline_chunks.append(_encode(airline, airlines))
+                price_chunks.append(np.array(price, dtype=np.float64))
+        self.destination = np.concatenate(dest_chunks) if dest_chunks else np.empty(0, np.int32)
+        self.airline = np.concatenate(airline_chunks) if airline_chunks else np.empty(0, np.int32)
+        self.price = np.concatenate(price_chunks) if price_chunks else np.empty(0, np.float64)
+        self.destination_labels, self._destination_rank = _labels(destinations)
+        self.airline_labels, self._airline_rank = _labels(airlines)
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def cheapest_destinations(self, limit: int = 3) -> list:
+        """
+        Équivalent vectorisé de
+        SELECT destination, MIN(price), airline FROM flights GROUP BY destination ORDER BY 2 LIMIT n
+        (compagnie = celle du premier vol au prix minimum).
+        """
+        if not len(self):
+            return []
+        mins = np.full(len(self.destination_labels), np.inf)
+        np.minimum.at(mins, self.destination, self.price)
+        # Premier vol (ordre des id) au prix minimum de sa destination
+        at_min = np.flatnonzero(self.price == mins[self.destination])
+        groups, first = np.unique(self.destination[at_min], return_index=True)
+        airline_at_min = np.empty(len(mins), dtype=np.int64)
+        airline_at_min[groups] = self.airline[at_min[first]]
+        order = np.lexsort((self._destination_rank, mins))[:limit]
+        return [(self.destination_labels[d], float(mins[d]), self.airline_labels[airline_at_min[d]])
+                for d in order]
+
+    def cheapest_airlines(self, limit: int = 5) -> list:
+        """Équivalent de SELECT airline, ROUND(AVG(price), 2) ... GROUP BY airline ORDER BY 2 LIMIT n."""
+        if not len(self):
+            return []
+        n = len(self.airline_labels)
+        averages = np.bincount(self.airline, weights=self.price, minlength=n) / np.bincount(self.airline, minlength=n)
+        rounded = np.round(averages, 2)
+        order = np.lexsort((self._airline_rank, rounded))[:limit]
+        return [(self.airline_labels[a], round(float(averages[a]), 2)) for a in order]
+
+
+def flights_snapshot(pool: ConnectionPool) -> FlightsSnapshot:
+    """Instantané des vols de `pool`, reconstruit si la base a changé depuis le dernier appel."""
+    return _cached("flights", pool, FlightsSnapshot)
+
+
+# ────────────────────────────────────────────
+# HOTELS
+# ────────────────────────────────────────────
+
+class HotelsSnapshot:
+    """
+    Colonnes id, ville (code de city_key), prix, nombre de services et amenity_mask,
+    triées par (ville, prix, id) : `city_bounds[c]` donne la tranche de la ville c.
+    """
+
+    def __init__(self, pool: ConnectionPool):
+        ensure_hotels_schema(pool)
+        self.pool = pool
+        _, self.known_amenities = hotel_key_sets(pool)
+        cities, combos = _Codes(), _Codes()
+        columns = {name: [] for name in ("id", "city", "combo", "price", "mask")}
+        with pool.connection() as conn:
+            cursor = conn.execute("SELECT id, city_key, amenities, price, amenity_mask FROM hotels")
+            while rows := cursor.fetchmany(LOAD_CHUNK_ROWS):
+                ids, city_keys, amenities, prices, masks = zip(*rows)
+                columns["id"].append(np.array(ids, dtype=np.int64))
+                columns["city"].append(_encode(city_keys, cities))
+                # Les listes de services se répètent beaucoup : une seule analyse par combinaison
+                columns["combo"].append(_encode(amenities, combos))
+                columns["price"].append(np.array(prices, dtype=np.float64))
+                columns["mask"].append(np.array([m or 0 for m in masks], dtype=np.int64))
+        dtypes = {"id": np.int64, "city": np.int32, "combo": np.int32, "price": np.float64, "mask": np.int64}
+        data = {name: np.concatenate(chunks) if chunks else np.empty(0, dtypes[name])
+                for name, chunks in columns.items()}
+
+        order = np.lexsort((data["id"], data["price"], data["city"]))
+        self.id = data["id"][order]
+        self.city = data["city"][order]
+        self.price = data["price"][order]
+        self.mask = data["mask"][order]
+        combo = data["combo"][order]
+
+        combo_labels = [None] * len(combos)
+        for text, code in combos.items():
+            combo_labels[code] = split_amenities(text)
+        self.amenity_count = np.array([len(c) for c in combo_labels], dtype=np.int16)[combo]
+
+        self.city_codes = cities
+        starts = np.searchsorted(self.city, np.arange(len(cities) + 1))
+        self.city_bounds = list(zip(starts[:-1], starts[1:]))
+
+        # Services disponibles par ville : union des combinaisons présentes dans la ville
+        self.city_amenities = [set() for _ in cities]
+        n_combos = max(len(combos), 1)
+        for pair in np.unique(self.city.astype(np.int64) * n_combos + combo).tolist():
+            self.city_amenities[pair // n_combos].update(combo_labels[pair % n_combos])
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def _city_slice(self, city: str):
+        code = self.city_codes.get(city_key(city))
+        return None if code is None else slice(*self.city_bounds[code])
+
+    def _amenity_match(self, masks: np.ndarray, requested: str):
+        """Masque booléen des hôtels qui ont tous les services demandés, None si un service est inconnu."""
+        wanted = amenity_masks(self.known_amenities, requested)
+        if wanted is None:
+            return None
+        required, any_of = wanted
+        match = (masks & required) == required
+        for mask in any_of:
+            match &= (masks & mask) != 0
+        return match
+
+    def _rows(self, positions: np.ndarray, columns: str) -> list:
+        """Relit les lignes des hôtels aux positions données, dans le même ordre."""
+        if not len(positions):
+            return []
+        return self.pool.fetchall(
+            f"SELECT {columns} FROM json_each(?) j JOIN hotels h ON h.id = j.value ORDER BY j.key",
+            (json.dumps(self.id[positions].tolist()),),
+        )
+
+    def by_comfort(self, city: str, min_amenities: int = 3) -> list:
+        """(nom, prix, services) des hôtels de `city` avec au moins `min_amenities` services, par prix croissant."""
+        part = self._city_slice(city)
+        if part is None:
+            return []
+        positions = part.start + np.flatnonzero(self.amenity_count[part] >= min_amenities)
+        return self._rows(positions, "h.name, h.price, h.amenities")
+
+    def cheapest_with_amenities(self, requested: str) -> list:
+        """(nom, ville, prix, services) de l'hôtel le moins cher, toutes villes confondues, qui a ces services."""
+        match = self._amenity_match(self.mask, requested)
+        if match is None or not match.any():
+            return []
+        candidates = np.flatnonzero(match)
+        cheapest = candidates[self.price[candidates] == self.price[candidates].min()]
+        # Ex aequo : le premier hôtel inséré, comme un parcours de la table
+        return self._rows(cheapest[[np.argmin(self.id[cheapest])]], "h.name, h.city, h.price, h.amenities")
+
+    def with_amenities(self, city: str, requested: str) -> list:
+        """(nom, prix, services) des hôtels de `city` qui ont tous les services demandés, par prix croissant."""
+        part = self._city_slice(city)
+        if part is None:
+            return []
+        match = self._amenity_match(self.mask[part], requested)
+        if match is None:
+            return []
+        return self._rows(part.start + np.flatnonzero(match), "h.name, h.price, h.amenities")
+
+    def amenities_in(self, city: str) -> set:
+        code = self.city_codes.get(city_key(city))
+        return set() if code is None else set(self.city_amenities[code])
+
+
+def hotels_snapshot(pool: ConnectionPool) -> HotelsSnapshot:
+    """Instantané des hôtels de `pool`, reconstruit si la base a changé depuis le dernier appel."""
+    return _cached("hotels", pool, HotelsSnapshot)
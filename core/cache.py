@@ -0,0 +1,160 @@
+"""
+Cache en mémoire (TTL + LRU borné) pour les outils des agents.
+
+    @cached_tool(ttl=300, depends_on=(FLIGHTS_DB_PATH,))
+    def search_flights(origin, destination=None, ...): ...
+
+- Clé = arguments normalisés (valeurs par défaut appliquées, texte en minuscules
+  sans accents) : search_flights("Paris") et search_flights(origin="paris ") partagent l'entrée.
+- Une entrée est invalidée si une base dont dépend l'outil change :
+  écriture dans ce processus (invalidate_db) ou dans un autre (générateur, autre worker),
+  détectée via l'empreinte du fichier.
+- Compteurs hits / misses / evictions par outil : cache_stats().
+
+TOOL_CACHE=0 désactive le cache (les outils sont appelés directement).
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from core.cities import normalize_key
+from core.db import db_signature
+
+CACHE_ENABLED = os.environ.get("TOOL_CACHE", "1") != "0"
+
+# Génération par base : incrémentée à chaque écriture connue dans ce processus
+_db_generations = {}
+_registry = {}
+
+
+def invalidate_db(path: str):
+    """À appeler après une écriture dans `path` : toutes les entrées qui en dépendent expirent."""
+    key = os.path.realpath(path)
+    _db_generations[key] = _db_generations.get(key, 0) + 1
+
+
+def _db_state(paths: tuple) -> tuple:
+    return tuple((_db_generations.get(p, 0), db_signature(p)) for p in paths)
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        return normalize_key(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class TTLCache:
+    """Dictionnaire LRU borné dont les entrées expirent après `ttl` secondes."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, state=None):
+        """Retourne (True, valeur) si présent, frais et calculé sur le même état des bases."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, entry_state, value = entry
+                if expires_at > now and entry_state == state:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, state=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, state, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def _is_error(result) -> bool:
+    # Les outils renvoient leurs erreurs sous forme de texte (core.records.tool_error) : on ne les met pas en cache
+    if isinstance(result, dict):
+        if result.get("error"):
+            return True
+        result = result.get("result")
+    return isinstance(result, str) and result.lstrip().lower().startswith("erreur")
+
+
+def cached_tool(ttl: float, maxsize: int = 256, depends_on: tuple = ()):
+    """
+    Décorateur de cache pour un outil.
+    La signature et la docstring sont conservées (functools.wraps) : ADK génère
+    toujours la même déclaration d'outil pour le LLM.
+    """
+    dep_paths = tuple(os.path.realpath(p) for p in depends_on)
+
+    def decorator(func):
+        sig = inspect.signature(func)
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        _registry[func.__name__] = cache
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return func(*args, **kwargs)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple((name, _normalize_value(value)) for name, value in bound.arguments.items())
+            state = _db_state(dep_paths)
+
+            found, value = cache.get(key, state)
+            if found:
+                return value
+            value = func(*args, **kwargs)
+            if not _is_error(value):
+                # État relu après l'appel : une migration faite pendant l'appel ne casse pas l'entrée
+                cache.set(key, value, _db_state(dep_paths))
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def cache_stats() -> dict:
+    """Statistiques par outil : {nom: {hits, misses, hit_rate, size, ...}}."""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def clear_caches():
+    for cache in _registry.values():
+        cache.clear()
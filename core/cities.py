@@ -0,0 +1,98 @@
+"""
+Normalisation des noms de villes, de compagnies et de services hôteliers.
+
+Toutes les recherches passent par une "clé" : minuscules (casefold), sans accents,
+espaces et tirets compactés. Les alias connus (anglais, français, codes IATA)
+pointent vers la même clé, ex : "Lisbon", "lisbonne", "LIS" -> "lisbonne".
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+_SEPARATORS = re.compile(r"[\s\-_'.]+")
+
+# clé canonique -> alias (noms usuels, traductions, codes ville/aéroport IATA)
+CITY_ALIASES = {
+    "paris": ["Paris", "PAR", "CDG", "ORY"],
+    "tokyo": ["Tokyo", "Tokio", "TYO", "NRT", "HND"],
+    "new york": ["New York", "New-York", "NY", "NYC", "Nueva York", "JFK", "EWR", "LGA"],
+    "berlin": ["Berlin", "BER"],
+    "london": ["London", "Londres", "Londra", "LON", "LHR", "LGW"],
+    "bangkok": ["Bangkok", "BKK"],
+    "lisbonne": ["Lisbonne", "Lisbon", "Lisboa", "LIS"],
+    "rome": ["Rome", "Roma", "ROM", "FCO"],
+    "madrid": ["Madrid", "MAD"],
+    "sydney": ["Sydney", "SYD"],
+}
+
+
+def normalize_key(text: str) -> str:
+    """'  Lisbonne ' -> 'lisbonne', 'Séville' -> 'seville', 'new-york' -> 'new york'."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _SEPARATORS.sub(" ", stripped.casefold()).strip()
+
+
+_ALIAS_TO_KEY = {
+    normalize_key(alias): key
+    for key, aliases in CITY_ALIASES.items()
+    for alias in aliases + [key]
+}
+
+
+@lru_cache(maxsize=4096)
+def city_key(name: str) -> str:
+    """Clé canonique d'une ville (alias résolus). Ville inconnue -> sa clé normalisée."""
+    key = normalize_key(name)
+    return _ALIAS_TO_KEY.get(key, key)
+
+
+@lru_cache(maxsize=1024)
+def airline_key(name: str) -> str:
+    """Clé d'une compagnie aérienne ('Air-France' -> 'air france')."""
+    return normalize_key(name)
+
+
+# Services hôteliers : synonymes fréquents -> clé du service en base
+AMENITY_ALIASES = {
+    "salle de sport": ["gym", "fitness", "sport"],
+    "wifi": ["wi fi", "internet"],
+    "petit dejeuner inclus": ["petit dejeuner", "breakfast"],
+    "piscine": ["pool", "swimming pool"],
+    "vue sur mer": ["vue mer", "sea view"],
+}
+
+_AMENITY_ALIAS_TO_KEY = {
+    normalize_key(alias): key
+    for key, aliases in AMENITY_ALIASES.items()
+    for alias in aliases
+}
+
+
+@lru_cache(maxsize=1024)
+def amenity_key(name: str) -> str:
+    """Clé d'un service hôtelier ('Gym' -> 'salle de sport', 'Petit-déjeuner inclus' -> 'petit dejeuner inclus')."""
+    key = normalize_key(name)
+    return _AMENITY_ALIAS_TO_KEY.get(key, key)
+
+
+def split_amenities(text: str) -> list:
+    """'WiFi, Spa,  ' -> ['WiFi', 'Spa']"""
+    return [a.strip() for a in (text or "").split(",") if a.strip()]
+
+
+def match_known_key(key: str, known_keys) -> list:
+    """
+    Rattrape une saisie approximative quand `key` n'existe pas en base :
+    'japan' -> ['japan airlines'], 'paris france' -> ['paris'].
+    Retourne la liste des clés connues qui contiennent `key` (comme l'ancien LIKE '%...%'),
+    ou qui figurent dans `key` comme mots entiers : 'ryanair' ne donne pas 'ana', 'romeo' pas 'rome'.
+    """
+    if not key:
+        return []
+    if key in known_keys:
+        return [key]
+    padded = f" {key} "
+    return sorted(k for k in known_keys if key in k or f" {k} " in padded)
@@ -0,0 +1,223 @@
+"""
+Recherches concurrentes : coalescence ("singleflight") et limite globale équitable.
+
+SingleFlight : deux requêtes identiques en cours ne lancent qu'un seul pipeline
+(Runner + LLM + outils). La première ("leader") le démarre dans une tâche ; les
+suivantes s'y abonnent et reçoivent tous les événements, y compris ceux déjà émis.
+
+    async for event in inflight.stream(key, lambda: pipeline(...)):
+        ...
+
+FairLimiter : au plus `limit` pipelines actifs. Au-delà, les demandes attendent
+dans une file servie à tour de rôle par client (un client qui envoie 50
+recherches d'un coup ne bloque pas les autres) ; file pleine -> QueueFull.
+
+    async with limiter.slot(client_ip):
+        ...
+
+Variables d'environnement :
+    SEARCH_CONCURRENCY   pipelines actifs max (défaut 8)
+    SEARCH_QUEUE_MAX     demandes en attente max (défaut 100)
+    SEARCH_COALESCE      "0" pour désactiver la coalescence (défaut 1)
+"""
+import asyncio
+import os
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from core.log import get_logger, request_id_var
+
+SEARCH_CONCURRENCY = int(os.environ.get("SEARCH_CONCURRENCY", "8"))
+SEARCH_QUEUE_MAX = int(os.environ.get("SEARCH_QUEUE_MAX", "100"))
+COALESCE_ENABLED = os.environ.get("SEARCH_COALESCE", "1") != "0"
+
+log = get_logger("concurrency")
+
+
+class QueueFull(Exception):
+    """Trop de demandes en attente : la requête est refusée plutôt que mise en file."""
+
+
+# ────────────────────────────────────────────
+# LIMITE GLOBALE (file équitable par client)
+# ────────────────────────────────────────────
+
+class FairLimiter:
+    """
+    Sémaphore asyncio dont la file est servie en round-robin par client.
+    Un créneau libéré est transmis directement au prochain servi (pas de course
+    avec les nouveaux arrivants) ; une attente annulée quitte la file.
+    """
+
+    def __init__(self, limit: int = SEARCH_CONCURRENCY, max_waiting: int = SEARCH_QUEUE_MAX):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = 0
+        self._waiters = OrderedDict()  # client -> deque de futures, dans l'ordre de service
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def busy(self) -> bool:
+        """True si une nouvelle demande devra attendre."""
+        return self.active >= self.limit or self.waiting > 0
+
+    async def acquire(self, client: str = "-"):
+        if not self.busy():
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise QueueFull(f"{self.waiting} demandes déjà en attente")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client, deque()).append(future)
+        self.waiting += 1
+        self.queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Le créneau nous avait été transmis : on le passe au suivant
+                self.release()
+            else:
+                self._forget(client, future)
+            raise
+        self.admitted += 1
+
+    def _forget(self, client: str, future):
+        queue = self._waiters.get(client)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self.waiting -= 1
+            if not queue:
+                del self._waiters[client]
+
+    def release(self):
+        while self._waiters:
+            client, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            self.waiting -= 1
+            # Round-robin : le client servi repasse en fin de tour s'il attend encore
+            if queue:
+                self._waiters.move_to_end(client)
+            else:
+                del self._waiters[client]
+            if not future.done():
+                future.set_result(None)  # le créneau change de main, `active` ne bouge pas
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, client: str = "-"):
+        await self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "clients_waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+# ────────────────────────────────────────────
+# COALESCENCE (singleflight)
+# ────────────────────────────────────────────
+
+class _Flight:
+    """Un pipeline en cours : événements déjà émis (rejoués aux abonnés tardifs) et abonnés."""
+
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.leader = request_id_var.get()
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self):
+        await self._changed.wait()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def stream(self, key, factory):
+        """
+        Événements du pipeline `factory()` pour `key`, partagé avec les requêtes identiques en cours.
+        Le pipeline tourne dans sa propre tâche : il continue si le leader se déconnecte,
+        et il est annulé quand plus personne ne l'écoute.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.get_running_loop().create_task(self._drive(key, flight, factory()))
+            self.leaders += 1
+        else:
+            self.followers += 1
+            log.info("recherche identique en cours : abonnement au pipeline de %s", flight.leader)
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(flight.items):
+                    item = flight.items[index]
+                    index += 1
+                    yield item
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Plus aucun client : inutile de continuer à consommer du LLM
+                self._discard(key, flight)
+                flight.task.cancel()
+
+    async def _drive(self, key, flight: _Flight, source):
+        try:
+            async for item in source:
+                flight.items.append(item)
+                flight.notify()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            self._discard(key, flight)
+            flight.notify()
+
+    def _discard(self, key, flight: _Flight):
+        # Une recherche terminée (ou abandonnée) n'est plus rejointe : la suivante repart de zéro
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def snapshot(self) -> dict:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "followers": self.followers}
@@ -0,0 +1,135 @@
+"""
+Historique borné des échanges du chat (/chat_refine), injecté dans le prompt de l'agent.
+
+    history = ChatHistory.from_dict(stored.get("chat"))
+    prompt_text += history.render()                      # "" tant qu'il n'y a aucun échange
+    ...
+    history.add(message, "refine_hotel_agent", {"hotels": hotels})
+    stored["chat"] = history.to_dict()                   # rangé avec les résultats de la session
+
+Chaque run d'agent a sa propre session ADK, supprimée à la fin : rien ne s'accumule côté
+ADK. Le contexte du chat est porté ici, sous une forme compacte et de taille bornée :
+- un échange = la demande, qui y a répondu et un résumé des résultats (nombre par type,
+  les CHAT_HISTORY_ITEMS premiers avec leur prix), jamais la sortie complète des outils ;
+- fenêtre glissante : seuls les CHAT_HISTORY_TURNS derniers échanges restent détaillés,
+  les plus anciens sont repliés dans un compteur par type de résultat ;
+- budget : si le texte rendu dépasse CHAT_HISTORY_TOKENS (estimation 4 caractères par
+  token), les échanges détaillés les plus anciens sont repliés à leur tour.
+
+Variables d'environnement :
+    CHAT_HISTORY_TOKENS   budget du bloc d'historique dans le prompt (défaut 300, 0 = désactivé)
+    CHAT_HISTORY_TURNS    échanges gardés en détail (défaut 4)
+    CHAT_HISTORY_ITEMS    résultats cités par échange (défaut 3)
+"""
+import os
+from dataclasses import asdict, dataclass, field
+
+CHAT_HISTORY_TOKENS = int(os.environ.get("CHAT_HISTORY_TOKENS", "300"))
+CHAT_HISTORY_TURNS = int(os.environ.get("CHAT_HISTORY_TURNS", "4"))
+CHAT_HISTORY_ITEMS = int(os.environ.get("CHAT_HISTORY_ITEMS", "3"))
+
+# Longueur max d'une demande recopiée dans l'historique
+MAX_MESSAGE_CHARS = 120
+
+KIND_LABELS = {"flights": "vols", "hotels": "hôtels", "activities": "activités"}
+_LABEL_FIELDS = {"flights": "airline", "hotels": "name", "activities": "name"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation sans tokenizer : ~4 caractères par token (texte français, Gemini)."""
+    return (len(text) + 3) // 4
+
+
+def _price(value) -> str:
+    """550.0 -> '550', '89.5' -> '89.5' (les parsers de texte donnent des chaînes)."""
+    try:
+        return f"{float(value):g}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def summarize_results(results: dict, limit: int = 3) -> dict:
+    """{"hotels": [dicts]} -> {"hotels": {"count": 12, "top": ["Manhattan Luxury Inn 550€", ...]}}."""
+    summary = {}
+    for kind, items in results.items():
+        if kind not in _LABEL_FIELDS or not items:
+            continue
+        field_name = _LABEL_FIELDS[kind]
+        summary[kind] = {"count": len(items),
+                         "top": [f"{item[field_name]} {_price(item.get('price'))}€" for item in items[:limit]]}
+    return summary
+
+
+@dataclass
+class ChatTurn:
+    message: str
+    answered_by: str           # nom de l'agent, ou "session" (filtre sur les résultats de la session)
+    results: dict = field(default_factory=dict)   # sortie de summarize_results
+
+    def render(self) -> str:
+        if self.results:
+            found = " ; ".join(f"{KIND_LABELS[kind]} : {r['count']} ({', '.join(r['top'])})"
+                               for kind, r in self.results.items())
+        else:
+            found = "aucun résultat"
+        return f'- "{self.message}" -> {self.answered_by} : {found}'
+
+
+@dataclass
+class ChatHistory:
+    turns: list = field(default_factory=list)     # ChatTurn, du plus ancien au plus récent
+    folded: int = 0                               # échanges repliés (plus détaillés)
+    folded_kinds: dict = field(default_factory=dict)   # type de résultat -> nombre d'échanges repliés
+
+    @classmethod
+    def from_dict(cls, data: dict = None) -> "ChatHistory":
+        if not data:
+            return cls()
+        return cls(turns=[ChatTurn(**t) for t in data.get("turns", ())], folded=data.get("folded", 0),
+                   folded_kinds=dict(data.get("folded_kinds", {})))
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def _fold_oldest(self):
+        turn = self.turns.pop(0)
+        self.folded += 1
+        for kind in turn.results:
+            self.folded_kinds[kind] = self.folded_kinds.get(kind, 0) + 1
+
+    def add(self, message: str, answered_by: str, results: dict, window: int = None):
+        """Ajoute un échange (résultats complets : seul leur résumé est gardé) et applique la fenêtre."""
+        window = CHAT_HISTORY_TURNS if window is None else window
+        message = " ".join((message or "").split())
+        if len(message) > MAX_MESSAGE_CHARS:
+            message = message[:MAX_MESSAGE_CHARS - 1] + "…"
+        self.turns.append(ChatTurn(message, answered_by, summarize_results(results, CHAT_HISTORY_ITEMS)))
+        while len(self.turns) > max(window, 0):
+            self._fold_oldest()
+
+    def _text(self) -> str:
+        lines = []
+        if self.folded:
+            kinds = ", ".join(f"{KIND_LABELS[k]} x{n}" for k, n in sorted(self.folded_kinds.items()))
+            lines.append(f"- {self.folded} échange(s) plus ancien(s)" + (f" ({kinds})" if kinds else ""))
+        lines.extend(turn.render() for turn in self.turns)
+        return "HISTORIQUE DU CHAT (du plus ancien au plus récent) :\n" + "\n".join(lines)
+
+    def render(self, budget: int = None) -> str:
+        """
+        Bloc à ajouter au prompt, au plus `budget` tokens estimés.
+
+        Args:
+            budget: tokens max du bloc (None : CHAT_HISTORY_TOKENS, 0 : historique désactivé)
+
+        Returns:
+            "\\n\\n" + bloc, ou "" (aucun échange, ou historique désactivé)
+        """
+        budget = CHAT_HISTORY_TOKENS if budget is None else budget
+        if budget <= 0 or not (self.turns or self.folded):
+            return ""
+        text = self._text()
+        while estimate_tokens(text) > budget and self.turns:
+            self._fold_oldest()
+            text = self._text()
+        return "\n\n" + text
@@ -0,0 +1,223 @@
+"""
+Couche d'accès SQLite partagée par tous les outils.
+
+Chaque base (flights, hotels, activities, memory) possède UN pool de connexions
+longue durée, borné, thread-safe et utilisable depuis asyncio :
+- les connexions sont ouvertes une seule fois (pas de re-parsing du schéma à chaque appel),
+- mode WAL + synchronous=NORMAL : les lectures ne bloquent plus les écritures,
+- le cache de requêtes préparées de sqlite3 (cached_statements) est réutilisé
+  tant que le texte SQL est constant.
+
+Usage :
+    pool = get_pool(FLIGHTS_DB_PATH)
+    rows = pool.fetchall("SELECT ... WHERE origin = ?", (origin,))
+
+    with pool.transaction() as conn:
+        conn.execute("INSERT ...", params)
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from core.aio import run_blocking
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# TRAVEL_DATA_DIR : autre dossier de bases (copies de benchmark, tests de charge)
+DATA_DIR = os.environ.get("TRAVEL_DATA_DIR") or os.path.normpath(os.path.join(BASE_DIR, '..', 'data'))
+
+FLIGHTS_DB_PATH = os.path.join(DATA_DIR, 'flights.db')
+HOTELS_DB_PATH = os.path.join(DATA_DIR, 'hotels.db')
+ACTIVITIES_DB_PATH = os.path.join(DATA_DIR, 'activities.db')
+MEMORY_DB_PATH = os.path.join(DATA_DIR, 'memory.db')
+
+# Taille max d'un pool (surchargeable par variable d'environnement)
+DEFAULT_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+# Nombre de requêtes préparées gardées en cache par connexion
+STATEMENT_CACHE_SIZE = 256
+# Temps max d'attente d'une connexion libre (secondes)
+ACQUIRE_TIMEOUT = 10.0
+
+
+class PoolTimeout(Exception):
+    """Aucune connexion libre n'a pu être obtenue dans le délai imparti."""
+
+
+class ConnectionPool:
+    """
+    Pool borné de connexions SQLite pour UNE base de données.
+
+    Les connexions sont créées à la demande jusqu'à max_size puis recyclées.
+    Une connexion n'est jamais utilisée par deux threads en même temps.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_POOL_SIZE, timeout: float = ACQUIRE_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # ─── Cycle de vie des connexions ───
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _get(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError(f"Pool fermé : {self.path}")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"Pool saturé ({self.max_size} connexions) : {self.path}")
+
+    def _put(self, conn: sqlite3.Connection):
+        if self._closed:
+            # Pool fermé pendant l'emprunt : même comptabilité qu'une connexion écartée
+            self._discard(conn)
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        """Emprunte une connexion au pool et la rend à la sortie du bloc."""
+        conn = self._get()
+        try:
+            yield conn
+        finally:
+            self._put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Comme connection(), mais COMMIT en sortie (ROLLBACK en cas d'erreur)."""
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    def close(self):
+        """Ferme toutes les connexions inactives ; les connexions empruntées seront fermées au retour."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    # ─── Raccourcis ───
+
+    def fetchall(self, sql: str, params=()) -> list:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def fetchone(self, sql: str, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def execute(self, sql: str, params=()) -> int:
+        """Exécute une écriture dans sa propre transaction. Retourne rowcount."""
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def executemany(self, sql: str, seq_params) -> int:
+        with self.transaction() as conn:
+            return conn.executemany(sql, seq_params).rowcount
+
+    # ─── Variantes asyncio (ne bloquent pas la boucle d'événements) ───
+    # Exécutées dans le pool borné des outils (core.aio, TOOL_THREADS), pas l'exécuteur par défaut
+
+    async def afetchall(self, sql: str, params=()) -> list:
+        return await run_blocking(self.fetchall, sql, params)
+
+    async def afetchone(self, sql: str, params=()):
+        return await run_blocking(self.fetchone, sql, params)
+
+    async def aexecute(self, sql: str, params=()) -> int:
+        return await run_blocking(self.execute, sql, params)
+
+
+# ────────────────────────────────────────────
+# REGISTRE : un pool par fichier de base
+# ────────────────────────────────────────────
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str, max_size: int = DEFAULT_POOL_SIZE) -> ConnectionPool:
+    """Retourne le pool associé à `path` (créé au premier appel)."""
+    key = os.path.realpath(path)
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key, max_size=max_size)
+            _pools[key] = pool
+        return pool
+
+
+def db_signature(path: str) -> tuple:
+    """
+    Empreinte (mtime, taille) du fichier de base et de son journal WAL.
+    Change dès qu'un autre processus (générateur, autre worker) écrit dans la base.
+    """
+    sig = []
+    for p in (path, path + "-wal"):
+        try:
+            st = os.stat(p)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def close_all_pools():
+    """Ferme tous les pools (arrêt de l'application, reconstruction d'une base...)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
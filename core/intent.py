@@ -0,0 +1,110 @@
+"""
+Routage local des demandes de raffinement (/chat_refine), sans LLM ni embeddings.
+
+    route = classify_refine("un hôtel avec piscine moins cher")
+    route.intent      # "hotel"  ("flight", "hotel", "activity" ou None)
+    route.confident   # True -> l'agent spécialisé est appelé directement, sans refine_supervisor
+
+Vocabulaire repris des règles de routage du refine_supervisor (restaurants, vegan,
+tapas... / hôtel, spa, piscine... / vols, compagnies...), comparé sur des mots normalisés
+(minuscules, sans accents, pluriel simple). Chaque intention a des mots "forts"
+(le sujet de la demande : hôtel, vol, restaurant) qui pèsent 2 et des mots d'attribut
+(piscine, vegan, escale) qui pèsent 1.
+
+Décision confiante si une intention a des indices et au moins deux fois le score de
+la suivante ("hôtel avec spa près de la plage" -> hôtel, 3 contre 1) ; sinon (aucun
+indice, ou "restaurant près de l'hôtel", 2 contre 2) la demande reste au LLM.
+
+Variables d'environnement :
+    REFINE_ROUTER   "local" (défaut) : routeur local, LLM si ambigu ; "llm" : toujours refine_supervisor
+"""
+import os
+import re
+from dataclasses import dataclass, field
+
+from core.cities import normalize_key
+
+REFINE_ROUTER = os.environ.get("REFINE_ROUTER", "local").lower()
+
+STRONG, WEAK = 2, 1
+
+# intention -> {mot normalisé (singulier) : poids}
+VOCABULARY = {
+    "activity": {
+        **dict.fromkeys((
+            "restaurant", "resto", "nourriture", "manger", "cuisine", "gastronomie", "activite",
+            "musee", "visite", "tourisme", "monument", "parc", "diner", "dejeuner", "brunch", "bar",
+        ), STRONG),
+        **dict.fromkeys((
+            "tapas", "vegan", "vegetarien", "sushi", "pizza", "italien", "japonais", "street", "food",
+            "terrasse", "gastronomique", "plat", "menu", "expo", "exposition", "galerie", "art",
+            "jardin", "plage", "balade", "excursion", "spectacle", "concert", "culture", "culturel",
+            "historique", "chateau", "cathedrale", "eglise", "marche", "shopping", "soiree", "romantique",
+        ), WEAK),
+    },
+    "hotel": {
+        **dict.fromkeys(("hotel", "hebergement", "logement", "chambre", "auberge", "airbnb", "dormir"), STRONG),
+        **dict.fromkeys((
+            "spa", "piscine", "wifi", "parking", "climatisation", "fitness", "etoile", "suite", "lit", "nuit",
+            "nuitee", "reception", "jacuzzi", "sauna",
+        ), WEAK),
+    },
+    "flight": {
+        **dict.fromkeys(("vol", "avion", "compagnie", "aerien", "aerienne", "billet", "aeroport"), STRONG),
+        **dict.fromkeys((
+            "escale", "direct", "depart", "decoller", "atterrir", "arrivee", "retour", "aller",
+            "airline", "partir", "bagage", "soute", "classe", "business", "economique",
+        ), WEAK),
+    },
+}
+
+# Expressions de plusieurs mots, cherchées avant le découpage (clé normalisée -> intention, poids)
+PHRASES = {
+    "petit dejeuner": ("hotel", WEAK),
+    "salle de sport": ("hotel", WEAK),
+    "budget hotel": ("hotel", STRONG),
+    "budget vol": ("flight", STRONG),
+    "street food": ("activity", WEAK),
+    "air france": ("flight", STRONG),
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class RefineRoute:
+    intent: str = None
+    confident: bool = False
+    scores: dict = field(default_factory=dict)
+    cues: list = field(default_factory=list)   # mots reconnus, dans l'ordre du message
+
+
+def _lookup(word: str):
+    for intent, words in VOCABULARY.items():
+        weight = words.get(word)
+        if weight is None and len(word) > 3 and word[-1] in "sx":
+            weight = words.get(word[:-1])
+        if weight is not None:
+            yield intent, weight
+
+
+def classify_refine(message: str) -> RefineRoute:
+    """Intention de la demande et niveau de confiance (voir la docstring du module)."""
+    text = normalize_key(message or "")
+    scores = {intent: 0 for intent in VOCABULARY}
+    cues = []
+    for phrase, (intent, weight) in PHRASES.items():
+        if phrase in text:
+            scores[intent] += weight
+            cues.append(phrase)
+            text = text.replace(phrase, " ")
+    for word in _WORD_RE.findall(text):
+        for intent, weight in _lookup(word):
+            scores[intent] += weight
+            cues.append(word)
+
+    ranked = sorted(scores.items(), key=lambda item: -item[1])
+    (best, top), (_, second) = ranked[0], ranked[1]
+    if not top:
+        return RefineRoute(scores=scores)
+    return RefineRoute(intent=best, confident=top >= 2 * second, scores=scores, cues=cues)
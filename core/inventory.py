@@ -0,0 +1,183 @@
+"""
+Inventaire de secours ("fallback") pour search_hotels.
+
+Quand aucun hôtel réel ne correspond, on propose des hôtels synthétiques
+générés EN MÉMOIRE : la recherche reste une lecture pure, sans INSERT ni
+verrou d'écriture sur hotels.db.
+
+- Les candidats sont déterministes : la même demande renvoie le même hôtel.
+- La persistance est optionnelle (HOTEL_FALLBACK_PERSIST=1) : les hôtels
+  proposés sont mis en file et écrits par lots par un thread d'arrière-plan.
+
+Variables d'environnement :
+    HOTEL_FALLBACK          "memory" (défaut) ou "off" (aucun hôtel synthétique)
+    HOTEL_FALLBACK_PERSIST  "1" pour écrire les hôtels synthétiques en base
+"""
+import atexit
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timedelta
+
+from core.cache import invalidate_db
+from core.cities import city_key, split_amenities
+from core.db import HOTELS_DB_PATH, get_pool
+from core.log import get_logger
+from core.schema import ensure_hotels_schema, index_hotels
+
+FALLBACK_MODE = os.environ.get("HOTEL_FALLBACK", "memory").lower()
+PERSIST_FALLBACK = os.environ.get("HOTEL_FALLBACK_PERSIST", "0") == "1"
+
+HOTEL_SUFFIXES = ['Plaza', 'Royal', 'Grand', 'View', 'Palace']
+BASE_AMENITIES = ["WiFi", "Climatisation"]
+
+log = get_logger("inventory")
+
+
+def synthesize_hotel(city: str, budget: float = 1000000, amenities: str = None,
+                     date_start: str = None) -> tuple:
+    """
+    Génère un hôtel compatible avec la demande, au format des lignes SQL :
+    (city, name, price, amenities, available_start, available_end).
+    """
+    # Graine dérivée de la demande : résultat stable d'un appel à l'autre
+    rng = random.Random(f"{city_key(city)}|{budget}|{amenities}|{date_start}")
+
+    name = f"{city} {rng.choice(HOTEL_SUFFIXES)} Hotel"
+
+    # Prix cohérent avec le budget (ou par défaut)
+    max_price = budget if budget < 10000 else 300
+    price = rng.randint(max(50, int(max_price / 2)), max(50, int(max_price)))
+
+    # Services demandés + bonus (ordre stable, sans doublon)
+    services = list(dict.fromkeys(BASE_AMENITIES + split_amenities(amenities)))
+
+    # Dates compatibles (englobent la demande)
+    try:
+        req_start = datetime.strptime(date_start, "%Y-%m-%d") if date_start else None
+    except ValueError:
+        req_start = None
+    if req_start:
+        start = (req_start - timedelta(days=rng.randint(1, 5))).strftime("%Y-%m-%d")
+        end = (req_start + timedelta(days=rng.randint(7, 30))).strftime("%Y-%m-%d")
+    else:
+        # Dates par défaut si aucune date demandée (prochains mois)
+        start, end = "2026-04-01", "2026-08-31"
+
+    return (city, name, float(price), ", ".join(services), start, end)
+
+
+def fallback_hotels(city: str, budget: float = 1000000, amenities: str = None,
+                    date_start: str = None) -> list:
+    """Candidats de secours pour une recherche sans résultat ([] si le mode est "off")."""
+    if FALLBACK_MODE == "off":
+        return []
+    rows = [synthesize_hotel(city, budget, amenities, date_start)]
+    if PERSIST_FALLBACK:
+        get_persister().submit(rows)
+    return rows
+
+
+# ────────────────────────────────────────────
+# PERSISTANCE OPTIONNELLE, PAR LOTS, EN ARRIÈRE-PLAN
+# ────────────────────────────────────────────
+
+# Signal d'arrêt du thread d'écriture (mis en file après les dernières lignes)
+_STOP = object()
+
+
+class FallbackPersister:
+    """
+    Thread unique qui écrit les hôtels synthétiques par lots (une transaction par lot).
+    Les doublons (même ville, nom et dates) ne sont écrits qu'une fois : index UNIQUE
+    idx_hotels_identity (core.schema) et INSERT OR IGNORE groupé.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 100, flush_interval: float = 2.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._seen = set()
+        self._thread = threading.Thread(target=self._run, name="hotel-fallback-persister", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows: list):
+        for row in rows:
+            self._queue.put(row)
+
+    def close(self, timeout: float = 10.0):
+        """Arrêt du processus : le thread écrit ce qui reste en file puis s'arrête ; on attend sa fin."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _drain(self) -> tuple:
+        """(lot, arrêt demandé) : le signal d'arrêt passe après les lignes mises en file avant lui."""
+        batch = []
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+            while True:
+                if item is _STOP:
+                    return batch, True
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                item = self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._drain()
+            if batch:
+                try:
+                    self.write(batch)
+                except Exception as e:
+                    log.warning("persistance des hôtels de secours impossible : %s", e)
+            if stop:
+                return
+
+    def write(self, batch: list) -> int:
+        """Écrit un lot (appelé par le thread, ou directement pour un job ponctuel)."""
+        if len(self._seen) > 100_000:
+            self._seen.clear()
+        rows = []
+        for row in batch:
+            key = (city_key(row[0]), row[1], row[4], row[5])
+            if key not in self._seen:
+                self._seen.add(key)
+                rows.append(row)
+        if not rows:
+            return 0
+
+        pool = get_pool(self.db_path)
+        ensure_hotels_schema(pool)
+        with pool.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO hotels (city, name, price, amenities, available_start, available_end) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows,
+            )
+            inserted = conn.total_changes - before
+            # Verrou d'écriture tenu par la transaction : les lignes insérées ont les derniers id, consécutifs
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0] if inserted else 0
+            index_hotels(conn, range(last_id - inserted + 1, last_id + 1))
+        if inserted:
+            invalidate_db(self.db_path)
+        return inserted
+
+
+_persister = None
+_persister_lock = threading.Lock()
+
+
+def get_persister() -> FallbackPersister:
+    global _persister
+    if _persister is None:
+        with _persister_lock:
+            if _persister is None:
+                _persister = FallbackPersister(HOTELS_DB_PATH)
+                atexit.register(_persister.close)
+    return _persister
@@ -0,0 +1,169 @@
+"""
+Journalisation structurée, hors du chemin critique.
+
+    from core.log import get_logger
+    log = get_logger(__name__)
+    log.info("recherche %s -> %s", origin, destination)   # formaté plus tard, dans le thread d'écriture
+
+- Les appels ne font qu'empiler l'enregistrement dans une file (QueueHandler) ;
+  un thread (QueueListener) formate et écrit sur stderr : un terminal lent ne
+  ralentit plus les réponses SSE.
+- Chaque requête HTTP reçoit un identifiant de corrélation (en-tête X-Request-ID
+  repris s'il est fourni), présent dans chaque ligne ; il suit les outils exécutés
+  dans le pool de threads (core.aio.run_blocking copie le contexte).
+- Échantillonnage : les logs DEBUG ne sont gardés que pour une fraction des requêtes
+  (toutes les lignes d'une requête retenue, aucune des autres).
+- LOG_LEVEL=off : aucun handler et un niveau au-dessus de CRITICAL -> chaque appel
+  se réduit à une lecture du cache de niveaux du logger (rien n'est créé ni formaté).
+
+Variables d'environnement :
+    LOG_LEVEL    DEBUG, INFO (défaut), WARNING, ERROR ou off
+    LOG_FORMAT   "text" (défaut) ou "json" (une ligne JSON par événement)
+    LOG_SAMPLE   fraction des requêtes dont les logs DEBUG sont gardés (défaut 1.0)
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+import zlib
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_SAMPLE = float(os.environ.get("LOG_SAMPLE", "1.0"))
+
+ROOT_LOGGER = "travel"
+
+# Identifiant de la requête en cours et décision d'échantillonnage (DEBUG gardé ou non)
+request_id_var = contextvars.ContextVar("request_id", default="-")
+sampled_var = contextvars.ContextVar("log_sampled", default=True)
+
+_listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """'main' -> logger 'travel.main' (tous les loggers de l'application partagent la même file)."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def bind_request(request_id: str = None) -> str:
+    """Associe un identifiant (et la décision d'échantillonnage) au contexte courant."""
+    request_id = request_id or new_request_id()
+    request_id_var.set(request_id)
+    # Décision stable pour un identifiant donné : tous les workers gardent les mêmes requêtes
+    sampled_var.set(LOG_SAMPLE >= 1.0 or zlib.crc32(request_id.encode()) % 10_000 < LOG_SAMPLE * 10_000)
+    return request_id
+
+
+class ContextFilter(logging.Filter):
+    """Ajoute request_id à l'enregistrement ; écarte les DEBUG des requêtes non échantillonnées."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.INFO and not sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler sans formatage dans le thread appelant (prepare() de la stdlib formate
+    le message avant de l'empiler) : msg et args sont formatés par le thread d'écriture.
+    Les arguments passés au logger ne doivent donc pas être modifiés après l'appel.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s"
+
+
+def setup_logging(level: str = None, fmt: str = None, stream=None) -> logging.Logger:
+    """
+    Configure le logger 'travel' (idempotent) et démarre le thread d'écriture.
+    Retourne le logger racine de l'application.
+    """
+    global _listener
+    level = (level or LOG_LEVEL).upper()
+    fmt = (fmt or LOG_FORMAT).lower()
+    root = logging.getLogger(ROOT_LOGGER)
+
+    stop_logging()
+    root.propagate = False
+
+    if level == "OFF":
+        # Mode production "zéro coût" : isEnabledFor() répond False depuis son cache
+        root.setLevel(logging.CRITICAL + 1)
+        return root
+    root.setLevel(level)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if fmt == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter(_TEXT_FORMAT, datefmt="%H:%M:%S"))
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    root.addHandler(handler)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    return root
+
+
+def stop_logging():
+    """Vide la file et arrête le thread d'écriture (fin du processus, changement de configuration)."""
+    global _listener
+    if _listener is not None:
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI : un identifiant de corrélation par requête HTTP, disponible pour
+    tout le traitement (y compris le générateur SSE) et renvoyé dans l'en-tête X-Request-ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope.get("headers") or ()).get(b"x-request-id")
+        request_id = bind_request(incoming.decode("latin-1")[:64] if incoming else None)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_id)
@@ -0,0 +1,148 @@
+"""
+Préférences mémorisées par utilisateur (data/memory.db), lues à chaque prompt.
+
+    store = get_memory_store()
+    store.save("user_42", ["vegan", "terrasse"])   # (["vegan", "terrasse"], [])  sauvegardées, déjà connues
+    store.preferences("user_42")                   # ("vegan", "terrasse"), par score décroissant
+    store.prompt("user_42")                        # "Préférences connues de l'utilisateur : vegan, terrasse"
+
+- Une ligne par (utilisateur, préférence), index UNIQUE (core.schema.migrate_memory).
+  Une sauvegarde coûte au plus quatre requêtes quel que soit le nombre de préférences :
+  lecture des préférences de l'utilisateur, suppression groupée des oubliées,
+  INSERT OR IGNORE groupé (executemany) des nouvelles, UPDATE qui renforce les connues.
+- Oubli progressif : score = hits x 0,5 ^ (jours depuis la dernière mention / MEMORY_HALF_LIFE_DAYS).
+  Sous MEMORY_MIN_SCORE, une préférence n'est plus lue ; elle est supprimée à la
+  sauvegarde suivante du même utilisateur (et compte à nouveau comme nouvelle).
+- Lecture en cache par utilisateur (core.cache.TTLCache) : invalidée par save() dans ce
+  processus, par l'empreinte du fichier (db_signature) si un autre worker écrit, et par
+  MEMORY_CACHE_TTL pour suivre le vieillissement des scores.
+
+Variables d'environnement :
+    MEMORY_HALF_LIFE_DAYS   demi-vie d'une préférence non reprise (défaut 30)
+    MEMORY_MIN_SCORE        score en dessous duquel elle est oubliée (défaut 0.25 : deux demi-vies pour une mention)
+    MEMORY_MAX_PREFS        préférences lues par utilisateur (défaut 20)
+    MEMORY_CACHE_TTL        durée de vie du cache de lecture en secondes (défaut 60)
+"""
+import os
+import threading
+import time
+
+from core.cache import TTLCache
+from core.db import MEMORY_DB_PATH, db_signature, get_pool
+from core.schema import DEFAULT_MEMORY_USER, ensure_memory_schema
+
+MEMORY_HALF_LIFE_DAYS = float(os.environ.get("MEMORY_HALF_LIFE_DAYS", "30"))
+MEMORY_MIN_SCORE = float(os.environ.get("MEMORY_MIN_SCORE", "0.25"))
+MEMORY_MAX_PREFS = int(os.environ.get("MEMORY_MAX_PREFS", "20"))
+MEMORY_CACHE_TTL = float(os.environ.get("MEMORY_CACHE_TTL", "60"))
+
+DAY = 86400.0
+
+
+def split_preferences(preferences: str) -> list:
+    """'Japonais, Pas cher,  japonais' -> ['japonais', 'pas cher'] (minuscules, sans doublons)."""
+    return list(dict.fromkeys(p.strip().lower() for p in (preferences or "").split(",") if p.strip()))
+
+
+def format_preferences(preferences) -> str:
+    """Texte injecté dans un prompt (format historique de l'outil load_memory)."""
+    return f"Préférences connues de l'utilisateur : {', '.join(preferences)}"
+
+
+def decay_score(hits: int, last_seen_at: float, now: float) -> float:
+    """Poids d'une préférence : nombre de mentions, divisé par deux à chaque demi-vie sans mention."""
+    age_days = max(0.0, now - (last_seen_at or now)) / DAY
+    return hits * 0.5 ** (age_days / MEMORY_HALF_LIFE_DAYS)
+
+
+class MemoryStore:
+    """Préférences par utilisateur dans une base SQLite (pool core.db), lecture en cache."""
+
+    def __init__(self, path: str = MEMORY_DB_PATH, cache_size: int = 1024, cache_ttl: float = MEMORY_CACHE_TTL):
+        self.pool = get_pool(path)
+        self.path = self.pool.path
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def _pool(self):
+        ensure_memory_schema(self.pool)
+        return self.pool
+
+    def save(self, user_id: str, preferences: list, now: float = None) -> tuple:
+        """
+        Enregistre les préférences d'un utilisateur (nouvelles insérées, connues renforcées).
+
+        Args:
+            user_id: identifiant de l'utilisateur (None : utilisateur par défaut)
+            preferences: préférences déjà découpées (voir split_preferences)
+            now: horodatage (time.time() par défaut)
+
+        Returns:
+            (préférences sauvegardées, préférences déjà connues)
+        """
+        user_id = user_id or DEFAULT_MEMORY_USER
+        items = list(dict.fromkeys(p.strip().lower() for p in preferences if p and p.strip()))
+        if not items:
+            return [], []
+        now = time.time() if now is None else now
+        with self._pool().transaction() as conn:
+            # Préférences de l'utilisateur (préfixe de l'index UNIQUE), bornées par l'oubli
+            rows = conn.execute("SELECT id, preferences, hits, last_seen_at FROM memory WHERE user_id = ?",
+                                (user_id,)).fetchall()
+            live, stale = set(), []
+            for rid, pref, hits, seen in rows:
+                if decay_score(hits, seen, now) < MEMORY_MIN_SCORE:
+                    stale.append((rid,))
+                else:
+                    live.add(pref)
+            known = live.intersection(items)
+            if stale:
+                conn.executemany("DELETE FROM memory WHERE id = ?", stale)
+            saved = [p for p in items if p not in known]
+            conn.executemany(
+                "INSERT OR IGNORE INTO memory (user_id, preferences, created_at, last_seen_at, hits) VALUES (?, ?, ?, ?, 1)",
+                [(user_id, p, now, now) for p in saved],
+            )
+            if known:
+                conn.execute(f"UPDATE memory SET hits = hits + 1, last_seen_at = ? "
+                             f"WHERE user_id = ? AND preferences IN ({', '.join('?' * len(known))})",
+                             (now, user_id, *known))
+        self._cache.delete(user_id)
+        return saved, [p for p in items if p in known]
+
+    def preferences(self, user_id: str) -> tuple:
+        """Préférences actives de l'utilisateur, les plus fortes d'abord (au plus MEMORY_MAX_PREFS)."""
+        user_id = user_id or DEFAULT_MEMORY_USER
+        state = db_signature(self.path)
+        found, prefs = self._cache.get(user_id, state)
+        if found:
+            return prefs
+        now = time.time()
+        rows = self._pool().fetchall(
+            "SELECT preferences, hits, last_seen_at FROM memory WHERE user_id = ?", (user_id,))
+        scored = sorted(((decay_score(hits, seen, now), p) for p, hits, seen in rows), key=lambda r: -r[0])
+        prefs = tuple(p for score, p in scored if score >= MEMORY_MIN_SCORE)[:MEMORY_MAX_PREFS]
+        self._cache.set(user_id, prefs, state)
+        return prefs
+
+    def prompt(self, user_id: str) -> str:
+        """Texte injecté dans le prompt (même format que l'outil load_memory)."""
+        return format_preferences(self.preferences(user_id))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_memory_store(path: str = MEMORY_DB_PATH) -> MemoryStore:
+    """Store associé à la base `path` (créé au premier appel, cache partagé par le processus)."""
+    key = os.path.realpath(path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = _stores[key] = MemoryStore(key)
+    return store
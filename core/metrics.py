@@ -0,0 +1,223 @@
+"""
+Temps passé dans chaque étape du chemin critique, agrégé en histogrammes.
+
+    from core.metrics import span, timed
+    with span("render.results_html"):
+        html = template.render(...)
+
+    @timed("parse.flights")
+    def parse_flights(text): ...
+
+- Chaque étape alimente l'histogramme travel_stage_seconds{stage="..."}, servi au
+  format texte Prometheus par /metrics (render_prometheus()).
+- Une requête peut aussi ouvrir un relevé (start_request_timings()) : les étapes
+  exécutées dans son contexte, y compris les outils lancés dans le pool de threads
+  (core.aio.run_blocking copie le contexte), y sont cumulées -> résumé par requête.
+- Une recherche coalescée (core.concurrency.SingleFlight) tourne dans la tâche du
+  leader : ses étapes ne sont comptées que dans le relevé de la première requête.
+
+Variables d'environnement :
+    METRICS   "0" pour désactiver les mesures (span et timed ne font plus rien)
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.environ.get("METRICS", "1") != "0"
+
+# Bornes (secondes) : du cache d'outil (~0,1 ms) à un run complet du supervisor (dizaines de secondes)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+request_timings_var = contextvars.ContextVar("request_timings", default=None)
+
+
+# ────────────────────────────────────────────
+# HISTOGRAMMES
+# ────────────────────────────────────────────
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    """Histogramme à une étiquette (compteurs par tranche, somme et nombre d'observations par valeur)."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # valeur d'étiquette -> [compteurs par tranche (+Inf en dernier), somme, nombre]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, seconds: float):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> dict:
+        """valeur d'étiquette -> {"count", "sum", "buckets": [(borne, cumul), ...]}."""
+        with self._lock:
+            series = {k: (list(counts), total, n) for k, (counts, total, n) in self._series.items()}
+        result = {}
+        for label_value, (counts, total, n) in sorted(series.items()):
+            cumulative, running = [], 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                cumulative.append((bound, running))
+            result[label_value] = {"count": n, "sum": total, "buckets": cumulative}
+        return result
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_value, series in self.snapshot().items():
+            label = f'{self.label}="{_escape(label_value)}"'
+            for bound, cumulative in series["buckets"]:
+                lines.append(f'{self.name}_bucket{{{label},le="{_number(bound)}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {series['sum']!r}")
+            lines.append(f"{self.name}_count{{{label}}} {series['count']}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("travel_stage_seconds", "Durée de chaque étape du traitement d'une requête.", "stage")
+REQUEST_SECONDS = Histogram("travel_request_seconds", "Durée totale des flux SSE, par endpoint.", "endpoint")
+
+_HISTOGRAMS = (STAGE_SECONDS, REQUEST_SECONDS)
+
+
+def render_prometheus() -> str:
+    """Toutes les séries au format d'exposition texte de Prometheus (version 0.0.4)."""
+    lines = []
+    for histogram in _HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    for histogram in _HISTOGRAMS:
+        histogram.reset()
+
+
+# ────────────────────────────────────────────
+# RELEVÉ PAR REQUÊTE
+# ────────────────────────────────────────────
+
+class RequestTimings:
+    """Temps cumulé et nombre de passages par étape pour une requête."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                self._stages[stage] = [seconds, 1]
+            else:
+                entry[0] += seconds
+                entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def summary(self) -> dict:
+        """{"total_ms", "stages": {étape: {"ms", "count"}}}, étapes par temps décroissant."""
+        with self._lock:
+            stages = sorted(self._stages.items(), key=lambda item: -item[1][0])
+        return {
+            "total_ms": round(self.elapsed() * 1000, 2),
+            "stages": {stage: {"ms": round(seconds * 1000, 2), "count": count}
+                       for stage, (seconds, count) in stages},
+        }
+
+    def finish(self):
+        """Fin du flux : durée totale dans travel_request_seconds."""
+        if METRICS_ENABLED:
+            REQUEST_SECONDS.observe(self.endpoint, self.elapsed())
+
+
+def start_request_timings(endpoint: str) -> RequestTimings:
+    """Ouvre le relevé de la requête courante (contexte de la tâche qui sert le flux)."""
+    timings = RequestTimings(endpoint)
+    request_timings_var.set(timings)
+    return timings
+
+
+# ────────────────────────────────────────────
+# MESURES
+# ────────────────────────────────────────────
+
+def record(stage: str, seconds: float):
+    """Ajoute une durée déjà mesurée à l'histogramme et au relevé de la requête courante."""
+    if not METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(stage, seconds)
+    timings = request_timings_var.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """Mesure le bloc (exceptions comprises)."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timed(stage: str):
+    """Décorateur : mesure chaque appel de la fonction (sync ou async) sous le nom `stage`."""
+
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    record(stage, time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
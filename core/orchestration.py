@@ -0,0 +1,155 @@
+"""
+Orchestration de branches : chaque branche démarre dès que celles dont elle dépend
+ont fini, les branches indépendantes tournent en même temps (asyncio.gather).
+
+    branches = [
+        Branch("flights", run_flights),
+        Branch("activities", run_activities),
+        Branch("hotels", run_hotels, after=("flights",)),   # reçoit deps["flights"]
+    ]
+    async for item in run_branches(branches, branch_run):
+        if isinstance(item, BranchResult):
+            ...   # une branche vient de finir : valeur ou erreur, début / fin
+        else:
+            ...   # événement intermédiaire publié par une branche via emit()
+
+- Une branche est une coroutine `run(deps, emit)` : `deps` = valeurs des branches
+  dont elle dépend (None si l'une a échoué), `emit` publie un événement dans le flux.
+- Délai max par branche (Branch.timeout, BRANCH_TIMEOUT par défaut) : au-delà, la
+  branche finit en erreur (TimeoutError) et celles qui en dépendent partent sans sa valeur.
+- Le consommateur arrête le flux (client déconnecté) -> toutes les branches en cours
+  sont annulées. Un outil déjà lancé dans le pool de threads finit sa requête SQL,
+  mais plus personne ne l'attend.
+- Durée de chaque branche dans core.metrics ("branch.<nom>") ; BranchRun.summary()
+  compare le temps total (chemin critique) à la somme des branches.
+
+Variables d'environnement :
+    BRANCH_TIMEOUT   délai max d'une branche en secondes (défaut 15)
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from core.metrics import record
+
+BRANCH_TIMEOUT = float(os.environ.get("BRANCH_TIMEOUT", "15"))
+
+
+@dataclass
+class Branch:
+    name: str
+    run: Callable[[dict, Callable], Awaitable]
+    after: tuple = ()
+    timeout: float = None  # None -> BRANCH_TIMEOUT
+
+
+@dataclass
+class BranchResult:
+    name: str
+    value: object = None
+    error: BaseException = None
+    after: tuple = ()
+    started: float = 0.0   # secondes depuis le début du run
+    finished: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def timed_out(self) -> bool:
+        return isinstance(self.error, TimeoutError)
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+
+@dataclass
+class BranchRun:
+    """Résultats d'un run, dans l'ordre où les branches ont fini."""
+
+    results: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def value(self, name: str, default=None):
+        result = self.results.get(name)
+        return result.value if result is not None and result.ok else default
+
+    def critical_path(self) -> list:
+        """Branches qui ont fixé la durée totale : la dernière finie, puis sa dépendance finie le plus tard, etc."""
+        if not self.results:
+            return []
+        current = max(self.results.values(), key=lambda r: r.finished)
+        path = [current.name]
+        while current.after:
+            current = max((self.results[name] for name in current.after if name in self.results),
+                          key=lambda r: r.finished, default=None)
+            if current is None:
+                break
+            path.append(current.name)
+        return path[::-1]
+
+    def summary(self) -> dict:
+        return {
+            "total_ms": round(self.elapsed * 1000, 2),
+            "sum_ms": round(sum(r.duration for r in self.results.values()) * 1000, 2),
+            "critical_path": self.critical_path(),
+            "branches": {
+                r.name: {"start_ms": round(r.started * 1000, 2), "ms": round(r.duration * 1000, 2),
+                         "status": "ok" if r.ok else ("timeout" if r.timed_out else "error")}
+                for r in self.results.values()
+            },
+        }
+
+
+async def run_branches(branches: list, branch_run: BranchRun = None):
+    """
+    Lance toutes les branches et yield, au fil de l'eau, les événements publiés (emit)
+    et un BranchResult à la fin de chaque branche. Les dépendances (`after`) doivent
+    désigner des branches déclarées plus tôt dans la liste.
+    """
+    branch_run = branch_run if branch_run is not None else BranchRun()
+    queue = asyncio.Queue()
+    tasks = {}
+    start = time.perf_counter()
+
+    async def drive(branch: Branch) -> BranchResult:
+        deps = {}
+        for name in branch.after:
+            deps[name] = (await tasks[name]).value
+        started = time.perf_counter()
+        result = BranchResult(branch.name, after=branch.after)
+        try:
+            async with asyncio.timeout(branch.timeout if branch.timeout is not None else BRANCH_TIMEOUT):
+                result.value = await branch.run(deps, queue.put_nowait)
+        except Exception as e:
+            result.error = e
+        finished = time.perf_counter()
+        result.started, result.finished = started - start, finished - start
+        record(f"branch.{branch.name}", finished - started)
+        branch_run.results[branch.name] = result
+        queue.put_nowait(result)
+        return result
+
+    for branch in branches:
+        unknown = [name for name in branch.after if name not in tasks]
+        if unknown:
+            raise ValueError(f"branche {branch.name} : dépendances inconnues {unknown}")
+        tasks[branch.name] = asyncio.create_task(drive(branch))
+
+    try:
+        pending = len(tasks)
+        while pending:
+            item = await queue.get()
+            if isinstance(item, BranchResult):
+                pending -= 1
+            yield item
+    finally:
+        # Flux abandonné (ou fini) : rien ne doit continuer à tourner derrière
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        branch_run.elapsed = time.perf_counter() - start
@@ -0,0 +1,83 @@
+"""
+Pages HTML statiques rendues une seule fois, servies avec ETag et compression.
+
+    shell = StaticPage(templates.env, "results.html", {"flights": [], ...})
+    return shell.response(request)        # 200 (gzip si accepté) ou 304 si l'ETag du client est à jour
+
+- Le template est rendu sans données propres à une requête ; le corps, sa version
+  gzip et l'ETag (empreinte du contenu) restent en mémoire.
+- Le rendu est refait si le fichier du template change (mtime, taille) : une
+  modification en développement est servie sans redémarrer.
+- Les données d'une recherche ne passent plus par le template : elles arrivent en JSON
+  dans le flux SSE et la page les affiche elle-même.
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from core.metrics import span
+
+# Le navigateur garde la page mais revalide à chaque usage (304 sans corps si inchangée)
+CACHE_CONTROL = "no-cache"
+
+
+class StaticPage:
+    """Rendu unique d'un template Jinja2 (contexte fixe), avec ETag et variante gzip."""
+
+    def __init__(self, env, name: str, context: dict = None, media_type: str = "text/html; charset=utf-8"):
+        self.env = env
+        self.name = name
+        self.context = context or {}
+        self.media_type = media_type
+        self._lock = threading.Lock()
+        self._signature = None
+        self._body = self._gzipped = None
+        self.etag = None
+        self.renders = 0
+
+    def _file_signature(self):
+        template = self.env.get_template(self.name)
+        try:
+            st = os.stat(template.filename)
+            return st.st_mtime_ns, st.st_size
+        except (OSError, TypeError):
+            return None
+
+    def _ensure(self):
+        signature = self._file_signature()
+        if self._body is not None and signature == self._signature:
+            return
+        with self._lock:
+            if self._body is not None and signature == self._signature:
+                return
+            with span(f"render.{self.name.replace('.', '_')}"):
+                body = self.env.get_template(self.name).render(self.context).encode("utf-8")
+            self._gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            self.etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+            self._body = body
+            self._signature = signature
+            self.renders += 1
+
+    def current_etag(self) -> str:
+        self._ensure()
+        return self.etag
+
+    def response(self, request: Request) -> Response:
+        """304 si If-None-Match correspond, sinon le corps (gzip si le client l'accepte)."""
+        self._ensure()
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if self.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(self._gzipped, media_type=self.media_type, headers=headers)
+        return Response(self._body, media_type=self.media_type, headers=headers)
+
+    def stats(self) -> dict:
+        self._ensure()
+        return {"etag": self.etag, "renders": self.renders, "bytes": len(self._body), "gzip_bytes": len(self._gzipped)}
@@ -0,0 +1,373 @@
+"""
+Parsing du texte des agents (vols, hôtels, activités), en un seul passage.
+
+SectionParser est une machine à états alimentée au fil du stream :
+
+    parser = SectionParser()
+    parser.feed(part.text)          # à chaque morceau de texte reçu du LLM
+    flights, activities, hotels = parser.finish()
+
+- chaque ligne complète est routée vers le "bucket" de la section ouverte
+  (### DEBUT_VOLS ### ... ### FIN_VOLS ###) et parsée immédiatement,
+- les blocs JSON que le LLM ajoute parfois ({"result": "..."}) sont décodés
+  avec json.scanstring, sans regex à backtracking,
+- coût linéaire en la taille du texte, quel que soit son contenu.
+
+parse_flights / parse_hotels / parse_activities appliquent les mêmes règles
+à un texte complet (réponses sans balises).
+Leur durée est mesurée par core.metrics (étapes "parse.*").
+"""
+import json
+import re
+
+from core.metrics import timed
+
+# ────────────────────────────────────────────
+# PARSING LIGNE À LIGNE
+# Regex principale par ligne ; la regex souple ("fallback") n'est retenue
+# que si aucune ligne du bloc ne correspond à la regex principale.
+# ────────────────────────────────────────────
+
+_FLIGHT_RE = re.compile(
+    r"-\s+(.+?)\s+\(([^)]+)\)\s*:\s*(.+?)\s*->\s*(.+?)\s*\|\s*"
+    r"[dé]*[eé]?part\s+(.+?)\s+arriv[ée]+e?\s+(.+?)\s+pour\s+([\d.,]+)\s*€",
+    re.IGNORECASE,
+)
+_PRICE_RE = re.compile(r"([\d.,]+)\s*€")
+_FLIGHT_AIRLINE_RE = re.compile(r"-\s+(.+?)(?:\s*\(|\s*:)")
+_FLIGHT_NUMBER_RE = re.compile(r"\(([^)]+)\)")
+_FLIGHT_DEPARTURE_RE = re.compile(r"[dé]*[eé]?part\s+(\S+(?:\s+\S+)?)", re.IGNORECASE)
+
+_ACTIVITY_RE = re.compile(r"(Activit[ée]|Restaurant)\s*,\s*([^,]+?)\s*,\s*([\d.,]+)\s*€\s*,\s*(.*)", re.IGNORECASE)
+_ACTIVITY_PRICE_STRIP_RE = re.compile(r"[\d.,]+\s*€/?(?:nuit)?")
+_HOTEL_HINTS = ["€/nuit", "dispo:", "dispo :", "services:", "services :"]
+_RESTAURANT_HINTS = ["restaurant", "cuisine", "menu", "plat", "gastronomie"]
+
+_HOTEL_RE = re.compile(
+    r"-\s+(.+?)\s+[àa]\s+(.+?)\s+pour\s+([\d.,]+)\s*€/nuit\s*"
+    r"\(Dispo\s*:\s*(.+?)\s+au\s+(.+?)\s*,\s*Services?\s*:\s*(.*?)\s*\)",
+    re.IGNORECASE,
+)
+_HOTEL_PRICE_RE = re.compile(r"([\d.,]+)\s*€/nuit")
+_HOTEL_NAME_RE = re.compile(r"-\s+(.+?)(?:\s+[àa]\s+|\s+pour\s+|\s*\()")
+_HOTEL_CITY_RE = re.compile(r"[àa]\s+(.+?)\s+pour", re.IGNORECASE)
+_HOTEL_DATES_RE = re.compile(r"Dispo\s*:\s*(\S+)\s+au\s+(\S+)", re.IGNORECASE)
+_HOTEL_SERVICES_RE = re.compile(r"Services?\s*:\s*(.*?)(?:\)|$)", re.IGNORECASE)
+
+
+def _flights_strict(line: str) -> list:
+    return [{
+        "airline": f"{m.group(1).strip()} ({m.group(2).strip()})",
+        "origin": m.group(3).strip(),
+        "destination": m.group(4).strip(),
+        "departure": m.group(5).strip(),
+        "arrival": m.group(6).strip(),
+        "price": m.group(7).strip().replace(",", "."),
+    } for m in _FLIGHT_RE.finditer(line)]
+
+
+def _flight_loose(line: str):
+    line = line.strip()
+    if not line.startswith("-"):
+        return None
+    # Tenter d'extraire au moins airline + prix
+    price_match = _PRICE_RE.search(line)
+    if not price_match:
+        return None
+    airline_match = _FLIGHT_AIRLINE_RE.match(line)
+    airline = airline_match.group(1).strip() if airline_match else "Vol"
+    fn_match = _FLIGHT_NUMBER_RE.search(line)
+    if fn_match:
+        airline = f"{airline} ({fn_match.group(1).strip()})"
+    dep_match = _FLIGHT_DEPARTURE_RE.search(line)
+    return {
+        "airline": airline,
+        "origin": "",
+        "destination": "",
+        "departure": dep_match.group(1).strip() if dep_match else "N/A",
+        "arrival": "",
+        "price": price_match.group(1).replace(",", "."),
+    }
+
+
+def _activities_strict(line: str) -> list:
+    items = []
+    for m in _ACTIVITY_RE.finditer(line):
+        # Normaliser le type
+        act_type = "Activité" if m.group(1).strip().lower().startswith("activit") else "Restaurant"
+        items.append({
+            "type": act_type,
+            "name": m.group(2).strip(),
+            "price": m.group(3).strip().replace(",", "."),
+            "description": m.group(4).strip(),
+        })
+    return items
+
+
+def _activity_loose(line: str):
+    line = line.strip()
+    if not line:
+        return None
+    # Exclure les lignes qui sont clairement des hôtels
+    lower = line.lower()
+    if any(h in lower for h in _HOTEL_HINTS):
+        return None
+    price_match = _PRICE_RE.search(line)
+    if not price_match:
+        return None
+    act_type = "Restaurant" if any(w in lower for w in _RESTAURANT_HINTS) else "Activité"
+    # Le reste = nom + description
+    clean = _ACTIVITY_PRICE_STRIP_RE.sub("", line).strip(" -•·")
+    parts = [p.strip() for p in clean.split(",", 1)]
+    name = parts[0] if parts else line
+    if not name:
+        return None
+    return {
+        "type": act_type,
+        "name": name,
+        "price": price_match.group(1).replace(",", "."),
+        "description": parts[1] if len(parts) > 1 else "",
+    }
+
+
+def _hotels_strict(line: str) -> list:
+    items = []
+    for m in _HOTEL_RE.finditer(line):
+        services = m.group(6).strip()
+        if services.endswith(")"):
+            services = services[:-1].strip()
+        items.append({
+            "name": m.group(1).strip(),
+            "city": m.group(2).strip(),
+            "price": m.group(3).strip().replace(",", "."),
+            "available_start": m.group(4).strip(),
+            "available_end": m.group(5).strip(),
+            "amenities": services,
+        })
+    return items
+
+
+def _hotel_loose(line: str):
+    line = line.strip()
+    if not line.startswith("-") or "€/nuit" not in line:
+        return None
+    price_match = _HOTEL_PRICE_RE.search(line)
+    if not price_match:
+        return None
+    name_match = _HOTEL_NAME_RE.match(line)
+    city_match = _HOTEL_CITY_RE.search(line)
+    date_match = _HOTEL_DATES_RE.search(line)
+    serv_match = _HOTEL_SERVICES_RE.search(line)
+    return {
+        "name": name_match.group(1).strip() if name_match else "Hôtel",
+        "city": city_match.group(1).strip() if city_match else "",
+        "price": price_match.group(1).replace(",", "."),
+        "available_start": date_match.group(1) if date_match else "",
+        "available_end": date_match.group(2) if date_match else "",
+        "amenities": serv_match.group(1).strip() if serv_match else "",
+    }
+
+
+# kind -> (regex principale, regex souple, clé de dédup principale, clé de dédup souple)
+_LINE_PARSERS = {
+    "flights": (_flights_strict, _flight_loose,
+                lambda i: f"{i['airline']}|{i['departure']}|{i['arrival']}",
+                lambda i: f"{i['airline']}|{i['departure']}|{i['price']}"),
+    "activities": (_activities_strict, _activity_loose,
+                   lambda i: f"{i['name']}|{i['price']}",
+                   lambda i: f"{i['name']}|{i['price']}"),
+    "hotels": (_hotels_strict, _hotel_loose,
+               lambda i: f"{i['name']}|{i['city']}",
+               lambda i: f"{i['name']}|{i['city']}"),
+}
+
+
+class _Bucket:
+    """Résultats d'un type, dédupliqués ; les résultats "souples" ne servent qu'à défaut des stricts."""
+
+    def __init__(self, kind: str):
+        self._strict_fn, self._loose_fn, self._strict_key, self._loose_key = _LINE_PARSERS[kind]
+        self.strict, self.loose = [], []
+        self._strict_seen, self._loose_seen = set(), set()
+        self.lines = 0
+
+    def add_line(self, line: str):
+        self.lines += 1
+        found = self._strict_fn(line)
+        for item in found:
+            key = self._strict_key(item)
+            if key not in self._strict_seen:
+                self._strict_seen.add(key)
+                self.strict.append(item)
+        if not found and not self.strict:
+            item = self._loose_fn(line)
+            if item is not None:
+                key = self._loose_key(item)
+                if key not in self._loose_seen:
+                    self._loose_seen.add(key)
+                    self.loose.append(item)
+
+    def items(self) -> list:
+        return self.strict if self.strict else self.loose
+
+
+def _parse_text(kind: str, text: str) -> list:
+    bucket = _Bucket(kind)
+    for line in text.split("\n"):
+        bucket.add_line(line)
+    return bucket.items()
+
+
+@timed("parse.flights")
+def parse_flights(text: str) -> list:
+    """- Airline (FlightNum) : Origin -> Dest | départ TIME arrivée TIME pour PRICE€"""
+    return _parse_text("flights", text)
+
+
+@timed("parse.activities")
+def parse_activities(text: str) -> list:
+    """Type, Nom, Prix€, Description"""
+    return _parse_text("activities", text)
+
+
+@timed("parse.hotels")
+def parse_hotels(text: str) -> list:
+    """- Nom à Ville pour Prix€/nuit (Dispo: start au end, Services: ...)"""
+    return _parse_text("hotels", text)
+
+
+# ────────────────────────────────────────────
+# BLOCS JSON RECOPIÉS PAR LE LLM
+# ────────────────────────────────────────────
+
+def json_results(text: str) -> list:
+    """
+    Valeurs des clés "result" d'un texte JSON, même imbriqué ou invalide :
+    '{"search_flights_response": {"result": "- A...\\n- B..."}}' -> ['- A...\\n- B...'].
+    Un seul parcours avec str.find + json.scanstring (pas de backtracking).
+    """
+    results = []
+    pos = text.find('"result"')
+    while pos != -1:
+        i = pos + len('"result"')
+        while i < len(text) and text[i] in " \t\r\n":
+            i += 1
+        if i < len(text) and text[i] == ":":
+            i += 1
+            while i < len(text) and text[i] in " \t\r\n":
+                i += 1
+            if i < len(text) and text[i] == '"':
+                try:
+                    value, end = json.decoder.scanstring(text, i + 1)
+                except ValueError:
+                    end = i + 1
+                else:
+                    if value not in results:
+                        results.append(value)
+                pos = text.find('"result"', end)
+                continue
+        pos = text.find('"result"', i)
+    return results
+
+
+# ────────────────────────────────────────────
+# MACHINE À ÉTATS SUR LE STREAM
+# ────────────────────────────────────────────
+
+SECTION_KINDS = {"VOLS": "flights", "HOTELS": "hotels", "ACTIVITES": "activities", "RESTAURANTS": "activities"}
+_MARKER_RE = re.compile(r"###\s*(DEBUT|FIN)_([A-Z]+)\s*###")
+
+
+class SectionParser:
+    """
+    Consomme le texte du supervisor morceau par morceau et remplit un bucket
+    par type de résultat. Rien n'est re-parcouru : chaque caractère est lu une fois
+    pour le découpage en lignes, chaque ligne une fois par les regex de son bucket.
+    """
+
+    def __init__(self):
+        self.buckets = {kind: _Bucket(kind) for kind in _LINE_PARSERS}
+        self.sections_seen = set()
+        self._partial = []
+        self._current = None        # type de la section ouverte (None = hors section)
+        self._json_lines = None     # lignes d'une section passée en mode JSON
+        self._outside = []          # texte hors section (réponses sans balises)
+
+    @timed("parse.sections")
+    def feed(self, text: str):
+        """Ajoute un morceau de texte ; seules les lignes complètes sont traitées."""
+        if not text:
+            return
+        # Morceaux sans fin de ligne mis de côté (pas de concaténation répétée : coût linéaire)
+        if "\n" not in text:
+            self._partial.append(text)
+            return
+        self._partial.append(text)
+        lines = "".join(self._partial).split("\n")
+        self._partial = [lines.pop()]
+        for line in lines:
+            self._line(line)
+
+    def _line(self, line: str):
+        if "###" in line:
+            pos = 0
+            for m in _MARKER_RE.finditer(line):
+                self._content(line[pos:m.start()])
+                pos = m.end()
+                kind = SECTION_KINDS.get(m.group(2))
+                if m.group(1) == "DEBUT":
+                    self._close()
+                    if kind:
+                        self._current = kind
+                        self.sections_seen.add(kind)
+                elif kind == self._current:
+                    self._close()
+            if pos:
+                self._content(line[pos:])
+                return
+        self._content(line)
+
+    def _content(self, text: str):
+        if self._current is None:
+            self._outside.append(text)
+            return
+        if not text.strip():
+            return
+        # Le LLM a wrappé la section dans du JSON / ```json : on bufferise jusqu'à la fin de section
+        if self._json_lines is None and ('{"' in text or "```" in text):
+            self._json_lines = []
+        if self._json_lines is not None:
+            self._json_lines.append(text)
+        else:
+            self.buckets[self._current].add_line(text)
+
+    def _close(self):
+        if self._current is not None and self._json_lines is not None:
+            raw = "\n".join(self._json_lines)
+            extracted = json_results(raw)
+            if extracted:
+                lines = "\n".join(extracted).split("\n")
+            else:
+                # Pas de "result" : le texte nettoyé des balises markdown
+                lines = [line for line in raw.split("\n") if not line.strip().startswith("```")]
+            for line in lines:
+                self.buckets[self._current].add_line(line)
+        self._current = None
+        self._json_lines = None
+
+    @timed("parse.sections")
+    def finish(self, fallback_text: str = None) -> tuple:
+        """
+        Termine le parsing : (vols, activités, hôtels).
+        Sans aucune balise, tout le texte reçu (ou `fallback_text`) est parsé par les trois parsers.
+        """
+        rest = "".join(self._partial)
+        self._partial = []
+        if rest:
+            self._line(rest)
+        self._close()
+        if not self.sections_seen:
+            text = fallback_text if fallback_text is not None else "\n".join(self._outside)
+            return parse_flights(text), parse_activities(text), parse_hotels(text)
+        return (self.buckets["flights"].items(), self.buckets["activities"].items(),
+                self.buckets["hotels"].items())
@@ -0,0 +1,187 @@
+"""
+Résultats typés des outils de recherche.
+
+Chaque outil renvoie à la fois :
+- "result" : le texte historique, ligne par ligne,
+- "flights" / "hotels" / "activities" : les mêmes lignes en dicts, déjà au format de l'UI.
+
+ADK envoie au modèle tout le dict renvoyé par l'outil (function_response) : avec les records,
+chaque tour suivant un appel d'outil porterait le texte ET le JSON (~2,5x la taille).
+Les agents déclarent donc after_tool_callback=keep_records : le modèle ne reçoit que
+{"result": texte}, les records sont mis de côté sous l'id de l'appel (function_call_id),
+et main.py les reprend avec take_records() en lisant l'événement function_response :
+plus besoin de re-parser le texte recopié par le LLM avec des regex.
+Les appels directs (fast path, sans ADK) reçoivent le dict complet.
+"""
+from dataclasses import dataclass
+
+from core.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class FlightRecord:
+    airline: str
+    flight_number: str
+    origin: str
+    destination: str
+    departure: str
+    arrival: str
+    price: float
+
+    def line(self) -> str:
+        return (f"- {self.airline} ({self.flight_number}) : {self.origin} -> {self.destination} "
+                f"| départ {self.departure} arrivée {self.arrival} pour {self.price}€")
+
+    def as_dict(self) -> dict:
+        return {
+            "airline": f"{self.airline} ({self.flight_number})",
+            "origin": self.origin,
+            "destination": self.destination,
+            "departure": self.departure,
+            "arrival": self.arrival,
+            "price": self.price,
+        }
+
+
+@dataclass(frozen=True)
+class HotelRecord:
+    name: str
+    city: str
+    price: float
+    available_start: str
+    available_end: str
+    amenities: str
+
+    def line(self) -> str:
+        return (f"- {self.name} à {self.city} pour {self.price}€/nuit "
+                f"(Dispo: {self.available_start} au {self.available_end}, Services: {self.amenities})")
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "city": self.city,
+            "price": self.price,
+            "available_start": self.available_start,
+            "available_end": self.available_end,
+            "amenities": self.amenities,
+        }
+
+
+@dataclass(frozen=True)
+class PlaceRecord:
+    type: str  # "Activité" ou "Restaurant"
+    name: str
+    price: float
+    description: str
+
+    def line(self) -> str:
+        return f"{self.type}, {self.name}, {self.price}€, {self.description}"
+
+    def as_dict(self) -> dict:
+        return {"type": self.type, "name": self.name, "price": self.price, "description": self.description}
+
+
+# Clé du dict de réponse -> clé unique de déduplication (mêmes règles que les parsers de main.py)
+RECORD_KINDS = {
+    "flights": lambda r: f"{r['airline']}|{r['departure']}|{r['arrival']}",
+    "hotels": lambda r: f"{r['name']}|{r['city']}",
+    "activities": lambda r: f"{r['name']}|{r['price']}",
+}
+
+
+def tool_response(text: str, kind: str = None, records: list = ()) -> dict:
+    """Réponse d'un outil : {"result": texte, kind: [dicts]}."""
+    response = {"result": text}
+    if kind:
+        response[kind] = [r.as_dict() for r in records]
+    return response
+
+
+def tool_error(text: str) -> dict:
+    """Réponse d'un outil en échec : même texte pour le LLM, marquée pour que la recherche ne soit pas mise en cache."""
+    return {"result": text, "error": True}
+
+
+# Réponses complètes mises de côté par keep_records, en attendant main.py (bornées : un run
+# lancé hors de main.py, par exemple `adk web`, ne les reprend jamais)
+_pending = TTLCache(maxsize=1024, ttl=300)
+
+
+def keep_records(tool, args: dict, tool_context, tool_response):
+    """
+    after_tool_callback ADK : garde la réponse complète pour l'UI et ne renvoie au modèle que le texte.
+    Retourne None (réponse inchangée) pour les outils sans records (save_memory, transfer_to_agent...).
+    """
+    if not isinstance(tool_response, dict) or not (set(tool_response) - {"result"}):
+        return None
+    _pending.set(tool_context.function_call_id, tool_response)
+    return {"result": tool_response.get("result", "")}
+
+
+def take_records(function_call_id: str):
+    """Réponse complète d'un appel d'outil mise de côté par keep_records (None si absente) ; retirée au passage."""
+    if not function_call_id:
+        return None
+    found, response = _pending.get(function_call_id)
+    if not found:
+        return None
+    _pending.delete(function_call_id)
+    return response
+
+
+# Champ qui identifie un record dans le texte d'un agent
+_LABEL_FIELDS = {"flights": "airline", "hotels": "name", "activities": "name"}
+
+
+class RecordCollector:
+    """
+    Accumule les records des function_response d'un run d'agent (dédupliqués).
+    `agent_text` reçoit le texte produit par le LLM lui-même (sans les sorties d'outils).
+    """
+
+    def __init__(self):
+        self.records = {kind: [] for kind in RECORD_KINDS}
+        self.answered = set()
+        self.failures = []          # outils en erreur, branches échouées ou hors délai
+        self.agent_text = ""
+        self._seen = {kind: set() for kind in RECORD_KINDS}
+
+    def add(self, response: dict) -> dict:
+        """Ajoute les records d'une réponse d'outil ; retourne les nouveaux records par type."""
+        if response.get("error"):
+            self.failures.append(str(response.get("result", "")))
+        added = {}
+        for kind, key_fn in RECORD_KINDS.items():
+            items = response.get(kind)
+            if items is None:
+                continue
+            self.answered.add(kind)
+            new = added.setdefault(kind, [])
+            for item in items:
+                key = key_fn(item)
+                if key not in self._seen[kind]:
+                    self._seen[kind].add(key)
+                    self.records[kind].append(item)
+                    new.append(item)
+        return added
+
+    def fail(self, name: str, reason: str):
+        """Branche sans réponse exploitable (exception, délai dépassé) : résultats incomplets."""
+        self.failures.append(f"{name} : {reason}")
+
+    def complete(self, kinds=RECORD_KINDS) -> bool:
+        """Chaque type attendu a reçu une réponse d'outil, et aucun outil ni aucune branche n'a échoué."""
+        return not self.failures and set(kinds) <= self.answered
+
+    def get(self, kind: str, mentioned_in: str = None) -> list:
+        """
+        Records d'un type. Avec `mentioned_in`, ne garde que ceux que le LLM a cités
+        (ex : filtrage sémantique du refine_activity_agent) ; s'il n'en cite aucun, tout est gardé.
+        """
+        items = self.records[kind]
+        if mentioned_in:
+            field = _LABEL_FIELDS[kind]
+            mentioned = [item for item in items if item[field] in mentioned_in]
+            if mentioned:
+                return mentioned
+        return items
@@ -0,0 +1,334 @@
+"""
+Raffinement incrémental : les résultats déjà affichés (result_store, par session_id)
+sont filtrés en mémoire au lieu de relancer les outils et le LLM.
+
+    outcome = refine_cached(stored, "un hôtel avec piscine à moins de 150€")
+    if outcome is not None:
+        outcome.kind, outcome.items   # "hotels", hôtels de la session qui ont une piscine et coûtent <= 150€/nuit
+    else:
+        ...                           # la session ne suffit pas : agents et outils, comme avant
+
+Filtres reconnus (message normalisé, voir core.cities.normalize_key) :
+- prix max       "moins de 100€", "max 80 euros", "sous 300", "< 50" ; "moins cher" trie par prix
+- services       piscine, spa, wifi, salle de sport, petit déjeuner... (hôtels, alias de core.cities)
+- compagnie      nom d'une compagnie présente dans les vols de la session
+- date / horaire "2026-03-05", "05/03", "5 mars" ; "le matin", "l'après-midi", "le soir" (départ des vols)
+- mots-clés      restaurant / activité, vegan, japonais, musée... (nom, type et description des lieux)
+
+Le cache ne répond que s'il comprend toute la demande : type de résultat connu (intention
+de core.intent ou du filtre lui-même), au moins un filtre, aucun indice qu'il ne sait pas
+traiter ("vol direct", "5 étoiles"), pas de demande de nouveaux résultats ("d'autres", "ailleurs")
+et au moins un résultat après filtrage. Sinon refine_cached() renvoie None.
+
+Chaque demande filtre l'ensemble complet des résultats de la session (ceux de la recherche,
+plus ceux que les agents du chat y ont ajoutés, voir merge_results), jamais la vue filtrée
+précédente : "moins de 100€" puis "moins de 200€" retrouve les hôtels entre 100 et 200€.
+La vue affichée est rangée à part, sous stored["shown"].
+
+Variables d'environnement :
+    REFINE_CACHE   "0" pour toujours repasser par les agents (défaut "1")
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date
+
+from core.cities import AMENITY_ALIASES, amenity_key, normalize_key, split_amenities
+from core.intent import STRONG, VOCABULARY, classify_refine
+from core.records import RECORD_KINDS
+
+REFINE_CACHE_ENABLED = os.environ.get("REFINE_CACHE", "1") != "0"
+
+# Intention (core.intent) -> clé des résultats de la session
+KINDS = {"flight": "flights", "hotel": "hotels", "activity": "activities"}
+
+MONTHS = {name: i for i, names in enumerate((
+    ("janvier", "january", "jan"), ("fevrier", "february", "feb", "fev"), ("mars", "march", "mar"),
+    ("avril", "april", "apr", "avr"), ("mai", "may"), ("juin", "june", "jun"),
+    ("juillet", "july", "jul"), ("aout", "august", "aug"), ("septembre", "september", "sep"),
+    ("octobre", "october", "oct"), ("novembre", "november", "nov"), ("decembre", "december", "dec"),
+), start=1) for name in names}
+
+PRICE_RE = re.compile(r"(?:moins de|max(?:imum)?|sous|under|jusqu a|pas plus de|<)\s*(\d+(?:[.,]\d+)?)")
+ISO_DATE_RE = re.compile(r"\b(\d{4}) (\d{2}) (\d{2})\b")   # normalize_key remplace les tirets par des espaces
+SHORT_DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{4}))?\b")
+TEXT_DATE_RE = re.compile(r"\b(\d{1,2}) (" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\b")
+CHEAPER_RE = re.compile(r"\b(?:moins cher|moins chere|moins chers|moins cheres|pas cher|pas chere|cheaper|cheapest)\b")
+WORD_RE = re.compile(r"[a-z0-9]+")
+MORE_RE = re.compile(r"\b(?:autres?|d autres|nouveaux?|nouvelles?|ailleurs|plus de choix|encore)\b")
+
+# Créneaux de départ des vols (heures de début incluse, de fin exclue)
+TIME_SLOTS = {"matin": (5, 12), "apres midi": (12, 18), "soir": (18, 24)}
+
+# Services hôteliers reconnus dans un message (clé normalisée -> clé du service en base)
+AMENITY_TERMS = {normalize_key(alias): key for key, aliases in AMENITY_ALIASES.items() for alias in aliases}
+AMENITY_TERMS.update({key: key for key in AMENITY_ALIASES})
+AMENITY_TERMS.update({k: k for k in ("spa", "climatisation", "parking", "jacuzzi", "sauna")})
+
+# Mots-sujets des lieux -> type du record ("Restaurant" ou "Activité")
+PLACE_TYPES = {
+    **dict.fromkeys(("restaurant", "resto", "manger", "nourriture", "cuisine", "gastronomie",
+                     "diner", "dejeuner", "brunch"), "restaurant"),
+    **dict.fromkeys(("activite", "visite", "tourisme"), "activite"),
+}
+
+# Filtres applicables à chaque type de résultat
+ALLOWED = {
+    "flights": {"max_price", "cheaper", "airlines", "day", "slot"},
+    "hotels": {"max_price", "cheaper", "amenities", "day"},
+    "activities": {"max_price", "cheaper", "place_type", "keywords"},
+}
+
+# Indices "neutres" : ils situent la demande sans la filtrer (le filtre vient d'ailleurs dans le message)
+NEUTRAL_CUES = {
+    "flights": {"depart", "partir", "decoller", "arrivee", "atterrir", "airline"},
+    "hotels": {"nuit", "nuitee", "dormir"},
+    "activities": set(),
+}
+
+
+@dataclass
+class RefineFilters:
+    max_price: float = None
+    cheaper: bool = False
+    amenities: list = field(default_factory=list)
+    airlines: list = field(default_factory=list)
+    day: str = None            # "YYYY-MM-DD"
+    slot: str = None           # clé de TIME_SLOTS
+    place_type: str = None     # "restaurant" / "activite"
+    keywords: list = field(default_factory=list)
+
+    def active(self) -> set:
+        """Noms des filtres renseignés."""
+        return {name for name, value in vars(self).items() if value not in (None, False, [])}
+
+    def describe(self) -> str:
+        parts = []
+        if self.max_price is not None:
+            parts.append(f"<= {self.max_price:g}€")
+        if self.cheaper:
+            parts.append("prix croissant")
+        parts += self.amenities + self.airlines + [p for p in (self.day, self.slot, self.place_type) if p]
+        return ", ".join(parts + self.keywords)
+
+
+@dataclass
+class RefineOutcome:
+    kind: str                  # "flights", "hotels" ou "activities"
+    items: list
+    filters: RefineFilters
+    total: int                 # résultats de ce type avant filtrage
+
+
+# ────────────────────────────────────────────
+# LECTURE DU MESSAGE
+# ────────────────────────────────────────────
+
+def _parse_day(text: str, reference: str = None):
+    """Date citée dans le message (l'année manquante est prise dans `reference`, date de la recherche)."""
+    year = int(reference[:4]) if reference and reference[:4].isdigit() else date.today().year
+    try:
+        m = ISO_DATE_RE.search(text)
+        if m:
+            return date(int(m[1]), int(m[2]), int(m[3])).isoformat()
+        m = SHORT_DATE_RE.search(text)
+        if m:
+            return date(int(m[3] or year), int(m[2]), int(m[1])).isoformat()
+        m = TEXT_DATE_RE.search(text)
+        if m:
+            return date(year, MONTHS[m[2]], int(m[1])).isoformat()
+    except ValueError:
+        return None
+    return None
+
+
+def parse_filters(text: str, cues: list, airlines: list, reference_day: str = None) -> tuple:
+    """
+    Filtres du message normalisé et indices qu'ils consomment.
+
+    Args:
+        text: message normalisé (normalize_key)
+        cues: indices reconnus par core.intent.classify_refine
+        airlines: clés des compagnies présentes dans la session
+        reference_day: date de la recherche (année des dates partielles)
+
+    Returns:
+        (RefineFilters, set des indices consommés)
+    """
+    filters = RefineFilters()
+    used = set()
+
+    m = PRICE_RE.search(text)
+    if m:
+        filters.max_price = float(m[1].replace(",", "."))
+    filters.cheaper = bool(CHEAPER_RE.search(text))
+
+    padded = f" {' '.join(WORD_RE.findall(text))} "   # mots seuls : "spa," -> "spa"
+    for term, key in AMENITY_TERMS.items():
+        if f" {term} " in padded:
+            if key not in filters.amenities:
+                filters.amenities.append(key)
+            used.update([term, *term.split()])
+    filters.airlines = [a for a in airlines if a and f" {a} " in padded]
+    for airline in filters.airlines:
+        used.update([airline, *airline.split()])
+    filters.day = _parse_day(text, reference_day)
+    filters.slot = next((slot for slot in TIME_SLOTS if f" {slot} " in padded), None)
+    if filters.slot:
+        used.update(filters.slot.split())
+
+    activity = VOCABULARY["activity"]
+    for cue in cues:
+        word = cue if cue in activity else cue[:-1]
+        if word in PLACE_TYPES:
+            filters.place_type = filters.place_type or PLACE_TYPES[word]
+            used.add(cue)
+        elif word in activity:
+            # Attribut (vegan, japonais) ou sujet sans type propre (musée, parc) : nom et description
+            filters.keywords.append(word)
+            used.add(cue)
+    return filters, used
+
+
+# ────────────────────────────────────────────
+# FILTRAGE
+# ────────────────────────────────────────────
+
+def _price(item: dict) -> float:
+    """Prix d'un record (chaîne si le record vient des parsers de texte) ; illisible -> infini."""
+    try:
+        return float(item["price"])
+    except (KeyError, TypeError, ValueError):
+        return float("inf")
+
+
+def _hour(value: str):
+    m = re.search(r"[T ](\d{1,2}):", value or "")
+    return int(m[1]) if m else None
+
+
+def _filter_flights(items: list, f: RefineFilters) -> list:
+    out = []
+    for item in items:
+        if f.max_price is not None and _price(item) > f.max_price:
+            continue
+        if f.airlines and not any(a in normalize_key(item["airline"]) for a in f.airlines):
+            continue
+        if f.day and not item["departure"].startswith(f.day):
+            continue
+        if f.slot:
+            start, end = TIME_SLOTS[f.slot]
+            hour = _hour(item["departure"])
+            if hour is None or not (start <= hour < end or start <= hour + 24 < end):
+                continue
+        out.append(item)
+    return out
+
+
+def _filter_hotels(items: list, f: RefineFilters) -> list:
+    out = []
+    for item in items:
+        if f.max_price is not None and _price(item) > f.max_price:
+            continue
+        if f.amenities:
+            keys = [amenity_key(a) for a in split_amenities(item["amenities"])]
+            if not all(any(wanted in k for k in keys) for wanted in f.amenities):
+                continue
+        if f.day and not (item["available_start"][:10] <= f.day <= item["available_end"][:10]):
+            continue
+        out.append(item)
+    return out
+
+
+def _filter_activities(items: list, f: RefineFilters) -> list:
+    out = []
+    for item in items:
+        if f.max_price is not None and _price(item) > f.max_price:
+            continue
+        if f.place_type and normalize_key(item["type"]) != f.place_type:
+            continue
+        if f.keywords:
+            text = normalize_key(f"{item['name']} {item['description']}")
+            if not all(k in text for k in f.keywords):
+                continue
+        out.append(item)
+    return out
+
+
+_FILTERS = {"flights": _filter_flights, "hotels": _filter_hotels, "activities": _filter_activities}
+
+# Filtres propres à un type : suffisent à désigner les résultats visés
+_KIND_HINTS = {"amenities": "hotels", "airlines": "flights", "slot": "flights",
+               "place_type": "activities", "keywords": "activities"}
+
+
+def refine_cached(stored: dict, message: str):
+    """
+    Répond à la demande avec les résultats de la session, ou None s'il faut repasser par les agents.
+
+    Args:
+        stored: résultats de la session (result_store) : "flights", "hotels", "activities", "departure_date" ;
+            lus seulement, jamais modifiés
+        message: demande de raffinement telle que tapée dans le chat
+
+    Returns:
+        RefineOutcome, ou None (voir la docstring du module)
+    """
+    if not REFINE_CACHE_ENABLED or not stored:
+        return None
+    text = normalize_key(message)
+    if MORE_RE.search(text):
+        return None
+
+    route = classify_refine(message)
+    airlines = sorted({normalize_key(f["airline"].split(" (")[0]) for f in stored.get("flights") or ()})
+    filters, used = parse_filters(text, route.cues, airlines, stored.get("departure_date"))
+    active = filters.active()
+    if not active:
+        return None
+
+    if route.confident:
+        kind = KINDS[route.intent]
+    else:
+        hinted = {k for attr, k in _KIND_HINTS.items() if attr in active}
+        if len(hinted) != 1:
+            return None
+        kind = hinted.pop()
+    # Filtre d'un autre type ("restaurant" dans une demande d'hôtel) : ignoré en silence sinon
+    if not active <= ALLOWED[kind]:
+        return None
+
+    # Indice non traité par un filtre ("direct", "étoiles") : le cache ne sait pas répondre
+    subjects = VOCABULARY[next(i for i, k in KINDS.items() if k == kind)]
+    for cue in route.cues:
+        word = cue if any(cue in words for words in VOCABULARY.values()) else cue[:-1]
+        if cue in used or word in used or subjects.get(word) == STRONG or word in NEUTRAL_CUES[kind]:
+            continue
+        return None
+
+    items = stored.get(kind) or []
+    if not items:
+        return None
+    kept = _FILTERS[kind](items, filters)
+    if filters.cheaper:
+        kept = sorted(kept, key=_price)
+    if not kept:
+        return None
+    return RefineOutcome(kind=kind, items=kept, filters=filters, total=len(items))
+
+
+def merge_results(stored: dict, results: dict):
+    """
+    Ajoute aux résultats de la session ceux qu'un agent du chat vient de trouver (sans doublon,
+    clés de core.records.RECORD_KINDS) : les résultats de la recherche d'origine restent.
+    """
+    for kind, items in results.items():
+        key_fn = RECORD_KINDS[kind]
+        merged = list(stored.get(kind) or ())
+        seen = {key_fn(item) for item in merged}
+        for item in items:
+            key = key_fn(item)
+            if key not in seen:
+                seen.add(key)
+                merged.append(item)
+        stored[kind] = merged
@@ -0,0 +1,171 @@
+"""
+Cache persistant des runs complets du supervisor (SQLite).
+
+Une recherche /stream_search qui part au LLM coûte plusieurs secondes et plusieurs
+appels de modèle ; le même prompt revient pourtant souvent. Les résultats finaux
+(vols, hôtels, activités) sont gardés sur disque, partagés entre workers et redémarrages :
+
+    key = cache.key(prompt_text, root_agent)
+    hit = await cache.get(key)          # dict {"flights", "activities", "hotels"} ou None
+    await cache.put(key, results)
+
+- Clé = SHA-256 du prompt canonique (minuscules, sans accents, espaces compactés),
+  du modèle et de l'empreinte des instructions de l'agent, de ses sous-agents et de
+  leurs outils : modifier un prompt système invalide tout ce qu'il a produit.
+- Chaque entrée mémorise l'empreinte des bases de données (core.db.db_signature) :
+  dès qu'une base change (générateur, hôtel de secours persisté, autre worker),
+  les entrées calculées sur l'ancienne version ne sont plus servies.
+- TTL, et nombre d'entrées borné (les plus proches de l'expiration partent d'abord).
+
+Variables d'environnement :
+    RESPONSE_CACHE        "0" pour désactiver (défaut 1)
+    RESPONSE_CACHE_PATH   fichier SQLite (défaut data/response_cache.db)
+    RESPONSE_CACHE_TTL    durée de vie en secondes (défaut 21600, 6 h)
+    RESPONSE_CACHE_MAX    nombre max d'entrées (défaut 1000)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from core.aio import run_blocking
+from core.cities import normalize_key
+from core.db import ACTIVITIES_DB_PATH, DATA_DIR, FLIGHTS_DB_PATH, HOTELS_DB_PATH, db_signature, get_pool
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE", "1") != "0"
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH") or os.path.join(DATA_DIR, "response_cache.db")
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "21600"))
+RESPONSE_CACHE_MAX = int(os.environ.get("RESPONSE_CACHE_MAX", "1000"))
+
+# Bases lues par les outils du supervisor
+DATA_DBS = (FLIGHTS_DB_PATH, HOTELS_DB_PATH, ACTIVITIES_DB_PATH)
+
+
+def canonical_prompt(prompt_text: str) -> str:
+    return normalize_key(" ".join(prompt_text.split()))
+
+
+def _describe_agent(agent, seen: set) -> dict:
+    """Tout ce qui influence la réponse d'un agent : modèle, instructions, outils, sous-agents."""
+    if id(agent) in seen:
+        return {"name": getattr(agent, "name", "")}
+    seen.add(id(agent))
+    instruction = getattr(agent, "instruction", "")
+    if callable(instruction):
+        instruction = f"{instruction.__module__}.{instruction.__qualname__}"
+    return {
+        "name": getattr(agent, "name", ""),
+        "model": str(getattr(agent, "model", "")),
+        "instruction": instruction,
+        "description": getattr(agent, "description", ""),
+        "tools": [(getattr(t, "__name__", type(t).__name__), getattr(t, "__doc__", "") or "")
+                  for t in getattr(agent, "tools", ())],
+        "sub_agents": [_describe_agent(a, seen) for a in getattr(agent, "sub_agents", ())],
+    }
+
+
+def agent_fingerprint(agent) -> str:
+    description = json.dumps(_describe_agent(agent, set()), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def data_version(paths: tuple = DATA_DBS) -> str:
+    """Empreinte courte des bases : change à chaque écriture (voir db_signature)."""
+    return hashlib.sha1(repr([db_signature(p) for p in paths]).encode()).hexdigest()
+
+
+class ResponseCache:
+    """Table `responses` : clé -> résultats JSON, version des données, expiration."""
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, ttl: float = RESPONSE_CACHE_TTL,
+                 maxsize: int = RESPONSE_CACHE_MAX, purge_every: int = 50):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.purge_every = purge_every
+        self._fingerprints = {}
+        self._ready = False
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _pool(self):
+        pool = get_pool(self.path)
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    with pool.transaction() as conn:
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS responses ("
+                            "key TEXT PRIMARY KEY, data_version TEXT NOT NULL, value TEXT NOT NULL, "
+                            "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+                        )
+                        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses(expires_at)")
+                    self._ready = True
+        return pool
+
+    def key(self, prompt_text: str, agent) -> str:
+        # Les agents sont figés au démarrage : empreinte calculée une fois par agent
+        fingerprint = self._fingerprints.get(id(agent))
+        if fingerprint is None:
+            fingerprint = self._fingerprints[id(agent)] = agent_fingerprint(agent)
+        return hashlib.sha256(f"{fingerprint}\n{canonical_prompt(prompt_text)}".encode()).hexdigest()
+
+    # -- API synchrone (appelée dans le pool de threads par les variantes async) --
+
+    def get_sync(self, key: str):
+        pool = self._pool()
+        row = pool.fetchone(
+            "SELECT value, data_version FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+        )
+        if row is None:
+            self.misses += 1
+            return None
+        if row[1] != data_version():
+            # Calculé sur une ancienne version des bases : on ne le sert plus
+            with pool.transaction() as conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.stale += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put_sync(self, key: str, value: dict):
+        pool = self._pool()
+        now = time.time()
+        with pool.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, data_version, value, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data_version(), json.dumps(value, ensure_ascii=False), now, now + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge(conn, now)
+
+    def _purge(self, conn, now: float):
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def clear(self):
+        with self._pool().transaction() as conn:
+            conn.execute("DELETE FROM responses")
+
+    # -- API async (la boucle asyncio ne touche jamais au fichier) --
+
+    async def get(self, key: str):
+        return await run_blocking(self.get_sync, key)
+
+    async def put(self, key: str, value: dict):
+        await run_blocking(self.put_sync, key, value)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "path": self.path}
@@ -0,0 +1,455 @@
+"""
+Schéma "recherche" des bases : colonnes clés normalisées + index.
+
+Les migrations sont idempotentes : elles s'appliquent aux bases existantes
+(générées avant l'ajout des index) au premier accès, puis ne coûtent plus rien.
+Le générateur (scripts/generate_dbflight.py) crée directement ce schéma.
+"""
+import re
+import threading
+import time
+from datetime import date
+
+from core.cities import (airline_key, amenity_key, city_key, match_known_key, normalize_key,
+                         split_amenities)
+from core.db import ConnectionPool, db_signature
+
+# ────────────────────────────────────────────
+# FLIGHTS
+# ────────────────────────────────────────────
+
+FLIGHTS_KEY_COLUMNS = ("origin_key", "destination_key", "airline_key")
+
+FLIGHTS_INDEXES = (
+    # Recherche principale : trajet + date + prix
+    "CREATE INDEX IF NOT EXISTS idx_flights_route "
+    "ON flights(origin_key, destination_key, departure_time, price)",
+    # Recherche par compagnie
+    "CREATE INDEX IF NOT EXISTS idx_flights_airline ON flights(airline_key, price)",
+)
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def _columns(conn, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def fill_flight_keys(conn, only_missing: bool = True) -> int:
+    """Calcule origin_key / destination_key / airline_key. Retourne le nombre de lignes mises à jour."""
+    where = " WHERE origin_key IS NULL OR destination_key IS NULL OR airline_key IS NULL" if only_missing else ""
+    rows = conn.execute(f"SELECT id, origin, destination, airline FROM flights{where}").fetchall()
+    conn.executemany(
+        "UPDATE flights SET origin_key = ?, destination_key = ?, airline_key = ? WHERE id = ?",
+        [(city_key(o or ""), city_key(d or ""), airline_key(a or ""), fid) for fid, o, d, a in rows],
+    )
+    return len(rows)
+
+
+def create_flights_indexes(conn):
+    for ddl in FLIGHTS_INDEXES:
+        conn.execute(ddl)
+    conn.execute("ANALYZE flights")
+
+
+def migrate_flights(conn):
+    """Ajoute les colonnes clés et les index à une table flights existante."""
+    existing = _columns(conn, "flights")
+    if not existing:
+        return
+    for col in FLIGHTS_KEY_COLUMNS:
+        if col not in existing:
+            conn.execute(f"ALTER TABLE flights ADD COLUMN {col} TEXT")
+    fill_flight_keys(conn)
+    create_flights_indexes(conn)
+
+
+def ensure_flights_schema(pool: ConnectionPool):
+    """Migre la base des vols une seule fois par processus."""
+    if pool.path in _migrated:
+        return
+    with _migrate_lock:
+        if pool.path in _migrated:
+            return
+        with pool.transaction() as conn:
+            migrate_flights(conn)
+        _migrated.add(pool.path)
+
+
+_key_sets_cache = {}
+
+
+def flight_key_sets(pool: ConnectionPool) -> tuple:
+    """
+    (clés villes, clés compagnies) présentes en base, mises en cache tant que
+    le fichier n'a pas changé. Sert à rattraper les saisies approximatives.
+    """
+    sig = db_signature(pool.path)
+    cache_key = ("flights", pool.path)
+    cached = _key_sets_cache.get(cache_key)
+    if cached and cached[0] == sig:
+        return cached[1]
+    with pool.connection() as conn:
+        cities = {r[0] for r in conn.execute("SELECT DISTINCT origin_key FROM flights")}
+        cities |= {r[0] for r in conn.execute("SELECT DISTINCT destination_key FROM flights")}
+        airlines = {r[0] for r in conn.execute("SELECT DISTINCT airline_key FROM flights")}
+    sets = (frozenset(cities), frozenset(airlines))
+    _key_sets_cache[cache_key] = (sig, sets)
+    return sets
+
+
+# ────────────────────────────────────────────
+# HOTELS
+# ────────────────────────────────────────────
+#
+# - hotel_cities   : ville -> identifiant entier (dimension "ville" du R*Tree)
+# - hotel_amenity_bits : service -> numéro de bit ; hotels.amenity_mask = OR des bits
+# - hotels_rtree   : R*Tree (entiers 32 bits) à 3 dimensions
+#       ville     [city_min, city_max]   (min = max = id de la ville)
+#       dispo     [day_min, day_max]     (jours ordinaux de available_start / available_end)
+#       prix      [price_min, price_max] (min = max = prix en centimes)
+#   "ville + budget + fenêtre de dates" devient une seule recherche dans l'arbre.
+
+MAX_AMENITY_BITS = 62  # bits 0..62 : le masque reste un entier SQLite signé 64 bits
+
+HOTELS_DDL = (
+    "CREATE TABLE IF NOT EXISTS hotel_cities (id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS hotel_amenity_bits ("
+    " bit INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, label TEXT NOT NULL)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS hotels_rtree USING rtree_i32("
+    "id, city_min, city_max, day_min, day_max, price_min, price_max)",
+)
+
+HOTELS_KEY_COLUMNS = (("city_key", "TEXT"), ("amenity_mask", "INTEGER"))
+
+# Identité d'un hôtel (même ville, nom et dates) : INSERT OR IGNORE des hôtels de secours
+HOTELS_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_hotels_identity ON hotels(city, name, available_start, available_end)",
+)
+
+
+def date_to_day(value: str):
+    """'2026-04-20' (ou '2026-04-20 15:37') -> jour ordinal ; None si la date est invalide."""
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def price_to_cents(price) -> int:
+    return int(round(float(price) * 100))
+
+
+def _city_id(conn, key: str) -> int:
+    conn.execute("INSERT OR IGNORE INTO hotel_cities (key) VALUES (?)", (key,))
+    return conn.execute("SELECT id FROM hotel_cities WHERE key = ?", (key,)).fetchone()[0]
+
+
+def amenity_mask(conn, amenities: str, bits: dict = None) -> int:
+    """
+    Bitmask des services d'un hôtel. Les services inconnus reçoivent le prochain bit libre.
+    `bits` : cache {clé: bit} optionnel, partagé entre appels d'une même indexation.
+    """
+    if bits is None:
+        bits = dict(conn.execute("SELECT key, bit FROM hotel_amenity_bits"))
+    mask = 0
+    for label in split_amenities(amenities):
+        key = amenity_key(label)
+        bit = bits.get(key)
+        if bit is None:
+            bit = conn.execute("SELECT COALESCE(MAX(bit) + 1, 0) FROM hotel_amenity_bits").fetchone()[0]
+            if bit > MAX_AMENITY_BITS:
+                continue  # plus de bit libre : le service reste affiché mais n'est plus filtrable
+            conn.execute("INSERT INTO hotel_amenity_bits (bit, key, label) VALUES (?, ?, ?)", (bit, key, label))
+            bits[key] = bit
+        mask |= 1 << bit
+    return mask
+
+
+def index_hotels(conn, hotel_ids=None) -> int:
+    """
+    Calcule city_key / amenity_mask et (ré)indexe les hôtels dans hotels_rtree.
+    hotel_ids=None : tous les hôtels pas encore indexés.
+    """
+    if hotel_ids is None:
+        rows = conn.execute(
+            "SELECT id, city, price, amenities, available_start, available_end FROM hotels "
+            "WHERE city_key IS NULL OR amenity_mask IS NULL"
+        ).fetchall()
+    else:
+        ids = list(hotel_ids)
+        rows = conn.execute(
+            "SELECT id, city, price, amenities, available_start, available_end FROM hotels "
+            f"WHERE id IN ({', '.join('?' * len(ids))})", ids
+        ).fetchall() if ids else []
+
+    city_ids = {}
+    bits = dict(conn.execute("SELECT key, bit FROM hotel_amenity_bits"))
+    updates, boxes = [], []
+    for hid, city, price, amenities, start, end in rows:
+        key = city_key(city or "")
+        if key not in city_ids:
+            city_ids[key] = _city_id(conn, key)
+        cid = city_ids[key]
+        cents = price_to_cents(price or 0)
+        # Dates illisibles : intervalle vide -> exclu des recherches datées, visible sinon
+        day_min = date_to_day(start) or 0
+        day_max = date_to_day(end) or 0
+        updates.append((key, amenity_mask(conn, amenities, bits), hid))
+        boxes.append((hid, cid, cid, day_min, max(day_min, day_max), cents, cents))
+
+    conn.executemany("UPDATE hotels SET city_key = ?, amenity_mask = ? WHERE id = ?", updates)
+    # Insertion triée par ville puis date : les noeuds du R*Tree restent groupés par ville
+    boxes.sort(key=lambda b: (b[1], b[3], b[5]))
+    conn.executemany("INSERT OR REPLACE INTO hotels_rtree VALUES (?, ?, ?, ?, ?, ?, ?)", boxes)
+    return len(rows)
+
+
+def create_hotels_indexes(conn) -> int:
+    """
+    Fusionne les doublons d'identité (plus petit id gardé, boîte R*Tree retirée), puis crée l'index UNIQUE.
+    Retourne le nombre de lignes supprimées.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_hotels_identity'").fetchone():
+        return 0
+    duplicates = conn.execute(
+        "SELECT id FROM hotels WHERE id NOT IN "
+        "(SELECT MIN(id) FROM hotels GROUP BY city, name, available_start, available_end)"
+    ).fetchall()
+    conn.executemany("DELETE FROM hotels_rtree WHERE id = ?", duplicates)
+    conn.executemany("DELETE FROM hotels WHERE id = ?", duplicates)
+    for ddl in HOTELS_INDEXES:
+        conn.execute(ddl)
+    return len(duplicates)
+
+
+def migrate_hotels(conn):
+    """Ajoute colonnes clés, dictionnaires, R*Tree et index d'identité à une table hotels existante."""
+    existing = _columns(conn, "hotels")
+    if not existing:
+        return
+    for col, col_type in HOTELS_KEY_COLUMNS:
+        if col not in existing:
+            conn.execute(f"ALTER TABLE hotels ADD COLUMN {col} {col_type}")
+    for ddl in HOTELS_DDL:
+        conn.execute(ddl)
+    create_hotels_indexes(conn)
+    index_hotels(conn)
+
+
+def ensure_hotels_schema(pool: ConnectionPool):
+    """Migre la base des hôtels une seule fois par processus."""
+    if pool.path in _migrated:
+        return
+    with _migrate_lock:
+        if pool.path in _migrated:
+            return
+        with pool.transaction() as conn:
+            migrate_hotels(conn)
+        _migrated.add(pool.path)
+
+
+def hotel_key_sets(pool: ConnectionPool) -> tuple:
+    """({clé ville: id}, {clé service: bit}) présents en base, en cache tant que le fichier n'a pas changé."""
+    sig = db_signature(pool.path)
+    cache_key = ("hotels", pool.path)
+    cached = _key_sets_cache.get(cache_key)
+    if cached and cached[0] == sig:
+        return cached[1]
+    with pool.connection() as conn:
+        cities = dict(conn.execute("SELECT key, id FROM hotel_cities"))
+        bits = dict(conn.execute("SELECT key, bit FROM hotel_amenity_bits"))
+    sets = (cities, bits)
+    _key_sets_cache[cache_key] = (sig, sets)
+    return sets
+
+
+def amenity_masks(known_bits: dict, requested: str):
+    """
+    Traduit "WiFi, Gym" en masques sur hotels.amenity_mask :
+    (services obligatoires, [masques "au moins une des variantes"]),
+    ou None si un service demandé n'existe dans aucun hôtel.
+    Un service ambigu ("vue" -> vue sur mer / vue sur parc) accepte n'importe laquelle des variantes.
+    """
+    required, any_of = 0, []
+    for label in split_amenities(requested):
+        keys = match_known_key(amenity_key(label), known_bits.keys())
+        if not keys:
+            return None
+        mask = 0
+        for k in keys:
+            mask |= 1 << known_bits[k]
+        if len(keys) == 1:
+            required |= mask
+        else:
+            any_of.append(mask)
+    return required, any_of
+
+
+def amenity_filter(known_bits: dict, requested: str):
+    """
+    Filtres SQL équivalents à amenity_masks (alias de table `h`).
+    Retourne (sql, params), ou None si un service demandé n'existe dans aucun hôtel.
+    """
+    masks = amenity_masks(known_bits, requested)
+    if masks is None:
+        return None
+    required, any_of = masks
+    sql, params = "", []
+    if required:
+        sql, params = " AND (h.amenity_mask & ?) = ?", [required, required]
+    for mask in any_of:
+        sql += " AND (h.amenity_mask & ?) != 0"
+        params.append(mask)
+    return sql, params
+
+
+# ────────────────────────────────────────────
+# ACTIVITIES (activités + restaurants)
+# ────────────────────────────────────────────
+#
+# activities_fts : index FTS5 "external content" sur activities
+#   - name, description : texte recherché (unicode61, accents ignorés : "musee" trouve "Musée")
+#   - city_key, type    : colonnes filtrables dans la même requête MATCH
+# Des triggers tiennent l'index à jour ligne par ligne (indexation incrémentale).
+
+ACTIVITIES_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS activities_fts USING fts5("
+    "name, description, city_key, type, "
+    "content='activities', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+ACTIVITIES_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS activities_fts_ai AFTER INSERT ON activities BEGIN "
+    "INSERT INTO activities_fts(rowid, name, description, city_key, type) "
+    "VALUES (new.id, new.name, new.description, new.city_key, new.type); END",
+    "CREATE TRIGGER IF NOT EXISTS activities_fts_ad AFTER DELETE ON activities BEGIN "
+    "INSERT INTO activities_fts(activities_fts, rowid, name, description, city_key, type) "
+    "VALUES ('delete', old.id, old.name, old.description, old.city_key, old.type); END",
+    "CREATE TRIGGER IF NOT EXISTS activities_fts_au AFTER UPDATE ON activities BEGIN "
+    "INSERT INTO activities_fts(activities_fts, rowid, name, description, city_key, type) "
+    "VALUES ('delete', old.id, old.name, old.description, old.city_key, old.type); "
+    "INSERT INTO activities_fts(rowid, name, description, city_key, type) "
+    "VALUES (new.id, new.name, new.description, new.city_key, new.type); END",
+)
+
+# Poids bm25 : le nom compte 10x plus que la description, city_key/type ne comptent pas
+ACTIVITIES_BM25 = "bm25(activities_fts, 10.0, 1.0, 0.0, 0.0)"
+
+
+def rebuild_activities_fts(conn, full: bool = False):
+    """
+    Hook d'indexation appelé après un chargement (create_activities_db) :
+    - full=False : les triggers ont déjà indexé les lignes, on fusionne seulement les segments,
+    - full=True  : reconstruction complète depuis la table activities.
+    """
+    if full:
+        conn.execute("INSERT INTO activities_fts(activities_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO activities_fts(activities_fts) VALUES ('optimize')")
+
+
+def migrate_activities(conn):
+    """Ajoute city_key, l'index (city_key, type), l'index FTS5 et ses triggers à une table existante."""
+    existing = _columns(conn, "activities")
+    if not existing:
+        return
+    if "city_key" not in existing:
+        conn.execute("ALTER TABLE activities ADD COLUMN city_key TEXT")
+    rows = conn.execute("SELECT id, city FROM activities WHERE city_key IS NULL").fetchall()
+    conn.executemany("UPDATE activities SET city_key = ? WHERE id = ?",
+                     [(city_key(city or ""), aid) for aid, city in rows])
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_activities_city ON activities(city_key, type)")
+
+    fts_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'activities_fts'"
+    ).fetchone()
+    conn.execute(ACTIVITIES_FTS_DDL)
+    for ddl in ACTIVITIES_TRIGGERS:
+        conn.execute(ddl)
+    if not fts_exists:
+        rebuild_activities_fts(conn, full=True)
+
+
+def ensure_activities_schema(pool: ConnectionPool):
+    """Migre la base des activités une seule fois par processus."""
+    if pool.path in _migrated:
+        return
+    with _migrate_lock:
+        if pool.path in _migrated:
+            return
+        with pool.transaction() as conn:
+            migrate_activities(conn)
+        _migrated.add(pool.path)
+
+
+FTS_STOPWORDS = {"de", "du", "des", "la", "le", "les", "un", "une", "et", "en", "au", "aux", "the", "and", "of"}
+
+
+def fts_query(keyword: str) -> str:
+    """
+    'musée  d'art moderne' -> '"musee"* OR "art"* OR "moderne"*'
+    Mots-clés en OU (le classement bm25 fait remonter les lieux qui en contiennent le plus),
+    en préfixe ("muse" trouve "musée"), mots vides et mots d'une lettre ignorés.
+    """
+    tokens = [t for t in re.split(r"\W+", normalize_key(keyword)) if len(t) >= 2 and t not in FTS_STOPWORDS]
+    return " OR ".join(f'"{t}"*' for t in dict.fromkeys(tokens))
+
+
+# ────────────────────────────────────────────
+# MEMORY
+# ────────────────────────────────────────────
+
+# Utilisateur des préférences enregistrées avant le découpage par utilisateur
+DEFAULT_MEMORY_USER = "default"
+
+MEMORY_DDL = (
+    "CREATE TABLE IF NOT EXISTS memory ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, preferences TEXT)",
+)
+
+MEMORY_COLUMNS = (
+    ("user_id", f"TEXT NOT NULL DEFAULT '{DEFAULT_MEMORY_USER}'"),
+    ("created_at", "REAL"),       # time.time() de la première mention
+    ("last_seen_at", "REAL"),     # dernière mention (point de départ de l'oubli)
+    ("hits", "INTEGER NOT NULL DEFAULT 1"),
+)
+
+# Dédoublonnage (INSERT OR IGNORE) et lecture des préférences d'un utilisateur
+MEMORY_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_memory_user_pref ON memory(user_id, preferences)",
+)
+
+
+def migrate_memory(conn):
+    """Crée la table si besoin, ajoute user_id / horodatages / hits et l'index UNIQUE (doublons fusionnés)."""
+    for ddl in MEMORY_DDL:
+        conn.execute(ddl)
+    existing = _columns(conn, "memory")
+    for col, col_type in MEMORY_COLUMNS:
+        if col not in existing:
+            conn.execute(f"ALTER TABLE memory ADD COLUMN {col} {col_type}")
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_memory_user_pref'").fetchone():
+        return
+    # Base d'avant le découpage par utilisateur : préférences normalisées comme save_memory, doublons fusionnés
+    conn.execute("UPDATE memory SET preferences = lower(trim(preferences))")
+    conn.execute("DELETE FROM memory WHERE preferences IS NULL OR preferences = '' OR id NOT IN "
+                 "(SELECT MIN(id) FROM memory GROUP BY user_id, preferences)")
+    now = time.time()
+    conn.execute("UPDATE memory SET created_at = COALESCE(created_at, ?), last_seen_at = COALESCE(last_seen_at, ?)",
+                 (now, now))
+    for ddl in MEMORY_INDEXES:
+        conn.execute(ddl)
+
+
+def ensure_memory_schema(pool: ConnectionPool):
+    """Migre la base de mémoire une seule fois par processus."""
+    if pool.path in _migrated:
+        return
+    with _migrate_lock:
+        if pool.path in _migrated:
+            return
+        with pool.transaction() as conn:
+            migrate_memory(conn)
+        _migrated.add(pool.path)
@@ -0,0 +1,169 @@
+"""
+Sessions ADK et résultats de recherche, avec un backend interchangeable.
+
+    SESSION_STORE=memory  (défaut) LRU borné + TTL, propre à chaque processus
+    SESSION_STORE=sqlite  base SQLite partagée (aiosqlite) : plusieurs workers uvicorn
+                          voient les mêmes résultats et les mêmes sessions ADK
+
+Les identifiants sont des UUID4 : aucun compteur global, pas de collision
+entre requêtes concurrentes ni entre processus.
+
+Variables d'environnement :
+    SESSION_STORE     "memory" ou "sqlite"
+    SESSION_DB_PATH   chemin de la base partagée (défaut data/sessions.db)
+    SESSION_TTL       durée de vie d'un résultat en secondes (défaut 3600)
+    SESSION_MAX       nombre max de résultats conservés (défaut 1000)
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+import aiosqlite
+from google.adk.sessions import DatabaseSessionService, InMemorySessionService
+
+from core.cache import TTLCache
+from core.db import DATA_DIR
+
+SESSION_STORE = os.environ.get("SESSION_STORE", "memory").lower()
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH") or os.path.join(DATA_DIR, "sessions.db")
+SESSION_TTL = float(os.environ.get("SESSION_TTL", "3600"))
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "1000"))
+
+
+def new_session_id(prefix: str) -> str:
+    """'supervisor' -> 'supervisor_3f2a...' (unique entre requêtes et entre workers)."""
+    return f"{prefix}_{uuid.uuid4().hex}"
+
+
+class ResultStore(ABC):
+    """
+    Interface : résultats d'une recherche (vols, hôtels, activités) par identifiant.
+    Méthodes abstraites : un backend incomplet échoue dès sa construction, pas en pleine requête.
+    """
+
+    @abstractmethod
+    async def get(self, key: str):
+        """Résultats rangés sous `key`, ou None (absents ou expirés)."""
+
+    @abstractmethod
+    async def put(self, key: str, value: dict):
+        """Range (ou remplace) les résultats sous `key`."""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Oublie les résultats rangés sous `key`."""
+
+    @abstractmethod
+    async def close(self):
+        """Libère les ressources du backend (arrêt de l'application)."""
+
+
+class MemoryResultStore(ResultStore):
+    """LRU borné + TTL en mémoire (un seul worker)."""
+
+    def __init__(self, maxsize: int = SESSION_MAX, ttl: float = SESSION_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str):
+        found, value = self._cache.get(key)
+        return value if found else None
+
+    async def put(self, key: str, value: dict):
+        self._cache.set(key, value)
+
+    async def delete(self, key: str):
+        self._cache.delete(key)
+
+    async def close(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class SQLiteResultStore(ResultStore):
+    """
+    Table `results` dans une base SQLite partagée entre workers (WAL).
+    Une seule connexion aiosqlite par processus ; les entrées expirées et
+    les plus anciennes au-delà de `maxsize` sont purgées toutes les `purge_every` écritures.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, maxsize: int = SESSION_MAX,
+                 ttl: float = SESSION_TTL, purge_every: int = 100):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._writes = 0
+
+    async def _connection(self):
+        if self._conn is None:
+            async with self._lock:
+                if self._conn is None:
+                    conn = await aiosqlite.connect(self.path)
+                    await conn.execute("PRAGMA journal_mode=WAL")
+                    await conn.execute("PRAGMA synchronous=NORMAL")
+                    await conn.execute("PRAGMA busy_timeout=5000")
+                    await conn.execute(
+                        "CREATE TABLE IF NOT EXISTS results ("
+                        "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                    )
+                    await conn.execute("CREATE INDEX IF NOT EXISTS idx_results_expires ON results(expires_at)")
+                    await conn.commit()
+                    self._conn = conn
+        return self._conn
+
+    async def get(self, key: str):
+        conn = await self._connection()
+        async with conn.execute(
+            "SELECT value FROM results WHERE key = ? AND expires_at > ?", (key, time.time())
+        ) as cursor:
+            row = await cursor.fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def put(self, key: str, value: dict):
+        conn = await self._connection()
+        await conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), time.time() + self.ttl),
+        )
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            await self._purge(conn)
+        await conn.commit()
+
+    async def delete(self, key: str):
+        conn = await self._connection()
+        await conn.execute("DELETE FROM results WHERE key = ?", (key,))
+        await conn.commit()
+
+    async def _purge(self, conn):
+        await conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+        await conn.execute(
+            "DELETE FROM results WHERE key IN "
+            "(SELECT key FROM results ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    async def close(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+def get_result_store() -> ResultStore:
+    if SESSION_STORE == "sqlite":
+        return SQLiteResultStore()
+    return MemoryResultStore()
+
+
+def get_session_service():
+    """Service de sessions ADK correspondant au backend choisi."""
+    if SESSION_STORE == "sqlite":
+        return DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{SESSION_DB_PATH}")
+    return InMemorySessionService()
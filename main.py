@@ -1,13 +1,16 @@
 from fastapi import FastAPI, Request, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 import uvicorn
 import os
 import json
 import asyncio
 import re
 import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
 from dotenv import load_dotenv
 
 # Fix Windows: UTF-8 encoding pour les emojis
@@ -18,10 +21,28 @@ sys.stderr.reconfigure(encoding='utf-8', errors='replace')
 load_dotenv()
 
 # --- MILESTONE 3 : On importe les deux supervisors ---
-from test_agent.agent import root_agent, refine_supervisor
+from test_agent.agent import (root_agent, refine_supervisor, refine_activity_agent, refine_flight_agent,
+                              refine_hotel_agent)
+from test_agent.flight_agent import search_flights_async
+from test_agent.hotel_agent import search_hotels_async
+from test_agent.activity_agent import activity_agent, search_activities_async, search_restaurants_async
+from core.aio import loop_monitor, run_blocking
+from core.cities import normalize_key
+from core.concurrency import COALESCE_ENABLED, FairLimiter, QueueFull, SingleFlight
+from core.conversation import ChatHistory
+from core.intent import REFINE_ROUTER, VOCABULARY, WEAK, classify_refine
+from core.log import RequestIdMiddleware, get_logger, setup_logging, stop_logging
+from core.memory import format_preferences, get_memory_store
+from core.metrics import record, render_prometheus, span, start_request_timings
+from core.orchestration import Branch, BranchResult, BranchRun, run_branches
+from core.pages import StaticPage
+from core.parsing import SectionParser, parse_activities, parse_flights, parse_hotels
+from core.records import RECORD_KINDS, RecordCollector, take_records
+from core.refine import merge_results, refine_cached
+from core.response_cache import RESPONSE_CACHE_ENABLED, ResponseCache
+from core.sessions import get_result_store, get_session_service, new_session_id
 
 from google.adk.runners import Runner, RunConfig
-from google.adk.sessions import InMemorySessionService
 
 
 class Part:
@@ -35,330 +56,135 @@ class Message:
         self.parts = parts
 
 
-session_service = InMemorySessionService()
+log = get_logger("main")
 
-app = FastAPI()
-app.mount("/static", StaticFiles(directory="ui/static"), name="static")
-templates = Jinja2Templates(directory="ui/templates")
-session_results = {}
+# Backend choisi par SESSION_STORE (memory par défaut, sqlite pour plusieurs workers)
+session_service = get_session_service()
+result_store = get_result_store()
+
+# Recherches identiques en cours partagées ; pipelines LLM/outils limités et servis à tour de rôle par client
+inflight_searches = SingleFlight()
+search_limiter = FairLimiter()
+# Runs complets du supervisor déjà calculés (SQLite, invalidés quand les bases changent)
+response_cache = ResponseCache()
 
-# Compteur pour générer des session_id uniques (éviter les conflits de session)
-_session_counter = 0
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logs écrits par un thread dédié (LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE)
+    setup_logging()
+    # Mesure en continu le retard de la boucle asyncio (exposé sur /debug/loop)
+    loop_monitor.start()
+    yield
+    await loop_monitor.stop()
+    await result_store.close()
+    stop_logging()
 
-def _next_session_id(prefix: str) -> str:
-    global _session_counter
-    _session_counter += 1
-    return f"{prefix}_{_session_counter}"
 
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestIdMiddleware)
+app.mount("/static", StaticFiles(directory="ui/static"), name="static")
+templates = Jinja2Templates(directory="ui/templates")
+# Page de résultats vide, identique pour toutes les recherches : rendue une fois, servie par /results_shell
+results_shell = StaticPage(templates.env, "results.html", {"flights": [], "activities": [], "hotels": []})
 
 # ────────────────────────────────────────────
-# FONCTIONS DE PARSING (réutilisées partout)
+# SUPERVISOR (streaming)
 # ────────────────────────────────────────────
 
-def _extract_section(text: str, start_marker: str, end_marker: str) -> str:
-    """Extrait le texte entre deux balises ### DEBUT_X ### et ### FIN_X ###.
-    Nettoie aussi les blocs JSON/markdown que le LLM pourrait ajouter."""
-    pattern = re.escape(start_marker) + r"(.*?)" + re.escape(end_marker)
-    m = re.search(pattern, text, re.DOTALL)
-    if not m:
-        return ""
-    
-    raw = m.group(1).strip()
-    
-    # Si le LLM a wrappé dans du ```json ... ```, extraire le contenu
-    # et essayer de récupérer le texte brut depuis le JSON
-    if "```json" in raw or '{"' in raw:
-        import json as _json
-        # Enlever les blocs ```json ... ```
-        cleaned = re.sub(r'```json\s*', '', raw)
-        cleaned = re.sub(r'```\s*', '', cleaned)
-        
-        # Essayer de parser chaque bloc JSON et extraire "result"
-        extracted_parts = []
-        for json_match in re.finditer(r'\{[^{}]*"result"\s*:\s*"((?:[^"\\]|\\.)*)"\s*\}', cleaned, re.DOTALL):
-            # Unescape le texte JSON
-            result_text = json_match.group(1)
-            result_text = result_text.replace('\\n', '\n').replace("\\'", "'").replace('\\"', '"')
-            extracted_parts.append(result_text)
-        
-        # Aussi essayer avec des JSON imbriqués type {"key": {"result": "..."}}
-        for json_block in re.finditer(r'\{[^{]*?\{[^}]*"result"\s*:\s*"((?:[^"\\]|\\.)*)"\s*\}[^}]*\}', cleaned, re.DOTALL):
-            result_text = json_block.group(1)
-            result_text = result_text.replace('\\n', '\n').replace("\\'", "'").replace('\\"', '"')
-            if result_text not in extracted_parts:
-                extracted_parts.append(result_text)
-        
-        if extracted_parts:
-            return '\n'.join(extracted_parts).strip()
-        
-        # Si on n'a pas trouvé de "result", retourner le texte nettoyé des balises markdown
-        return cleaned.strip()
-    
-    return raw
+def _tool_call_message(author: str, func_name: str, func_args: dict) -> str:
+    """Message lisible pour le navigateur : '✈️ Agent appelle search_flights(origin=Paris, ...)'."""
+    # Emoji par type d'outil
+    if 'flight' in func_name.lower():
+        icon = "plane"
+    elif 'hotel' in func_name.lower():
+        icon = "hotel"
+    elif 'restaurant' in func_name.lower():
+        icon = "fork"
+    elif 'activit' in func_name.lower():
+        icon = "activity"
+    elif 'transfer' in func_name.lower():
+        icon = "transfer"
+    else:
+        icon = "tool"
 
+    ICONS = {
+        "plane": "\u2708\ufe0f",
+        "hotel": "\U0001f3e8",
+        "fork": "\U0001f374",
+        "activity": "\U0001f3ad",
+        "transfer": "\U0001f500",
+        "tool": "\U0001f527",
+    }
+    emoji = ICONS.get(icon, "\U0001f527")
 
-def _parse_flights(text: str) -> list:
-    """
-    Parse les vols depuis le texte retourné par l'agent.
-    Format attendu: - Airline (FlightNum) : Origin -> Dest | départ TIME arrivée TIME pour PRICE€
-    Version robuste avec fallback.
-    """
-    flights = []
+    args_str = ", ".join(f"{k}={v}" for k, v in func_args.items()) if func_args else ""
+    return f"{emoji} {author} appelle {func_name}({args_str})"
 
-    # --- DEDUPLICATION ---
-    unique_keys = set()
-    deduplicated_flights = []
 
-    # Regex principale
-    flight_pattern = (
-        r"-\s+(.+?)\s+\(([^)]+)\)\s*:\s*(.+?)\s*->\s*(.+?)\s*\|\s*"
-        r"[dé]*[eé]?part\s+(.+?)\s+arriv[ée]+e?\s+(.+?)\s+pour\s+([\d.,]+)\s*€"
-    )
-    for m in re.finditer(flight_pattern, text, re.IGNORECASE):
-        item = {
-            "airline": f"{m.group(1).strip()} ({m.group(2).strip()})",
-            "origin": m.group(3).strip(),
-            "destination": m.group(4).strip(),
-            "departure": m.group(5).strip(),
-            "arrival": m.group(6).strip(),
-            "price": m.group(7).strip().replace(",", ".")
-        }
-        key = f"{item['airline']}|{item['departure']}|{item['arrival']}"
-        if key not in unique_keys:
-            unique_keys.add(key)
-            deduplicated_flights.append(item)
-
-    if deduplicated_flights:
-        return deduplicated_flights
-
-    # --- Fallback : regex plus souple (ligne par ligne) ---
-    for line in text.split("\n"):
-        line = line.strip()
-        if not line.startswith("-"):
-            continue
+# Type de record -> type d'événement SSE envoyé dès la réponse de l'outil
+RECORD_EVENTS = {"flights": "flight", "hotels": "hotel", "activities": "activity"}
 
-        # Tenter d'extraire au moins airline + prix
-        price_match = re.search(r"([\d.,]+)\s*€", line)
-        if not price_match:
-            continue
 
-        price = price_match.group(1).replace(",", ".")
-
-        # Extraire airline (tout avant la parenthèse ou le ":")
-        airline_match = re.match(r"-\s+(.+?)(?:\s*\(|\s*:)", line)
-        airline = airline_match.group(1).strip() if airline_match else "Vol"
-
-        # Extraire flight number si présent
-        fn_match = re.search(r"\(([^)]+)\)", line)
-        if fn_match:
-            airline = f"{airline} ({fn_match.group(1).strip()})"
-
-        # Extraire departure time si présent
-        dep_match = re.search(r"[dé]*[eé]?part\s+(\S+(?:\s+\S+)?)", line, re.IGNORECASE)
-        departure = dep_match.group(1).strip() if dep_match else "N/A"
-
-        item = {
-            "airline": airline,
-            "origin": "",
-            "destination": "",
-            "departure": departure,
-            "arrival": "",
-            "price": price
-        }
-        
-        # Clé un peu plus simple pour le fallback
-        key = f"{item['airline']}|{item['departure']}|{item['price']}"
-        if key not in unique_keys:
-            unique_keys.add(key)
-            deduplicated_flights.append(item)
+# JSON compact pour les données envoyées au navigateur (pas d'espaces après , et :)
+COMPACT = (",", ":")
 
-    return deduplicated_flights
 
+def _record_events(added: dict):
+    """SSE 'flight' / 'hotel' / 'activity' pour les records nouvellement reçus (l'UI les ajoute au DOM)."""
+    for kind, items in added.items():
+        if items:
+            yield f"data: {json.dumps({'type': RECORD_EVENTS[kind], 'items': items}, ensure_ascii=False, separators=COMPACT)}\n\n"
 
-def _parse_activities(text: str) -> list:
-    """
-    Parse les activités/restaurants depuis le texte retourné par l'agent.
-    Format attendu: Type, Nom, Prix€, Description
-    Version robuste avec fallback.
-    """
-    activities = []
-
-    # --- DEDUPLICATION ---
-    unique_keys = set()
-    deduplicated_activities = []
-
-    # --- Regex principale ---
-    act_pattern = r"(Activit[ée]|Restaurant)\s*,\s*([^,]+?)\s*,\s*([\d.,]+)\s*€\s*,\s*(.*)"
-    for m in re.finditer(act_pattern, text, re.IGNORECASE):
-        act_type = m.group(1).strip()
-        # Normaliser le type
-        if act_type.lower().startswith("activit"):
-            act_type = "Activité"
-        else:
-            act_type = "Restaurant"
-
-        item = {
-            "type": act_type,
-            "name": m.group(2).strip(),
-            "price": m.group(3).strip().replace(",", "."),
-            "description": m.group(4).strip()
-        }
-        
-        key = f"{item['name']}|{item['price']}"
-        if key not in unique_keys:
-            unique_keys.add(key)
-            deduplicated_activities.append(item)
-
-    if deduplicated_activities:
-        return deduplicated_activities
-
-    # --- Fallback : lignes avec un prix ---
-    for line in text.split("\n"):
-        line = line.strip()
-        if not line:
-            continue
 
-        # Exclure les lignes qui sont clairement des hôtels
-        lower_line = line.lower()
-        if any(h in lower_line for h in ["€/nuit", "dispo:", "dispo :", "services:", "services :"]):
-            continue
+# Utilisateur des sessions ADK sans utilisateur identifié (recherche : partagée entre requêtes identiques)
+DEFAULT_USER = "user_stream"
 
-        price_match = re.search(r"([\d.,]+)\s*€", line)
-        if not price_match:
-            continue
+# Utilisateur du navigateur (préférences mémorisées) : identifiant opaque émis par le serveur dans
+# un cookie HttpOnly, jamais lu dans un paramètre de requête. Cookie absent ou d'un autre format :
+# nouvel identifiant (pas de partition partagée, pas de partition choisie par le client).
+USER_COOKIE = "travel_user"
+USER_COOKIE_MAX_AGE = 365 * 86400
+_USER_ID_RE = re.compile(r"user_[0-9a-f]{32}")
 
-        price = price_match.group(1).replace(",", ".")
 
-        # Deviner le type
-        lower = line.lower()
-        if any(w in lower for w in ["restaurant", "cuisine", "menu", "plat", "gastronomie"]):
-            act_type = "Restaurant"
-        else:
-            act_type = "Activité"
-
-        # Le reste = nom + description
-        # Enlever le prix du texte pour récupérer le nom
-        clean = re.sub(r"[\d.,]+\s*€/?(?:nuit)?", "", line).strip(" -•·")
-        parts = [p.strip() for p in clean.split(",", 1)]
-        name = parts[0] if parts else line
-        description = parts[1] if len(parts) > 1 else ""
-
-        if name:
-            item = {
-                "type": act_type,
-                "name": name,
-                "price": price,
-                "description": description
-            }
-            key = f"{item['name']}|{item['price']}"
-            if key not in unique_keys:
-                unique_keys.add(key)
-                deduplicated_activities.append(item)
-
-    return deduplicated_activities
-
-
-def _parse_hotels(text: str) -> list:
-    """
-    Parse les hôtels depuis le texte retourné par l'agent.
-    Format attendu: - Nom à Ville pour Prix€/nuit (Dispo: start au end, Services: ...)
-    Version robuste avec fallback.
-    """
-    # --- DEDUPLICATION ---
-    unique_keys = set()
-    deduplicated_hotels = []
-
-    # Regex principale
-    hotel_pattern = (
-        r"-\s+(.+?)\s+[àa]\s+(.+?)\s+pour\s+([\d.,]+)\s*€/nuit\s*"
-        r"\(Dispo\s*:\s*(.+?)\s+au\s+(.+?)\s*,\s*Services?\s*:\s*(.*?)\s*\)"
-    )
-    for m in re.finditer(hotel_pattern, text, re.IGNORECASE):
-        services = m.group(6).strip()
-        if services.endswith(")"): services = services[:-1].strip()
-
-        item = {
-            "name": m.group(1).strip(),
-            "city": m.group(2).strip(),
-            "price": m.group(3).strip().replace(",", "."),
-            "available_start": m.group(4).strip(),
-            "available_end": m.group(5).strip(),
-            "amenities": services
-        }
-        
-        key = f"{item['name']}|{item['city']}"
-        if key not in unique_keys:
-            unique_keys.add(key)
-            deduplicated_hotels.append(item)
-
-    if deduplicated_hotels:
-        return deduplicated_hotels
-
-    # --- Fallback ---
-    for line in text.split("\n"):
-        line = line.strip()
-        if not line.startswith("-") or "€/nuit" not in line:
-            continue
-
-        price_match = re.search(r"([\d.,]+)\s*€/nuit", line)
-        if not price_match:
-            continue
+def _request_user(request: Request) -> tuple:
+    """(identifiant de l'utilisateur, True s'il vient d'être créé et doit partir dans un cookie)."""
+    user_id = request.cookies.get(USER_COOKIE, "")
+    if _USER_ID_RE.fullmatch(user_id):
+        return user_id, False
+    return new_session_id("user"), True
 
-        price = price_match.group(1).replace(",", ".")
-        # Extraire le nom (entre "- " et " à " ou le premier séparateur)
-        name_match = re.match(r"-\s+(.+?)(?:\s+[àa]\s+|\s+pour\s+|\s*\()", line)
-        name = name_match.group(1).strip() if name_match else "Hôtel"
-
-        # Extraire la ville (après "à" et avant "pour")
-        city_match = re.search(r"[àa]\s+(.+?)\s+pour", line, re.IGNORECASE)
-        city = city_match.group(1).strip() if city_match else ""
-
-        # Extraire les dates
-        date_match = re.search(r"Dispo\s*:\s*(\S+)\s+au\s+(\S+)", line, re.IGNORECASE)
-        available_start = date_match.group(1) if date_match else ""
-        available_end = date_match.group(2) if date_match else ""
-
-        # Tentative d'extraction services
-        services = ""
-        serv_match = re.search(r"Services?\s*:\s*(.*?)(?:\)|$)", line, re.IGNORECASE)
-        if serv_match:
-            services = serv_match.group(1).strip()
-
-        item = {
-            "name": name,
-            "city": city,
-            "price": price,
-            "available_start": available_start,
-            "available_end": available_end,
-            "amenities": services
-        }
-        
-        key = f"{item['name']}|{item['city']}"
-        if key not in unique_keys:
-            unique_keys.add(key)
-            deduplicated_hotels.append(item)
 
-    return deduplicated_hotels
+def _with_user_cookie(response, user_id: str, new: bool):
+    if new:
+        response.set_cookie(USER_COOKIE, user_id, max_age=USER_COOKIE_MAX_AGE, httponly=True, samesite="lax")
+    return response
 
 
-async def _run_supervisor_streaming(prompt_text: str, agent=None):
+async def _run_supervisor_streaming(prompt_text: str, agent=None, records: RecordCollector = None,
+                                    sections: SectionParser = None, progressive: bool = False,
+                                    user_id: str = DEFAULT_USER):
     """
     Async generator : yield des SSE log events pendant l'exécution du supervisor,
     puis yield le texte final en dernier (marqué type='supervisor_done').
     agent: l'agent à utiliser (root_agent par défaut, refine_supervisor pour le chat)
+    records: reçoit les résultats structurés des outils (function_response), sans passer par le texte
+    sections: parse le texte du LLM au fil de l'eau (balises ### DEBUT_X ###), au cas où aucun outil ne répond
+    progressive: envoie aussi les records au navigateur dès leur arrivée (événements flight/hotel/activity)
+    user_id: utilisateur de la session ADK (save_memory / load_memory rangent ses préférences à part)
     """
     if agent is None:
         agent = root_agent
 
     app_name = "travel_agent"
-    user_id = "user_stream"
-    session_id = _next_session_id("supervisor")
+    session_id = new_session_id("supervisor")
 
     try:
-        await session_service.create_session(
-            user_id=user_id, session_id=session_id, app_name=app_name
-        )
+        with span("supervisor.session_create"):
+            await session_service.create_session(
+                user_id=user_id, session_id=session_id, app_name=app_name
+            )
     except Exception:
         pass
 
@@ -373,80 +199,79 @@ async def _run_supervisor_streaming(prompt_text: str, agent=None):
     tool_responses_text = ""
     event_count = 0
 
-    print("\n" + "=" * 60)
-    print("  SUPERVISOR - DEBUT D'EXECUTION")
-    print("=" * 60)
-
-    async for event in runner.run_async(
-        user_id=user_id, session_id=session_id,
-        new_message=prompt, run_config=run_config
-    ):
-        event_count += 1
-        author = getattr(event, 'author', '???')
-        print(f"\n--- Event #{event_count} | Auteur: {author} ---")
-
-        if hasattr(event, 'content') and event.content and hasattr(event.content, 'parts') and event.content.parts:
-            for part in event.content.parts:
-
-                # Tool call -> stream au navigateur
-                if hasattr(part, 'function_call') and part.function_call:
-                    fc = part.function_call
-                    func_name = getattr(fc, 'name', '???')
-                    func_args = getattr(fc, 'args', {})
-                    print(f"  >> TOOL CALL: {func_name}({func_args})")
-
-                    # Emoji par type d'outil
-                    if 'flight' in func_name.lower():
-                        icon = "plane"
-                    elif 'hotel' in func_name.lower():
-                        icon = "hotel"
-                    elif 'restaurant' in func_name.lower():
-                        icon = "fork"
-                    elif 'activit' in func_name.lower():
-                        icon = "activity"
-                    elif 'transfer' in func_name.lower():
-                        icon = "transfer"
-                    else:
-                        icon = "tool"
-
-                    ICONS = {
-                        "plane": "\u2708\ufe0f",
-                        "hotel": "\U0001f3e8",
-                        "fork": "\U0001f374",
-                        "activity": "\U0001f3ad",
-                        "transfer": "\U0001f500",
-                        "tool": "\U0001f527",
-                    }
-                    emoji = ICONS.get(icon, "\U0001f527")
-
-                    # Message lisible pour le navigateur
-                    args_str = ", ".join(f"{k}={v}" for k, v in func_args.items()) if func_args else ""
-                    log_msg = f"{emoji} {author} appelle {func_name}({args_str})"
-                    yield f"data: {json.dumps({'type': 'tool', 'message': log_msg}, ensure_ascii=False)}\n\n"
-
-                # Tool response -> stream au navigateur
-                if hasattr(part, 'function_response') and part.function_response:
-                    fr = part.function_response
-                    resp_name = getattr(fr, 'name', '???')
-                    resp_data = getattr(fr, 'response', '')
-                    resp_str = str(resp_data)
-                    if len(resp_str) > 200:
-                        resp_str = resp_str[:200] + "..."
-                    print(f"  << TOOL RESPONSE ({resp_name}): {resp_str}")
-
-                    # Capturer le résultat des outils métier (fallback si le sub-agent ne génère pas de texte)
-                    if resp_name not in ('transfer_to_agent',) and isinstance(resp_data, dict):
-                        result_val = resp_data.get('result', '')
-                        if result_val and isinstance(result_val, str):
-                            tool_responses_text += result_val + "\n"
-
-                    yield f"data: {json.dumps({'type': 'log', 'message': f'Resultat de {resp_name} recu'}, ensure_ascii=False)}\n\n"
-
-                # Texte normal
-                if hasattr(part, 'text') and part.text:
-                    text_preview = part.text[:200] + "..." if len(part.text) > 200 else part.text
-                    print(f"  TEXT [{author}]: {text_preview}")
-                    full_text += part.text
+    log.debug("supervisor %s : début (session %s)", agent.name, session_id)
+
+    try:
+        # Attente de chaque event du Runner : réponse du modèle ou exécution des outils
+        # (le temps passé à envoyer nos SSE, pendant les yield, n'est pas compté)
+        waiting_since = time.perf_counter()
+        async for event in runner.run_async(
+            user_id=user_id, session_id=session_id,
+            new_message=prompt, run_config=run_config
+        ):
+            event_count += 1
+            author = getattr(event, 'author', '???')
+            log.debug("event #%d | auteur : %s", event_count, author)
+
+            parts = event.content.parts if getattr(event, 'content', None) and event.content.parts else ()
+            from_tools = any(getattr(part, 'function_response', None) for part in parts)
+            record("supervisor.tools" if from_tools else "supervisor.model", time.perf_counter() - waiting_since)
+
+            if parts:
+                for part in parts:
+
+                    # Tool call -> stream au navigateur
+                    if hasattr(part, 'function_call') and part.function_call:
+                        fc = part.function_call
+                        func_name = getattr(fc, 'name', '???')
+                        func_args = getattr(fc, 'args', {})
+                        log.debug(">> tool call : %s(%s)", func_name, func_args)
+
+                        log_msg = _tool_call_message(author, func_name, func_args)
+                        yield f"data: {json.dumps({'type': 'tool', 'message': log_msg}, ensure_ascii=False)}\n\n"
+
+                    # Tool response -> stream au navigateur
+                    if hasattr(part, 'function_response') and part.function_response:
+                        fr = part.function_response
+                        resp_name = getattr(fr, 'name', '???')
+                        resp_data = getattr(fr, 'response', '')
+                        # Le modèle n'a reçu que le texte : records repris là où keep_records les a rangés
+                        resp_data = take_records(getattr(fr, 'id', None)) or resp_data
+                        # %.200s : str() et troncature seulement si le niveau DEBUG est actif
+                        log.debug("<< tool response (%s) : %.200s", resp_name, resp_data)
+
+                        # Capturer le résultat des outils métier (fallback si le sub-agent ne génère pas de texte)
+                        if resp_name not in ('transfer_to_agent',) and isinstance(resp_data, dict):
+                            result_val = resp_data.get('result', '')
+                            if result_val and isinstance(result_val, str):
+                                tool_responses_text += result_val + "\n"
+                            # Résultats typés : envoyés tels quels à l'UI
+                            if records is not None:
+                                added = records.add(resp_data)
+                                if progressive:
+                                    for record_sse in _record_events(added):
+                                        yield record_sse
+
+                        yield f"data: {json.dumps({'type': 'log', 'message': f'Resultat de {resp_name} recu'}, ensure_ascii=False)}\n\n"
+
+                    # Texte normal
+                    if hasattr(part, 'text') and part.text:
+                        log.debug("texte [%s] : %.200s", author, part.text)
+                        full_text += part.text
+                        if sections is not None:
+                            sections.feed(part.text)
+
+            waiting_since = time.perf_counter()
+    finally:
+        # Session à usage unique : on la libère (sinon elle reste en mémoire / en base)
+        try:
+            with span("supervisor.session_delete"):
+                await session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        except Exception:
+            pass
+
+    if records is not None:
+        records.agent_text = full_text
 
     # Toujours ajouter les tool_responses au full_text pour que les parsers
     # puissent matcher le format "- Nom à Ville pour Prix€/nuit (...)" même
@@ -455,51 +280,249 @@ async def _run_supervisor_streaming(prompt_text: str, agent=None):
         if full_text.strip():
             full_text = full_text.rstrip() + "\n\n" + tool_responses_text.strip()
         else:
-            print("WARN: full_text vide, utilisation des tool_responses comme fallback")
+            log.warning("texte du supervisor vide, utilisation des réponses des outils")
             full_text = tool_responses_text.strip()
 
-    print("\n" + "=" * 60)
-    print(f"  SUPERVISOR - FIN ({event_count} events)")
-    print(f"  Reponse totale: {len(full_text)} caracteres")
-    print("=" * 60 + "\n")
+    log.info("supervisor %s : %d events, réponse de %d caractères", agent.name, event_count, len(full_text))
 
     # Dernier yield = le texte complet
     yield f"__DONE__{full_text}"
 
 
 # ────────────────────────────────────────────
-# ROUTES
+# FAST PATH : formulaire complet -> outils appelés en direct, sans LLM
 # ────────────────────────────────────────────
 
-@app.get("/", response_class=HTMLResponse)
-async def read_root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+# "auto" : fast path dès que le formulaire est structuré, "off" : toujours le LLM
+FAST_PATH_MODE = os.environ.get("SEARCH_FAST_PATH", "auto").lower()
+# Délai max de la branche confiée à un agent LLM (les branches d'outils : BRANCH_TIMEOUT)
+LLM_BRANCH_TIMEOUT = float(os.environ.get("LLM_BRANCH_TIMEOUT", "60"))
 
+RESTAURANT_WORDS = {"restaurant", "restaurants", "resto", "restos", "manger", "cuisine", "gastronomie"}
+ACTIVITY_WORDS = {"activite", "activites", "visite", "visites", "tourisme"}
+# Au-delà, le champ "activités" est considéré comme du texte libre (-> LLM)
+MAX_KEYWORD_WORDS = 4
 
-@app.get("/stream_search")
-async def stream_search(
-    request: Request,
-    origin: str,
-    destination: str,
-    departure_date: str = None,
-    budget_max: str = None,
-    airline: str = None,
-    activities: str = None,
-    hotel_budget_max: str = None,
-    amenities: str = None
-):
-    print(f"\n>>> NOUVELLE REQUETE : {origin} -> {destination}")
 
-    async def event_generator():
-        yield f"data: {json.dumps({'type': 'log', 'message': 'Connexion au Supervisor...'})}\n\n"
-        await asyncio.sleep(0.3)
+def _parse_amount(value: str):
+    """'150' -> 150.0, '' / None -> None. Lève ValueError si ce n'est pas un nombre."""
+    if value is None or not value.strip():
+        return None
+    return float(value.strip().replace(",", ".").rstrip("€").strip())
+
+
+def _plan_search(origin: str, destination: str, departure_date: str = None, budget_max: str = None,
+                 airline: str = None, activities: str = None, hotel_budget_max: str = None,
+                 amenities: str = None):
+    """
+    Traduit le formulaire de /stream_search en appels d'outils.
+    Retourne None si la demande n'est pas entièrement structurée (texte libre,
+    date ou budget illisibles) : elle part alors au LLM.
+    """
+    if FAST_PATH_MODE == "off" or not origin or not destination:
+        return None
+    try:
+        if departure_date:
+            datetime.strptime(departure_date, "%Y-%m-%d")
+        max_price = _parse_amount(budget_max)
+        hotel_budget = _parse_amount(hotel_budget_max)
+    except ValueError:
+        return None
+
+    words = (activities or "").replace(",", " ").split()
+    if len(words) > MAX_KEYWORD_WORDS or any(c in (activities or "") for c in "?!."):
+        return None
+
+    # "restaurant vegan" -> search_restaurants(keyword="vegan"), "musée" -> les deux outils avec "musée"
+    keys = [normalize_key(w) for w in words]
+    keyword = " ".join(w for w, k in zip(words, keys) if k not in RESTAURANT_WORDS | ACTIVITY_WORDS) or None
+    wants_restaurants = any(k in RESTAURANT_WORDS for k in keys)
+    wants_activities = any(k in ACTIVITY_WORDS for k in keys)
+    if not wants_restaurants and not wants_activities:
+        wants_restaurants = wants_activities = True
+    places = []
+    if wants_activities:
+        places.append((search_activities_async, keyword))
+    if wants_restaurants:
+        places.append((search_restaurants_async, keyword))
+
+    return {
+        "flights": {
+            "origin": origin,
+            "destination": destination,
+            "preferred_date": departure_date or None,
+            "max_price": max_price,
+            "preferred_airline": airline.strip() if airline and airline.strip() else None,
+        },
+        "hotels": {
+            "city": destination,
+            "budget": hotel_budget if hotel_budget is not None else 1000000,
+            "amenities": amenities.strip() if amenities and amenities.strip() else None,
+        },
+        "places": places,
+        # Même stratégie que le prompt LLM : l'hôtel suit l'arrivée du vol si une date est fixée
+        "chain_hotel_date": bool(departure_date),
+        "departure_date": departure_date or None,
+    }
+
+
+def _tool_branch(tool, arguments, after: tuple = ()) -> Branch:
+    """Branche (nommée comme l'outil) ; `arguments(deps)` donne ses paramètres une fois les dépendances connues."""
+    async def run(deps: dict, emit):
+        kwargs = arguments(deps)
+        args = {k: v for k, v in kwargs.items() if v is not None}
+        emit(f"data: {json.dumps({'type': 'tool', 'message': _tool_call_message('FastPath', tool.__name__, args)}, ensure_ascii=False)}\n\n")
+        return await tool(**kwargs)
+
+    return Branch(tool.__name__, run, after=after)
+
+
+def _agent_branch(agent, prompt_text: str, records: RecordCollector) -> Branch:
+    """
+    Branche confiée à un agent LLM (texte libre) : ses SSE et ses records passent dans le flux
+    au fil de l'eau ; valeur = texte de l'agent.
+    """
+    async def run(deps: dict, emit):
+        sections = SectionParser()
+        text = ""
+        async for sse_or_done in _run_supervisor_streaming(prompt_text, agent=agent, records=records,
+                                                           sections=sections, progressive=True):
+            if sse_or_done.startswith("__DONE__"):
+                text = sse_or_done[8:]
+            else:
+                emit(sse_or_done)
+        if "activities" not in records.answered:
+            # L'agent a répondu sans appeler d'outil : ses lieux sont lus dans son texte
+            _, activities, _ = sections.finish(fallback_text=text)
+            for record_sse in _record_events(records.add({"activities": activities})):
+                emit(record_sse)
+        return {"result": text}
+
+    return Branch(agent.name, run, timeout=LLM_BRANCH_TIMEOUT)
+
+
+async def _run_fast_path(plan: dict, records: RecordCollector, places_prompt: str = None):
+    """
+    Même protocole que _run_supervisor_streaming (SSE puis "__DONE__{texte}"), mais
+    sans supervisor : branches orchestrées (core.orchestration).
+    - vols, activités et restaurants démarrent ensemble ;
+    - l'hôtel démarre dès que le vol est connu (date d'arrivée du moins cher) si une date est fixée,
+      sinon tout de suite ;
+    - places_prompt : activités en texte libre, confiées au seul activity_agent (LLM),
+      en parallèle des outils.
+    Chaque branche a son délai max ; un record est envoyé au navigateur dès la réponse de son outil.
+    Le texte final reprend les balises ### DEBUT_X ### du supervisor.
+    """
+    flights_args = plan["flights"]
+    hotels_args = plan["hotels"]
+
+    def hotel_arguments(deps: dict) -> dict:
+        date_start = None
+        if plan["chain_hotel_date"]:
+            first = (deps.get("search_flights") or {}).get("flights")
+            date_start = first[0]["arrival"][:10] if first else plan["departure_date"]
+        return {**hotels_args, "date_start": date_start}
+
+    branches = [_tool_branch(search_flights_async, lambda deps: flights_args)]
+    if places_prompt:
+        branches.append(_agent_branch(activity_agent, places_prompt, records))
+    for tool, keyword in plan["places"]:
+        branches.append(_tool_branch(tool, lambda deps, keyword=keyword: {"city": hotels_args["city"], "keyword": keyword}))
+    branches.append(_tool_branch(search_hotels_async, hotel_arguments,
+                                 after=("search_flights",) if plan["chain_hotel_date"] else ()))
+
+    branch_run = BranchRun()
+    async for item in run_branches(branches, branch_run):
+        if not isinstance(item, BranchResult):
+            yield item
+            continue
+        if not item.ok:
+            reason = "délai dépassé" if item.timed_out else str(item.error)
+            log.warning("branche %s : %s", item.name, reason)
+            # Résultats incomplets : la recherche ne sera pas mise en cache
+            records.fail(item.name, reason)
+            yield f"data: {json.dumps({'type': 'log', 'message': f'{item.name} : {reason}'}, ensure_ascii=False)}\n\n"
+            continue
+        if item.name != activity_agent.name:
+            # Les records de l'agent sont déjà partis au fil de son run
+            for record_sse in _record_events(records.add(item.value)):
+                yield record_sse
+        yield f"data: {json.dumps({'type': 'log', 'message': f'Resultat de {item.name} recu'}, ensure_ascii=False)}\n\n"
+
+    summary = branch_run.summary()
+    log.info("branches : %.1f ms (somme %.1f ms), chemin critique %s, %s appel LLM",
+             summary["total_ms"], summary["sum_ms"], " -> ".join(summary["critical_path"]),
+             "avec" if places_prompt else "sans")
+
+    def text(name: str) -> str:
+        return str(branch_run.value(name, {}).get("result", "")).strip()
+
+    activities_text = "\n".join(text(tool.__name__) for tool, _ in plan["places"])
+    full_text = (
+        f"### DEBUT_VOLS ###\n{text('search_flights')}\n### FIN_VOLS ###\n"
+        f"### DEBUT_ACTIVITES ###\n{activities_text}\n### FIN_ACTIVITES ###\n"
+        f"### DEBUT_HOTELS ###\n{text('search_hotels')}\n### FIN_HOTELS ###"
+    )
+    if places_prompt:
+        full_text += "\n" + text(activity_agent.name)
+    yield f"__DONE__{full_text}"
+
 
+# Champs de _search_key, dans l'ordre
+SEARCH_KEY_FIELDS = ("origin", "destination", "departure_date", "budget_max", "airline", "activities",
+                     "hotel_budget_max", "amenities")
+
+
+def _search_key(origin: str, destination: str, departure_date: str = None, budget_max: str = None,
+                airline: str = None, activities: str = None, hotel_budget_max: str = None,
+                amenities: str = None) -> tuple:
+    """Paramètres de /stream_search normalisés : deux formulaires équivalents donnent la même clé."""
+    def text(value):
+        return " ".join(normalize_key(w) for w in (value or "").replace(",", " ").split())
+
+    def amount(value):
+        try:
+            return _parse_amount(value)
+        except ValueError:
+            return (value or "").strip()
+
+    return (text(origin), text(destination), (departure_date or "").strip(), amount(budget_max),
+            text(airline), text(activities), amount(hotel_budget_max), text(amenities))
+
+
+async def _search_pipeline(client: str, origin: str, destination: str, departure_date: str = None,
+                           budget_max: str = None, airline: str = None, activities: str = None,
+                           hotel_budget_max: str = None, amenities: str = None):
+    """
+    Recherche complète (fast path, fast path + activity_agent, ou supervisor) : yield les SSE
+    de progression et les records, puis en dernier un dict {"flights", "activities", "hotels"}.
+    Ne dépend que des paramètres du formulaire : son flux peut être partagé entre requêtes identiques.
+    client: clé d'équité de la file d'attente (adresse du client qui a lancé le pipeline)
+    """
+    # -- Formulaire entièrement structuré : appels directs aux outils, sans LLM --
+    plan = _plan_search(origin, destination, departure_date, budget_max, airline,
+                        activities, hotel_budget_max, amenities)
+    # -- Seules les activités sont en texte libre : outils en direct, activity_agent pour ce champ seulement --
+    places_prompt = None
+    if plan is None and activities and activities.strip():
+        plan = _plan_search(origin, destination, departure_date, budget_max, airline,
+                            None, hotel_budget_max, amenities)
+        if plan is not None:
+            plan["places"] = []
+            places_prompt = f"Je veux voyager de {origin} vers {destination}. Je cherche spécifiquement : {activities}."
+    records = RecordCollector()
+    sections = SectionParser()
+    cache_key = None
+    if plan and not places_prompt:
+        yield f"data: {json.dumps({'type': 'tool', 'message': 'Recherche directe dans les bases (sans LLM)...'})}\n\n"
+        source = _run_fast_path(plan, records)
+    else:
         # -- Construire UN SEUL prompt naturel pour le Supervisor --
         prompt_parts = [f"Je veux voyager de {origin} vers {destination}."]
 
         if departure_date:
             prompt_parts.append(f"Date souhaitee : {departure_date}.")
-            
+
             # --- INSTRUCTION SÉQUENTIELLE OBLIGATOIRE (Si date fixée) ---
             prompt_parts.append("""
             IMPORTANT - STRATÉGIE D'EXECUTION OBLIGATOIRE :
@@ -515,7 +538,7 @@ async def stream_search(
             Aucune date précise n'est fixée. Cherche des vols et des hôtels disponibles globalement pour donner des idées.
             N'hésite pas à proposer plusieurs options d'hôtels, même si les dates ne correspondent pas exactement à un vol précis.
             """)
-        
+
         if activities and activities.strip():
             # Si l'utilisateur a spécifié quelque chose (ex: "restaurant"), on filtre
             prompt_parts.append(f"Je cherche spécifiquement : {activities}.")
@@ -530,78 +553,222 @@ async def stream_search(
             prompt_parts.append(f"Tous les hotels sont attendus.")
 
         prompt_text = " ".join(prompt_parts)
-        print(f"PROMPT SUPERVISOR: {prompt_text}")
-
-        yield f"data: {json.dumps({'type': 'tool', 'message': 'Le Supervisor delegue aux agents specialises...'})}\n\n"
-
-        # -- Appel streaming au Supervisor --
-        full_response = ""
+        log.debug("prompt supervisor : %s", prompt_text)
+
+        # -- Même prompt déjà traité, bases inchangées : résultats servis sans appeler le modèle --
+        if RESPONSE_CACHE_ENABLED:
+            if plan:
+                # Vols et hôtels viennent de _plan_search (budget, compagnie...), absents du prompt :
+                # clé sur le formulaire normalisé, et sur l'agent qui traite les activités
+                form = _search_key(origin, destination, departure_date, budget_max, airline,
+                                   activities, hotel_budget_max, amenities)
+                keyed = " ".join(f"{name}={value}" for name, value in zip(SEARCH_KEY_FIELDS, form))
+                cache_key = response_cache.key(f"fast_path {keyed}", activity_agent)
+            else:
+                cache_key = response_cache.key(prompt_text, root_agent)
+            with span("response_cache.get"):
+                cached = await response_cache.get(cache_key)
+            if cached is not None:
+                log.info("cache de réponses : résultats servis sans LLM (%s)", cache_key[:12])
+                yield f"data: {json.dumps({'type': 'log', 'message': 'Recherche deja effectuee : resultats en cache'})}\n\n"
+                for record_sse in _record_events(cached):
+                    yield record_sse
+                yield cached
+                return
+
+        if plan:
+            yield f"data: {json.dumps({'type': 'tool', 'message': 'Recherche directe dans les bases, activites confiees a l agent...'})}\n\n"
+            source = _run_fast_path(plan, records, places_prompt=places_prompt)
+        else:
+            yield f"data: {json.dumps({'type': 'tool', 'message': 'Le Supervisor delegue aux agents specialises...'})}\n\n"
+            source = _run_supervisor_streaming(prompt_text, records=records, sections=sections, progressive=True)
+
+    # -- Appel streaming au Supervisor (un créneau de la limite globale) --
+    if search_limiter.busy():
+        yield f"data: {json.dumps({'type': 'log', 'message': f'En file d’attente ({search_limiter.waiting + 1})...'})}\n\n"
+    full_response = ""
+    failed = False
+    queued_since = time.perf_counter()
+    async with search_limiter.slot(client):
+        record("limiter.wait", time.perf_counter() - queued_since)
         try:
-            async for sse_or_done in _run_supervisor_streaming(prompt_text):
+            async for sse_or_done in source:
                 if sse_or_done.startswith("__DONE__"):
                     full_response = sse_or_done[8:]  # Enlever le prefix __DONE__
                 else:
                     yield sse_or_done  # Forward les SSE events au navigateur
         except Exception as e:
+            failed = True
             full_response = f"Erreur supervisor: {e}"
-            print(f"ERREUR SUPERVISOR: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("erreur supervisor")
             yield f"data: {json.dumps({'type': 'log', 'message': f'Erreur: {e}'})}\n\n"
 
-        print(f"REPONSE SUPERVISOR:\n{full_response}\n---")
-
-        # -- Extraction des sections via les markers --
-        flights_text = _extract_section(full_response, "### DEBUT_VOLS ###", "### FIN_VOLS ###")
-        activities_text = _extract_section(full_response, "### DEBUT_ACTIVITES ###", "### FIN_ACTIVITES ###")
-        # Le supervisor peut créer une section RESTAURANTS séparée
-        restaurants_text = _extract_section(full_response, "### DEBUT_RESTAURANTS ###", "### FIN_RESTAURANTS ###")
-        if restaurants_text:
-            activities_text = (activities_text + "\n" + restaurants_text).strip()
-        hotels_text = _extract_section(full_response, "### DEBUT_HOTELS ###", "### FIN_HOTELS ###")
-
-        # Si pas de markers, on essaie de parser la reponse brute entiere
-        if not flights_text and not activities_text and not hotels_text:
-            print("WARN: Aucun marker ### DEBUT/FIN ### trouve, parsing sur la reponse brute")
-            flights_text = full_response
-            activities_text = full_response
-            hotels_text = full_response
-
-        # -- Parsing --
-        flights = _parse_flights(flights_text)
-        act_list = _parse_activities(activities_text)
-        hotels_list = _parse_hotels(hotels_text)
-
-        yield f"data: {json.dumps({'type': 'log', 'message': f'Resultats : {len(flights)} Vols, {len(act_list)} Activites, {len(hotels_list)} Hotels'})}\n\n"
-        print(f"STATS : {len(flights)} Vols | {len(act_list)} Activites | {len(hotels_list)} Hotels")
-
-        # Debug: si rien n'a été parsé, afficher les premières lignes
-        if not flights and not act_list and not hotels_list:
-            print("WARN: Aucun resultat parse! Apercu de la reponse:")
-            for i, line in enumerate(full_response.split("\n")[:20]):
-                print(f"  L{i}: {line}")
-
-        session_key = f"{origin}_{destination}"
-        session_results[session_key] = {
-            'flights': flights,
-            'activities': act_list,
-            'hotels': hotels_list
-        }
-
-        final_html = templates.get_template("results.html").render({
-            "request": request,
-            "response": full_response,
-            "flights": flights,
-            "activities": act_list,
-            "hotels": hotels_list,
-            "origin": origin,
-            "destination": destination,
-            "departure_date": departure_date
-        })
+    log.debug("réponse supervisor :\n%.2000s", full_response)
+
+    # -- Résultats typés capturés dans les function_response (pas de re-parsing) --
+    if records.answered:
+        flights = records.get("flights")
+        act_list = records.get("activities")
+        hotels_list = records.get("hotels")
+    else:
+        # Aucun outil n'a répondu : on se rabat sur le texte du supervisor, déjà parsé au fil du stream
+        flights, act_list, hotels_list = sections.finish(fallback_text=full_response)
+        parsed = {"flights": flights, "activities": act_list, "hotels": hotels_list}
+        for record_sse in _record_events(parsed):
+            yield record_sse
+
+    yield f"data: {json.dumps({'type': 'log', 'message': f'Resultats : {len(flights)} Vols, {len(act_list)} Activites, {len(hotels_list)} Hotels'})}\n\n"
+    log.info("résultats : %d vols | %d activités | %d hôtels", len(flights), len(act_list), len(hotels_list))
+
+    # Debug: si rien n'a été parsé, afficher le début de la réponse
+    if not flights and not act_list and not hotels_list:
+        log.warning("aucun résultat parsé ; début de la réponse :\n%.1500s", full_response)
+
+    results = {"flights": flights, "activities": act_list, "hotels": hotels_list}
+
+    # -- Run LLM réussi et complet (vols, activités et hôtels, aucun outil ni branche en échec) :
+    #    gardé pour les prochaines demandes identiques. Sans outil appelé, les trois sections du texte font foi --
+    if records.answered:
+        complete = records.complete()
+    else:
+        complete = not records.failures and set(RECORD_KINDS) <= sections.sections_seen
+    if records.failures:
+        log.warning("résultats incomplets, non mis en cache : %s", " | ".join(records.failures))
+    if cache_key is not None and not failed and complete and (flights or act_list or hotels_list):
+        try:
+            await response_cache.put(cache_key, results)
+        except Exception:
+            log.warning("cache de réponses : écriture impossible", exc_info=True)
+
+    yield results
+
+
+async def _timed_stream(endpoint: str, events, send_timings: bool = False):
+    """
+    Flux SSE mesuré : ouvre le relevé de la requête (core.metrics), et si `send_timings`,
+    ajoute en dernier un événement 'timings' (durée totale et temps cumulé par étape).
+    """
+    request_timings = start_request_timings(endpoint)
+    try:
+        async for event in events:
+            yield event
+        if send_timings:
+            yield f"data: {json.dumps({'type': 'timings', **request_timings.summary()})}\n\n"
+    finally:
+        request_timings.finish()
+
+
+# ────────────────────────────────────────────
+# ROUTES
+# ────────────────────────────────────────────
+
+@app.get("/", response_class=HTMLResponse)
+async def read_root(request: Request):
+    # Identifiant émis dès la page d'accueil : la recherche et le chat le retrouvent dans le cookie
+    user_id, new = _request_user(request)
+    return _with_user_cookie(templates.TemplateResponse("index.html", {"request": request}), user_id, new)
+
 
-        yield f"data: {json.dumps({'type': 'complete', 'html': final_html})}\n\n"
+@app.get("/results_shell")
+async def get_results_shell(request: Request):
+    """Page de résultats vide (HTML statique) : ETag + gzip, 304 si le navigateur l'a déjà."""
+    return results_shell.response(request)
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+@app.get("/stream_search")
+async def stream_search(
+    request: Request,
+    origin: str,
+    destination: str,
+    departure_date: str = None,
+    budget_max: str = None,
+    airline: str = None,
+    activities: str = None,
+    hotel_budget_max: str = None,
+    amenities: str = None,
+    timings: bool = False
+):
+    log.info("recherche : %s -> %s", origin, destination)
+    client = request.client.host if request.client else "-"
+    user_id, new_user = _request_user(request)
+
+    async def event_generator():
+        yield f"data: {json.dumps({'type': 'log', 'message': 'Connexion au Supervisor...'})}\n\n"
+
+        # Un identifiant par recherche : deux utilisateurs sur le même trajet ne s'écrasent plus
+        results_id = new_session_id("results")
+
+        # Page de résultats : statique (chargée via /results_shell, en cache navigateur grâce à l'ETag) ;
+        # seul son contexte part dans le flux, les records y sont ajoutés au fil de l'eau
+        context = {"origin": origin, "destination": destination, "departure_date": departure_date,
+                   "session_id": results_id}
+        shell = {"type": "shell", "url": "/results_shell", "etag": results_shell.current_etag(), "context": context}
+        yield f"data: {json.dumps(shell, ensure_ascii=False, separators=COMPACT)}\n\n"
+
+        # -- Pipeline (fast path ou supervisor), partagé avec les requêtes identiques en cours --
+        def pipeline():
+            return _search_pipeline(client, origin, destination, departure_date, budget_max, airline,
+                                    activities, hotel_budget_max, amenities)
+
+        if COALESCE_ENABLED:
+            key = _search_key(origin, destination, departure_date, budget_max, airline,
+                              activities, hotel_budget_max, amenities)
+            source = inflight_searches.stream(key, pipeline)
+        else:
+            source = pipeline()
+
+        results = {"flights": [], "activities": [], "hotels": []}
+        try:
+            async for item in source:
+                if isinstance(item, dict):
+                    results = item
+                else:
+                    yield item
+        except QueueFull:
+            log.warning("recherche refusée : file d'attente pleine")
+            yield f"data: {json.dumps({'type': 'error', 'message': 'Trop de recherches en cours, réessayez dans un instant.'})}\n\n"
+            return
+        flights, act_list, hotels_list = results["flights"], results["activities"], results["hotels"]
+
+        with span("result_store.put"):
+            await result_store.put(results_id, {
+                'user_id': user_id,
+                'origin': origin,
+                'destination': destination,
+                'departure_date': departure_date,
+                'flights': flights,
+                'activities': act_list,
+                'hotels': hotels_list
+            })
+
+        # Les résultats sont déjà dans la page : la fin du stream ne porte plus que le résumé
+        counts = {"flights": len(flights), "activities": len(act_list), "hotels": len(hotels_list)}
+        yield f"data: {json.dumps({'type': 'complete', 'session_id': results_id, 'counts': counts})}\n\n"
+
+    return _with_user_cookie(StreamingResponse(_timed_stream("/stream_search", event_generator(), timings),
+                                               media_type="text/event-stream"), user_id, new_user)
+
+
+@app.get("/debug/loop")
+async def debug_loop(reset: bool = False):
+    """Retard de planification de la boucle asyncio (max depuis le démarrage ou le dernier reset)."""
+    snapshot = loop_monitor.snapshot()
+    if reset:
+        loop_monitor.reset()
+    return snapshot
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Histogrammes des durées par étape et par endpoint, format texte Prometheus."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/debug/searches")
+async def debug_searches():
+    """Pipelines actifs / en file (limite globale), recherches coalescées, cache des runs du supervisor, routage du chat."""
+    return {"limiter": search_limiter.snapshot(), "coalescing": inflight_searches.snapshot(),
+            "response_cache": response_cache.stats(), "refine_routes": refine_routes}
 
 
 @app.post("/search", response_class=HTMLResponse)
@@ -614,9 +781,37 @@ async def handle_search(
     return await stream_search(request, origin, destination, preferences)
 
 
+# Intention reconnue localement -> agent spécialisé appelé sans passer par refine_supervisor
+REFINE_AGENTS = {"flight": refine_flight_agent, "hotel": refine_hotel_agent, "activity": refine_activity_agent}
+refine_routes = {"cache": 0, "local": 0, "llm": 0}
+
+# Libellés des résultats dans les messages du chat
+RESULT_LABELS = {"flights": "vol(s)", "activities": "activité(s)/restaurant(s)", "hotels": "hôtel(s)"}
+
+
+def _refine_preferences(cues: list) -> list:
+    """Préférences à mémoriser (ce que refine_supervisor confie à save_memory) : attributs d'activité reconnus."""
+    activity = VOCABULARY["activity"]
+    return list(dict.fromkeys(c for c in cues if activity.get(c, activity.get(c[:-1])) == WEAK))
+
+
+async def _remember(user_id: str, preferences: list):
+    """Le supervisor mémorisait les goûts exprimés (save_memory) : même chose, sans LLM."""
+    if not preferences:
+        return
+    try:
+        saved, known = await run_blocking(get_memory_store().save, user_id, preferences)
+        log.info("chat : mémoire -> sauvegardé %s, déjà connu %s", saved, known)
+    except Exception:
+        log.exception("erreur save_memory")
+
+
 @app.get("/chat_refine")
-async def chat_refine(request: Request, message: str, origin: str, destination: str, date: str = None):
-    print(f"\nCHAT REFINE: {message} (Date ctx: {date})")
+async def chat_refine(request: Request, message: str, origin: str, destination: str, date: str = None,
+                      session_id: str = None, timings: bool = False):
+    log.info("chat refine : %s (date : %s)", message, date)
+    client = request.client.host if request.client else "-"
+    user_id, new_user = _request_user(request)
 
     async def event_generator():
         target = destination if destination else origin
@@ -626,56 +821,113 @@ async def chat_refine(request: Request, message: str, origin: str, destination:
         prompt_text = (
             f"CONTEXTE : Voyage de {origin} vers {target}. {date_context} "
             f"DEMANDE DE RAFFINEMENT : \"{message}\". "
-            f"Si c'est une demande d'hôtel ou de vol, utilise la date ci-dessus si pertinente. "
-            f"Transfère au bon agent spécialisé."
+            f"Si c'est une demande d'hôtel ou de vol, utilise la date ci-dessus si pertinente."
         )
 
-        yield f"data: {json.dumps({'type': 'log', 'message': 'Le Refine Supervisor route vers le bon agent...'})}\n\n"
+        # -- Filtre sur les résultats de la session : ni outils ni LLM --
+        stored = await result_store.get(session_id) if session_id else None
+        if stored is not None and stored.get("user_id") != user_id:
+            # Résultats d'une recherche lancée par un autre navigateur : ni lus, ni modifiés
+            log.warning("chat : session %s d'un autre utilisateur, ignorée", session_id)
+            stored = None
+        # Échanges précédents de la session, résumés (pas les sorties d'outils) et bornés
+        history = ChatHistory.from_dict(stored.get("chat")) if stored is not None else None
+        with span("refine.cache"):
+            outcome = refine_cached(stored, message)
+        if outcome is not None:
+            refine_routes["cache"] += 1
+            log.info("chat : filtre sur la session (%s) -> %d/%d %s", outcome.filters.describe(),
+                     len(outcome.items), outcome.total, outcome.kind)
+            response_message = (f"J'ai filtré les résultats de la recherche ({outcome.filters.describe()}) : "
+                                f"{len(outcome.items)} {RESULT_LABELS[outcome.kind]} sur {outcome.total}.")
+            yield f"data: {json.dumps({'type': 'response', 'message': response_message})}\n\n"
+            yield f"data: {json.dumps({'type': 'results', outcome.kind: outcome.items}, ensure_ascii=False, separators=COMPACT)}\n\n"
+            # Résultats de la session intacts : la demande suivante filtrera à nouveau l'ensemble complet
+            stored.setdefault("shown", {})[outcome.kind] = outcome.items
+            history.add(message, "session", {outcome.kind: outcome.items})
+            stored["chat"] = history.to_dict()
+            await result_store.put(session_id, stored)
+            await _remember(user_id, _refine_preferences(outcome.filters.keywords))
+            yield f"data: {json.dumps({'type': 'complete', 'message': 'Termine !'})}\n\n"
+            return
+
+        # -- Intention évidente (mots-clés) : agent spécialisé direct, un appel LLM de moins --
+        route = classify_refine(message) if REFINE_ROUTER == "local" else None
+        if route is not None and route.confident:
+            agent = REFINE_AGENTS[route.intent]
+            refine_routes["local"] += 1
+            log.info("chat : routage local -> %s (%s)", agent.name, ", ".join(route.cues))
+            yield f"data: {json.dumps({'type': 'log', 'message': f'Demande transmise a {agent.name}...'})}\n\n"
+            if route.intent == "activity":
+                await _remember(user_id, _refine_preferences(route.cues))
+        else:
+            agent = refine_supervisor
+            refine_routes["llm"] += 1
+            prompt_text += " Transfère au bon agent spécialisé."
+            yield f"data: {json.dumps({'type': 'log', 'message': 'Le Refine Supervisor route vers le bon agent...'})}\n\n"
+
+        if history is not None:
+            with span("chat.history"):
+                prompt_text += history.render()
+        # Préférences mémorisées de l'utilisateur (lecture en cache, requête SQL seulement après une écriture)
+        with span("memory.read"):
+            preferences = await run_blocking(get_memory_store().preferences, user_id)
+        if preferences:
+            prompt_text += "\n\n" + format_preferences(preferences)
 
         # -- Appel streaming au Refine Supervisor (MULTI-AGENT via transfer_to_agent) --
         full_response = ""
+        records = RecordCollector()
+        sections = SectionParser()
         try:
-            async for sse_or_done in _run_supervisor_streaming(prompt_text, agent=refine_supervisor):
-                if sse_or_done.startswith("__DONE__"):
-                    full_response = sse_or_done[8:]
-                else:
-                    yield sse_or_done
+            # Même limite globale que /stream_search : le chat consomme aussi le quota LLM
+            queued_since = time.perf_counter()
+            async with search_limiter.slot(client):
+                record("limiter.wait", time.perf_counter() - queued_since)
+                async for sse_or_done in _run_supervisor_streaming(prompt_text, agent=agent, records=records,
+                                                                   sections=sections, user_id=user_id):
+                    if sse_or_done.startswith("__DONE__"):
+                        full_response = sse_or_done[8:]
+                    else:
+                        yield sse_or_done
+        except QueueFull:
+            log.warning("chat refusé : file d'attente pleine")
+            yield f"data: {json.dumps({'type': 'response', 'message': 'Trop de demandes en cours, réessayez dans un instant.'})}\n\n"
+            yield f"data: {json.dumps({'type': 'complete', 'message': 'Termine !'})}\n\n"
+            return
         except Exception as e:
             full_response = f"Erreur supervisor: {e}"
-            print(f"ERREUR SUPERVISOR: {e}")
-
-        print(f"CHAT SUPERVISOR:\n{full_response}\n---")
-
-        # -- Extraction des sections --
-        flights_text = _extract_section(full_response, "### DEBUT_VOLS ###", "### FIN_VOLS ###")
-        activities_text = _extract_section(full_response, "### DEBUT_ACTIVITES ###", "### FIN_ACTIVITES ###")
-        restaurants_text = _extract_section(full_response, "### DEBUT_RESTAURANTS ###", "### FIN_RESTAURANTS ###")
-        if restaurants_text:
-            activities_text = (activities_text + "\n" + restaurants_text).strip()
-        hotels_text = _extract_section(full_response, "### DEBUT_HOTELS ###", "### FIN_HOTELS ###")
-
-        # Parsing : UNIQUEMENT les sections avec markers
-        # Si aucun marker n'est trouvé, on essaie de deviner intelligemment quel parser utiliser
-        # en analysant le contenu de la réponse
-        if flights_text or activities_text or hotels_text:
-            # Cas normal : on a des markers, on parse uniquement les sections présentes
-            flights_data = _parse_flights(flights_text) if flights_text else []
-            activities_data = _parse_activities(activities_text) if activities_text else []
-            hotels_data = _parse_hotels(hotels_text) if hotels_text else []
+            log.exception("erreur refine supervisor")
+
+        log.debug("réponse refine supervisor :\n%.2000s", full_response)
+
+        # -- Résultats typés des outils --
+        # On ne garde que les lieux/hôtels/vols que l'agent a retenus dans sa réponse
+        # (filtrage sémantique du refine_activity_agent)
+        if records.answered:
+            flights_data = records.get("flights", mentioned_in=records.agent_text)
+            activities_data = records.get("activities", mentioned_in=records.agent_text)
+            hotels_data = records.get("hotels", mentioned_in=records.agent_text)
         else:
-            # Aucun marker trouvé : l'agent a renvoyé du texte brut
-            # On devine quel type de données c'est en regardant le contenu
-            lower_response = full_response.lower()
+            # Parsing : UNIQUEMENT les sections avec markers (déjà parsées au fil du stream)
+            # Si aucun marker n'est trouvé, on essaie de deviner intelligemment quel parser utiliser
+            # en analysant le contenu de la réponse
+            if sections.sections_seen:
+                flights_data, activities_data, hotels_data = sections.finish()
+            else:
+                # Aucun marker trouvé : l'agent a renvoyé du texte brut
+                # On devine quel type de données c'est en regardant le contenu
+                lower_response = full_response.lower()
             
-            # Compter les indicateurs de chaque type
-            has_flight_indicators = any(word in lower_response for word in ["vol", "départ", "arrivée", "flight", "airline", "->", "→"])
-            has_hotel_indicators = any(word in lower_response for word in ["hôtel", "hotel", "€/nuit", "dispo:", "services:"])
-            has_activity_indicators = any(word in lower_response for word in ["activité", "restaurant", "musée", "visite", "cuisine"])
+                # Compter les indicateurs de chaque type
+                has_flight_indicators = any(word in lower_response for word in ["vol", "départ", "arrivée", "flight", "airline", "->", "→"])
+                has_hotel_indicators = any(word in lower_response for word in ["hôtel", "hotel", "€/nuit", "dispo:", "services:"])
+                has_activity_indicators = any(word in lower_response for word in ["activité", "restaurant", "musée", "visite", "cuisine"])
             
-            # Parser uniquement ce qui semble être présent
-            flights_data = _parse_flights(full_response) if has_flight_indicators else []
-            activities_data = _parse_activities(full_response) if has_activity_indicators else []
-            hotels_data = _parse_hotels(full_response) if has_hotel_indicators else []
+                # Parser uniquement ce qui semble être présent
+                flights_data = parse_flights(full_response) if has_flight_indicators else []
+                activities_data = parse_activities(full_response) if has_activity_indicators else []
+                hotels_data = parse_hotels(full_response) if has_hotel_indicators else []
 
         # Message dynamique selon ce qui a été trouvé
         parts = []
@@ -701,12 +953,22 @@ async def chat_refine(request: Request, message: str, origin: str, destination:
             results_payload['activities'] = activities_data
         if hotels_data:
             results_payload['hotels'] = hotels_data
-        yield f"data: {json.dumps({'type': 'results', **results_payload})}\n\n"
+        yield f"data: {json.dumps({'type': 'results', **results_payload}, ensure_ascii=False, separators=COMPACT)}\n\n"
+
+        # Nouveaux résultats ajoutés à ceux de la session (sans les remplacer), vue affichée rangée à part ;
+        # l'échange rejoint l'historique
+        if stored is not None:
+            merge_results(stored, results_payload)
+            stored.setdefault("shown", {}).update(results_payload)
+            history.add(message, agent.name, results_payload)
+            stored["chat"] = history.to_dict()
+            await result_store.put(session_id, stored)
         yield f"data: {json.dumps({'type': 'complete', 'message': 'Termine !'})}\n\n"
 
-        print(f"CHAT: {len(flights_data)} vols | {len(activities_data)} act | {len(hotels_data)} hotels")
+        log.info("chat : %d vols | %d activités | %d hôtels", len(flights_data), len(activities_data), len(hotels_data))
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return _with_user_cookie(StreamingResponse(_timed_stream("/chat_refine", event_generator(), timings),
+                                               media_type="text/event-stream"), user_id, new_user)
 
 
 if __name__ == "__main__":
@@ -1,33 +1,135 @@
-import sqlite3
-import random
-import os
-from datetime import datetime, timedelta
+"""
+Générateur des bases de démonstration et de charge (vols, hôtels, activités, mémoire).
+
+    python scripts/generate_dbflight.py                      # petites bases de démo (100 vols, 60 hôtels)
+    python scripts/generate_dbflight.py --flights 5000000 --hotels 1000000 --activities 1000000 \\
+        --cities 500 --seed 7 --data-dir /tmp/charge
+
+- Tailles et graine en arguments : une même commande régénère exactement les mêmes bases.
+- Colonnes tirées par lots avec NumPy puis insérées par executemany, une transaction
+  par base, pragmas de chargement (journal et fsync coupés, cache élargi).
+- Chaque base est construite dans un fichier temporaire puis mise en place d'un coup :
+  les index du schéma "recherche" (core.schema) sont créés après le chargement.
+- Villes au-delà des 10 villes connues : City0001, City0002...
+- Les activités de data/activities.json sont toujours chargées ; --activities ajoute
+  des activités et restaurants synthétiques dans toutes les villes.
+"""
+import argparse
 import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
 
-# Dossier de destination
-DATA_DIR = 'data'
-if not os.path.exists(DATA_DIR):
-    os.makedirs(DATA_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.cities import airline_key, amenity_key, city_key
+from core.db import DATA_DIR
+from core.schema import (HOTELS_DDL, create_flights_indexes, create_hotels_indexes, migrate_activities,
+                         migrate_memory)
 
 # Données pour le réalisme
 CITIES = ["Paris", "Tokyo", "New York", "Berlin", "London", "Bangkok", "Lisbonne", "Rome", "Madrid", "Sydney"]
 AIRLINES = ["Air France", "ANA", "Delta", "Lufthansa", "British Airways", "Emirates", "Japan Airlines", "United"]
+FLIGHT_PREFIXES = ["AF", "NH", "DL", "LH"]
 AMENITIES = ["WiFi", "Petit-déjeuner inclus", "Piscine", "Spa", "Salle de sport", "Climatisation", "Vue sur mer"]
+HOTEL_TYPES = ["Hotel Resort", "Boutique Hotel", "Business Center", "Luxury Suites", "Budget Inn"]
+ACTIVITY_KINDS = [
+    ("Activity", "Musée", "Collections permanentes et expositions temporaires"),
+    ("Activity", "Visite guidée", "Balade commentée dans le centre historique"),
+    ("Activity", "Croisière", "Promenade en bateau au coucher du soleil"),
+    ("Activity", "Randonnée", "Sentier panoramique avec guide local"),
+    ("Activity", "Atelier de cuisine", "Cours de cuisine traditionnelle avec dégustation"),
+    ("Restaurant", "Bistrot", "Cuisine de saison, produits du marché"),
+    ("Restaurant", "Street food", "Spécialités locales à emporter"),
+    ("Restaurant", "Gastronomique", "Menu dégustation en plusieurs services"),
+]
+
+DEFAULT_FLIGHTS = 100
+DEFAULT_HOTELS = 60
+BATCH_ROWS = 100_000
+EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+
+# Chargement en masse : la base temporaire est jetée si le script s'arrête en cours de route
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA locking_mode=EXCLUSIVE",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",  # 256 Mo
+    "PRAGMA threads=4",           # tris des CREATE INDEX en parallèle
+)
+
+
+def make_cities(n: int) -> list:
+    """Les villes connues d'abord (activités du JSON, prompts), puis City0001, City0002..."""
+    return CITIES[:n] + [f"City{i:04d}" for i in range(1, n - len(CITIES) + 1)]
+
+
+def table_rng(seed: int, table: str) -> np.random.Generator:
+    """Un générateur par table : changer le nombre de vols ne modifie pas les hôtels."""
+    return np.random.default_rng([seed, sum(table.encode())])
+
+
+def batches(total: int, size: int = BATCH_ROWS):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def minutes_to_text(base: str, minutes: np.ndarray) -> list:
+    """Minutes depuis `base` -> ['2026-03-01 08:15', ...]"""
+    stamps = np.datetime64(base, "m") + minutes.astype("timedelta64[m]")
+    return np.char.replace(np.datetime_as_string(stamps, unit="m"), "T", " ").tolist()
 
-def load_json_data():
-    json_path = '../data/activities.json' # Ou os.path.join(DATA_DIR, 'data.json') selon où tu l'as mis
+
+def day_ordinals(days: np.ndarray) -> np.ndarray:
+    """datetime64[D] -> jours ordinaux (date.toordinal, comme core.schema.date_to_day)"""
+    return days.astype(np.int64) + EPOCH_ORDINAL
+
+
+def open_bulk(path: str) -> sqlite3.Connection:
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    for pragma in BULK_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def install(conn: sqlite3.Connection, tmp_path: str, path: str):
+    """Termine le chargement et remplace la base (et son WAL éventuel) par la nouvelle."""
+    conn.commit()
+    conn.execute("PRAGMA locking_mode=NORMAL")
+    conn.execute("PRAGMA journal_mode=WAL")  # mode des pools de core.db, mémorisé dans le fichier
+    conn.close()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.replace(tmp_path, path)
+
+
+def load_json_data(data_dir: str) -> dict:
+    json_path = os.path.join(data_dir, 'activities.json')
+    if not os.path.exists(json_path):
+        # Dossier de charge sans JSON : on reprend celui du dépôt
+        json_path = os.path.join(DATA_DIR, 'activities.json')
     if not os.path.exists(json_path):
         return {}
     with open(json_path, 'r', encoding='utf-8') as f:
         return json.load(f)
-    
-def create_flights_db():
-    db_path = os.path.join(DATA_DIR, 'flights.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS flights (
+
+
+# ────────────────────────────────────────────
+# FLIGHTS
+# ────────────────────────────────────────────
+
+def create_flights_db(data_dir: str, count: int = DEFAULT_FLIGHTS, n_cities: int = len(CITIES), seed: int = 42):
+    path = os.path.join(data_dir, 'flights.db')
+    conn = open_bulk(path + '.tmp')
+    conn.execute('''
+        CREATE TABLE flights (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             origin TEXT,
             destination TEXT,
@@ -35,143 +137,254 @@ def create_flights_db():
             arrival_time TEXT,
             price REAL,
             airline TEXT,
-            flight_number TEXT
+            flight_number TEXT,
+            origin_key TEXT,
+            destination_key TEXT,
+            airline_key TEXT
         )
     ''')
-    
-    cursor.execute("DELETE FROM flights")
-    
-    for _ in range(100): # On augmente un peu pour avoir plus de chances de trouver
-        origin, dest = random.sample(CITIES, 2)
-        # Date de départ
-        dept_date = datetime(2026, 3, 1) + timedelta(days=random.randint(0, 60), hours=random.randint(0, 23), minutes=random.randint(0, 59))
-        # Date d'arrivée (entre 2h et 12h plus tard)
-        arr_date = dept_date + timedelta(hours=random.randint(2, 12))
-        
-        flight_no = f"{random.choice(['AF', 'NH', 'DL', 'LH'])}{random.randint(100, 999)}"
-        
-        cursor.execute('''
-            INSERT INTO flights (origin, destination, departure_time, arrival_time, price, airline, flight_number)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (origin, dest, dept_date.strftime("%Y-%m-%d %H:%M"), arr_date.strftime("%Y-%m-%d %H:%M"), 
-              random.randint(350, 1400), random.choice(AIRLINES), flight_no))
-    
-    conn.commit()
-    conn.close()
-    print(f"✅ flights.db mis à jour avec 100 vols (départs et arrivées).")
 
-def create_hotels_db():
-    db_path = os.path.join(DATA_DIR, 'hotels.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    rng = table_rng(seed, "flights")
+    cities = np.array(make_cities(n_cities), dtype=object)
+    city_keys = np.array([city_key(c) for c in cities], dtype=object)
+    airlines = np.array(AIRLINES, dtype=object)
+    airline_keys = np.array([airline_key(a) for a in AIRLINES], dtype=object)
+    prefixes = np.array(FLIGHT_PREFIXES, dtype=object)
+    for _, size in batches(count):
+        origin = rng.integers(0, len(cities), size)
+        # Destination toujours différente de l'origine
+        dest = (origin + rng.integers(1, len(cities), size)) % len(cities)
+        # Départ entre le 1er mars et le 30 avril 2026, arrivée 2 à 12 h plus tard
+        departure = rng.integers(0, 61 * 24 * 60, size)
+        arrival = departure + rng.integers(2, 13, size) * 60
+        price = rng.integers(350, 1401, size)
+        airline = rng.integers(0, len(AIRLINES), size)
+        flight_number = prefixes[rng.integers(0, len(FLIGHT_PREFIXES), size)] + rng.integers(100, 1000, size).astype(str)
+        conn.executemany(
+            "INSERT INTO flights (origin, destination, departure_time, arrival_time, price, airline, flight_number,"
+            " origin_key, destination_key, airline_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            # Indexation de tableaux d'objets : les chaînes sont partagées, pas recopiées
+            zip(
+                cities[origin].tolist(),
+                cities[dest].tolist(),
+                minutes_to_text("2026-03-01", departure),
+                minutes_to_text("2026-03-01", arrival),
+                price.tolist(),
+                airlines[airline].tolist(),
+                flight_number.tolist(),
+                city_keys[origin].tolist(),
+                city_keys[dest].tolist(),
+                airline_keys[airline].tolist(),
+            ),
+        )
+
+    create_flights_indexes(conn)
+    install(conn, path + '.tmp', path)
+    print(f"flights.db : {count} vols entre {len(cities)} villes.")
+
+
+# ────────────────────────────────────────────
+# HOTELS
+# ────────────────────────────────────────────
 
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS hotels (
+def create_hotels_db(data_dir: str, count: int = DEFAULT_HOTELS, n_cities: int = len(CITIES), seed: int = 42):
+    """
+    Hôtels générés ville par ville : city_key, amenity_mask et la boîte du R*Tree
+    sont calculés ici (même résultat que core.schema.index_hotels, sans passe ligne à ligne),
+    et l'arbre est rempli groupé par ville puis par date.
+    """
+    path = os.path.join(data_dir, 'hotels.db')
+    conn = open_bulk(path + '.tmp')
+    conn.execute('''
+        CREATE TABLE hotels (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             city TEXT,
             name TEXT,
             price REAL,
             amenities TEXT,
             available_start DATE,
-            available_end DATE
+            available_end DATE,
+            city_key TEXT,
+            amenity_mask INTEGER
         )
     ''')
-    
-    cursor.execute("DELETE FROM hotels") # Reset
-    
-    types = ["Hotel Resort", "Boutique Hotel", "Business Center", "Luxury Suites", "Budget Inn"]
-    for _ in range(60):
-        city = random.choice(CITIES)
-        hotel_name = f"{city} {random.choice(types)} {random.randint(1, 100)}"
-        amenities_str = ", ".join(random.sample(AMENITIES, k=random.randint(2, 4)))
-        # Dates aléatoires : début entre mars et août 2026
-        start = datetime(2026, random.randint(3, 8), random.randint(1, 28))
-        # Fin entre 5 et 30 jours après le début
-        end = start + timedelta(days=random.randint(5, 30))
-        cursor.execute('''
-            INSERT INTO hotels (city, name, price, amenities, available_start, available_end)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (city, hotel_name, random.randint(60, 500), amenities_str, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
-    
-    conn.commit()
-    conn.close()
-    print(f"hotels.db créé avec 60 hôtels.")
-
-def create_activities_db():
-    print("Génération des activités & restaurants (depuis JSON)...")
-    
-    # 1. Chargement du JSON
-    data = load_json_data()
-    if not data:
-        print("Erreur : Impossible de lire data.json")
+    for ddl in HOTELS_DDL:
+        conn.execute(ddl)
+
+    rng = table_rng(seed, "hotels")
+    cities = make_cities(n_cities)
+    conn.executemany("INSERT INTO hotel_cities (id, key) VALUES (?, ?)",
+                     [(cid, city_key(c)) for cid, c in enumerate(cities, 1)])
+    conn.executemany("INSERT INTO hotel_amenity_bits (bit, key, label) VALUES (?, ?, ?)",
+                     [(bit, amenity_key(a), a) for bit, a in enumerate(AMENITIES)])
+
+    per_city = np.bincount(rng.integers(0, len(cities), count), minlength=len(cities))
+    next_id = 1
+    for cid, city in enumerate(cities, 1):
+        total = int(per_city[cid - 1])
+        ckey = city_key(city)
+        for _, size in batches(total):
+            # Début entre mars et août 2026 (jour 1 à 28), fin 5 à 30 jours plus tard
+            month = np.datetime64("2026-01", "M") + rng.integers(2, 8, size)
+            start = month.astype("datetime64[D]") + rng.integers(0, 28, size)
+            end = start + rng.integers(5, 31, size)
+            price = rng.integers(60, 501, size)
+            # 2 à 4 services distincts, dans un ordre aléatoire
+            picks = np.argsort(rng.random((size, len(AMENITIES))), axis=1)
+            n_amenities = rng.integers(2, 5, size)
+            kinds = rng.integers(0, len(HOTEL_TYPES), size)
+            suffix = rng.integers(1, 101, size)
+
+            # R*Tree : insertion groupée par date puis prix (comme index_hotels)
+            order = np.lexsort((price, start)).tolist()
+            start_text = np.datetime_as_string(start, unit="D").tolist()
+            end_text = np.datetime_as_string(end, unit="D").tolist()
+            start_days, end_days = day_ordinals(start).tolist(), day_ordinals(end).tolist()
+            price, n_amenities = price.tolist(), n_amenities.tolist()
+            kinds, suffix, picks = kinds.tolist(), suffix.tolist(), picks.tolist()
+            rows, boxes = [], []
+            for hid, j in enumerate(order, next_id):
+                chosen = picks[j][:n_amenities[j]]
+                mask = 0
+                for bit in chosen:
+                    mask |= 1 << bit
+                cents = price[j] * 100
+                rows.append((hid, city, f"{city} {HOTEL_TYPES[kinds[j]]} {suffix[j]}", price[j],
+                             ", ".join(AMENITIES[b] for b in chosen), start_text[j], end_text[j], ckey, mask))
+                boxes.append((hid, cid, cid, start_days[j], end_days[j], cents, cents))
+            next_id += size
+            conn.executemany(
+                "INSERT INTO hotels (id, city, name, price, amenities, available_start, available_end,"
+                " city_key, amenity_mask) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT INTO hotels_rtree VALUES (?, ?, ?, ?, ?, ?, ?)", boxes)
+
+    # Noms et dates tirés au hasard : les rares collisions sont retirées avant l'index UNIQUE
+    removed = create_hotels_indexes(conn)
+    install(conn, path + '.tmp', path)
+    print(f"hotels.db : {count - removed} hôtels dans {len(cities)} villes.")
+
+
+# ────────────────────────────────────────────
+# ACTIVITIES (activités + restaurants)
+# ────────────────────────────────────────────
+
+def create_activities_db(data_dir: str, count: int = 0, n_cities: int = len(CITIES), seed: int = 42):
+    """Activités du JSON + `count` activités/restaurants synthétiques ; FTS5 construit en une passe à la fin."""
+    data = load_json_data(data_dir)
+    if not data and not count:
+        print("Erreur : impossible de lire activities.json")
         return
 
-    db_path = os.path.join(DATA_DIR, 'activities.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # 2. Création de la table avec la colonne 'type'
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS activities (
+    path = os.path.join(data_dir, 'activities.db')
+    conn = open_bulk(path + '.tmp')
+    conn.execute('''
+        CREATE TABLE activities (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             city TEXT,
             name TEXT,
             description TEXT,
             price REAL,
-            type TEXT
+            type TEXT,
+            city_key TEXT
         )
     ''')
-    
-    # 3. Nettoyage de l'ancienne table
-    cursor.execute("DELETE FROM activities") # Reset
-    
-    # 4. Insertion des données depuis le JSON
-    count = 0
+
+    json_rows = []
     for city, city_data in data.items():
-        
-        # --- TRAITEMENT DES ACTIVITÉS ---
-        if "activities" in city_data:
-            for activity in city_data["activities"]:
-                cursor.execute('''
-                    INSERT INTO activities (city, name, description, price, type)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (city, activity['name'], activity['description'], activity['price'], 'Activity'))
-                count += 1
-        
-        # --- TRAITEMENT DES RESTAURANTS ---
-        if "restaurants" in city_data:
-            for resto in city_data["restaurants"]:
-                cursor.execute('''
-                    INSERT INTO activities (city, name, description, price, type)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (city, resto['name'], resto['description'], resto['price'], 'Restaurant'))
-                count += 1
-    
-    conn.commit()
-    conn.close()
-    print(f"activities.db créé avec {count} entrées (Activités + Restaurants).")
+        for activity in city_data.get("activities", []):
+            json_rows.append((city, activity['name'], activity['description'], activity['price'], 'Activity',
+                              city_key(city)))
+        for resto in city_data.get("restaurants", []):
+            json_rows.append((city, resto['name'], resto['description'], resto['price'], 'Restaurant',
+                              city_key(city)))
+    insert = ("INSERT INTO activities (city, name, description, price, type, city_key)"
+              " VALUES (?, ?, ?, ?, ?, ?)")
+    conn.executemany(insert, json_rows)
+
+    rng = table_rng(seed, "activities")
+    cities = make_cities(n_cities)
+    city_keys = [city_key(c) for c in cities]
+    for first, size in batches(count):
+        city = rng.integers(0, len(cities), size).tolist()
+        kind = rng.integers(0, len(ACTIVITY_KINDS), size).tolist()
+        price = rng.integers(0, 151, size).tolist()
+        conn.executemany(insert, (
+            (cities[c], f"{ACTIVITY_KINDS[k][1]} {cities[c]} {first + i + 1}",
+             f"{ACTIVITY_KINDS[k][2]} à {cities[c]}.", p, ACTIVITY_KINDS[k][0], city_keys[c])
+            for i, (c, k, p) in enumerate(zip(city, kind, price))
+        ))
+
+    # Table remplie sans triggers : migrate_activities construit l'index FTS5 d'un coup
+    # (rebuild + optimize), puis les triggers prennent le relais pour les écritures suivantes
+    migrate_activities(conn)
+    install(conn, path + '.tmp', path)
+    print(f"activities.db : {len(json_rows) + count} entrées (activités + restaurants).")
 
-def create_memory_db():
-    db_path = os.path.join(DATA_DIR, 'memory.db')
+
+def create_memory_db(data_dir: str):
+    db_path = os.path.join(data_dir, 'memory.db')
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS memory (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            preferences TEXT
-        )
-    ''')
-    
+
+    # Schéma complet (utilisateur, horodatages, index UNIQUE) : le même que la migration
+    migrate_memory(conn)
     cursor.execute("DELETE FROM memory")
     conn.commit()
     conn.close()
-    print(f"memory.db crées.")
+    print("memory.db créée.")
+
+
+TABLES = ("flights", "hotels", "activities", "memory")
+# Un vol relie deux villes distinctes
+MIN_CITIES = 2
+
+
+def row_count(value: str) -> int:
+    """Type argparse de --flights / --hotels / --activities : entier >= 0."""
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"nombre entier attendu : {value!r}")
+    if count < 0:
+        raise argparse.ArgumentTypeError(f"nombre de lignes négatif : {count}")
+    return count
+
+
+def city_count(value: str) -> int:
+    """Type argparse de --cities : entier >= MIN_CITIES."""
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"nombre entier attendu : {value!r}")
+    if count < MIN_CITIES:
+        raise argparse.ArgumentTypeError(
+            f"au moins {MIN_CITIES} villes (un vol relie deux villes distinctes), reçu {count}")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=row_count, default=DEFAULT_FLIGHTS, help="nombre de vols")
+    parser.add_argument("--hotels", type=row_count, default=DEFAULT_HOTELS, help="nombre d'hôtels")
+    parser.add_argument("--activities", type=row_count, default=0, help="activités synthétiques en plus du JSON")
+    parser.add_argument("--cities", type=city_count, default=len(CITIES), help=f"nombre de villes (>= {MIN_CITIES})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=DATA_DIR, help="dossier des bases (défaut : TRAVEL_DATA_DIR ou data/)")
+    parser.add_argument("--only", nargs="+", choices=TABLES, default=TABLES, help="bases à régénérer")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    builders = {
+        "flights": lambda: create_flights_db(args.data_dir, args.flights, args.cities, args.seed),
+        "hotels": lambda: create_hotels_db(args.data_dir, args.hotels, args.cities, args.seed),
+        "activities": lambda: create_activities_db(args.data_dir, args.activities, args.cities, args.seed),
+        "memory": lambda: create_memory_db(args.data_dir),
+    }
+    for table in args.only:
+        start = time.perf_counter()
+        builders[table]()
+        print(f"   ({time.perf_counter() - start:.1f} s)")
+
 
 if __name__ == "__main__":
-    create_flights_db()
-    create_hotels_db()
-    print("on crée activité")
-    create_activities_db()
-    create_memory_db()
-    print("carré")
\ No newline at end of file
+    main()
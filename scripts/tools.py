@@ -1,11 +1,15 @@
-import sqlite3
 import os
+import sys
 from typing import List, Tuple, Set
 
-# Configuration des chemins robustes
+# Configuration des chemins robustes (le script peut être lancé depuis n'importe où)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-FLIGHTS_DB_PATH = os.path.join(SCRIPT_DIR, '..', 'data', 'flights.db')
-HOTELS_DB_PATH = os.path.join(SCRIPT_DIR, '..', 'data', 'hotels.db')
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+
+from core.analytics import flights_snapshot, hotels_snapshot
+from core.cities import city_key
+from core.db import FLIGHTS_DB_PATH, HOTELS_DB_PATH, get_pool
+from core.schema import ensure_flights_schema
 
 def get_flights_between(origin: str, destination: str) -> List[Tuple]:
     """
@@ -18,17 +22,15 @@ def get_flights_between(origin: str, destination: str) -> List[Tuple]:
     Returns:
         List[Tuple]: Liste des vols (Compagnie, Date, Prix).
     """
-    conn = sqlite3.connect(FLIGHTS_DB_PATH)
-    cursor = conn.cursor()
+    pool = get_pool(FLIGHTS_DB_PATH)
+    ensure_flights_schema(pool)
     query = """
         SELECT airline, departure_time, price 
         FROM flights 
-        WHERE LOWER(origin) = LOWER(?) AND LOWER(destination) = LOWER(?)
+        WHERE origin_key = ? AND destination_key = ?
         ORDER BY price ASC
     """
-    cursor.execute(query, (origin, destination))
-    results = cursor.fetchall()
-    conn.close()
+    results = pool.fetchall(query, (city_key(origin), city_key(destination)))
     return results
 
 def get_top_3_cheapest_destinations() -> List[Tuple]:
@@ -38,19 +40,7 @@ def get_top_3_cheapest_destinations() -> List[Tuple]:
     Returns:
         List[Tuple]: Liste des 3 destinations (Ville, Prix, Compagnie).
     """
-    conn = sqlite3.connect(FLIGHTS_DB_PATH)
-    cursor = conn.cursor()
-    query = """
-        SELECT destination, MIN(price) as min_price, airline 
-        FROM flights 
-        GROUP BY destination 
-        ORDER BY min_price ASC 
-        LIMIT 3
-    """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    return flights_snapshot(get_pool(FLIGHTS_DB_PATH)).cheapest_destinations(3)
 
 def get_top_5_cheapest_airlines() -> List[Tuple]:
     """
@@ -59,19 +49,7 @@ def get_top_5_cheapest_airlines() -> List[Tuple]:
     Returns:
         List[Tuple]: Liste des compagnies (Nom, Prix Moyen).
     """
-    conn = sqlite3.connect(FLIGHTS_DB_PATH)
-    cursor = conn.cursor()
-    query = """
-        SELECT airline, ROUND(AVG(price), 2) as avg_price 
-        FROM flights 
-        GROUP BY airline 
-        ORDER BY avg_price ASC 
-        LIMIT 5
-    """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    return flights_snapshot(get_pool(FLIGHTS_DB_PATH)).cheapest_airlines(5)
 
 def get_hotels_by_comfort(city: str, min_amenities: int = 3) -> List[Tuple]:
     """
@@ -84,19 +62,7 @@ def get_hotels_by_comfort(city: str, min_amenities: int = 3) -> List[Tuple]:
     Returns:
         List[Tuple]: Liste des hôtels (Nom, Prix, Services).
     """
-    conn = sqlite3.connect(HOTELS_DB_PATH)
-    cursor = conn.cursor()
-    query = """
-        SELECT name, price, amenities 
-        FROM hotels 
-        WHERE LOWER(city) = LOWER(?) 
-        AND (LENGTH(amenities) - LENGTH(REPLACE(amenities, ',', '')) + 1) >= ?
-        ORDER BY price ASC
-    """
-    cursor.execute(query, (city, min_amenities))
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    return hotels_snapshot(get_pool(HOTELS_DB_PATH)).by_comfort(city, min_amenities)
 
 def get_best_value_stay() -> List[Tuple]:
     """
@@ -105,21 +71,7 @@ def get_best_value_stay() -> List[Tuple]:
     Returns:
         List[Tuple]: L'hôtel sélectionné (Nom, Ville, Prix, Services).
     """
-    conn = sqlite3.connect(HOTELS_DB_PATH)
-    cursor = conn.cursor()
-    query = """
-        SELECT name, city, price, amenities 
-        FROM hotels 
-        WHERE amenities LIKE '%Spa%' 
-        AND amenities LIKE '%Piscine%' 
-        AND amenities LIKE '%Vue sur mer%'
-        ORDER BY price ASC 
-        LIMIT 1
-    """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    return hotels_snapshot(get_pool(HOTELS_DB_PATH)).cheapest_with_amenities("Spa, Piscine, Vue sur mer")
 
 def get_all_available_amenities(city: str) -> Set[str]:
     """
@@ -131,19 +83,7 @@ def get_all_available_amenities(city: str) -> Set[str]:
     Returns:
         Set[str]: Ensemble des services uniques.
     """
-    conn = sqlite3.connect(HOTELS_DB_PATH)
-    cursor = conn.cursor()
-    query = "SELECT amenities FROM hotels WHERE LOWER(city) = LOWER(?)"
-    cursor.execute(query, (city,))
-    rows = cursor.fetchall()
-    conn.close()
-
-    all_amenities = set()
-    for row in rows:
-        services = [s.strip() for s in row[0].split(',')]
-        all_amenities.update(services)
-    
-    return all_amenities
+    return hotels_snapshot(get_pool(HOTELS_DB_PATH)).amenities_in(city)
 
 def search_hotels_by_multiple_amenities(city: str, amenities_list: List[str]) -> List[Tuple]:
     """
@@ -156,18 +96,7 @@ def search_hotels_by_multiple_amenities(city: str, amenities_list: List[str]) ->
     Returns:
         List[Tuple]: Liste des hôtels correspondants.
     """
-    conn = sqlite3.connect(HOTELS_DB_PATH)
-    cursor = conn.cursor()
-    query = "SELECT name, price, amenities FROM hotels WHERE LOWER(city) = LOWER(?)"
-    params = [city]
-    for amenity in amenities_list:
-        query += " AND amenities LIKE ?"
-        params.append(f"%{amenity.strip()}%")
-    query += " ORDER BY price ASC"
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    return hotels_snapshot(get_pool(HOTELS_DB_PATH)).with_amenities(city, ", ".join(amenities_list))
 # --- LE MAIN INTERACTIF ---
 if __name__ == "__main__":
     print("BIENVENUE SUR TRAVELAGENT.AI\n")
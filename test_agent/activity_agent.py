@@ -1,107 +1,116 @@
 from google.adk.agents.llm_agent import Agent
-import sqlite3
-import os
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ACTIVITIES_DB_PATH = os.path.join(BASE_DIR, '..', 'data', 'activities.db')
+from core.aio import async_tool
+from core.cache import cached_tool
+from core.cities import city_key
+from core.db import ACTIVITIES_DB_PATH, get_pool
+from core.log import get_logger
+from core.records import PlaceRecord, keep_records, tool_error, tool_response
+from core.schema import ACTIVITIES_BM25, ensure_activities_schema, fts_query
 
+DEFAULT_LIMIT = 20
 
-def search_activities(city: str, keyword: str = None) -> str:
+log = get_logger("activity_agent")
+
+
+def _query_places(place_type: str, city: str, keyword: str = None, limit: int = DEFAULT_LIMIT) -> list:
+    """
+    Lieux d'un type ('Activity' / 'Restaurant') dans une ville.
+    Avec mot-clé : recherche plein texte FTS5 classée par pertinence (bm25).
+    Sans mot-clé : lecture par l'index (city_key, type), dans l'ordre du catalogue.
+    """
+    pool = get_pool(ACTIVITIES_DB_PATH)
+    ensure_activities_schema(pool)
+    key = city_key(city)
+    limit = max(1, int(limit or DEFAULT_LIMIT))
+
+    terms = fts_query(keyword) if keyword else ""
+    if terms:
+        match = f'{{city_key}}: "{key.replace(chr(34), "")}" AND {{type}}: "{place_type}" AND {{name description}}: ({terms})'
+        query = f"""
+            SELECT a.name, a.price, a.description
+            FROM activities_fts JOIN activities a ON a.id = activities_fts.rowid
+            WHERE activities_fts MATCH ? AND a.city_key = ? AND a.type = ?
+            ORDER BY {ACTIVITIES_BM25}
+            LIMIT ?
+        """
+        return pool.fetchall(query, (match, key, place_type, limit))
+
+    query = """
+        SELECT name, price, description 
+        FROM activities 
+        WHERE city_key = ? AND type = ?
+        ORDER BY id
+        LIMIT ?
+    """
+    return pool.fetchall(query, (key, place_type, limit))
+
+
+@cached_tool(ttl=3600, depends_on=(ACTIVITIES_DB_PATH,))
+def search_activities(city: str, keyword: str = None, limit: int = DEFAULT_LIMIT) -> dict:
     """
     Récupère la liste des activités touristiques.
     Args:
         city: La ville où chercher des activités (ex: Paris, Tokyo, Madrid).
-        keyword: Optionnel. Mot-clé pour filtrer (ex: "musée", "parc"). None si non précisé.
+        keyword: Optionnel. Un ou plusieurs mots-clés pour filtrer (ex: "musée", "parc jardin"). None si non précisé.
+        limit: Optionnel. Nombre maximum de résultats, les plus pertinents d'abord (défaut 20).
     Returns:
-        Liste textuelle des activités trouvées.
+        Liste textuelle des activités trouvées ("result") et les mêmes activités structurées ("activities").
     """
-    print(f"🏛️ [ActivityAgent] Recherche d'activités à : {city} (keyword: {keyword})")
+    log.debug("recherche d'activités à %s (keyword : %s)", city, keyword)
     try:
-        conn = sqlite3.connect(ACTIVITIES_DB_PATH)
-        cursor = conn.cursor()
-
-        if keyword:
-            query = """
-                SELECT name, price, description 
-                FROM activities 
-                WHERE LOWER(city) = LOWER(?) 
-                  AND type = 'Activity'
-                  AND (LOWER(name) LIKE LOWER(?) OR LOWER(description) LIKE LOWER(?))
-            """
-            keyword_pattern = f"%{keyword}%"
-            cursor.execute(query, (city, keyword_pattern, keyword_pattern))
-        else:
-            query = """
-                SELECT name, price, description 
-                FROM activities 
-                WHERE LOWER(city) = LOWER(?) AND type = 'Activity'
-            """
-            cursor.execute(query, (city,))
-
-        results = cursor.fetchall()
-        conn.close()
+        results = _query_places('Activity', city, keyword, limit)
 
         if not results:
             keyword_msg = f" avec '{keyword}'" if keyword else ""
-            return f"Désolé, je n'ai trouvé aucune activité à {city}{keyword_msg}."
+            return tool_response(f"Désolé, je n'ai trouvé aucune activité à {city}{keyword_msg}.", "activities")
 
+        places = [PlaceRecord("Activité", *row) for row in results]
         response = ""
-        for row in results:
-            response += f"Activité, {row[0]}, {row[1]}€, {row[2]}\n"
+        for p in places:
+            response += p.line() + "\n"
 
-        return response
+        return tool_response(response, "activities", places)
 
     except Exception as e:
-        return f"Erreur SQL (Activités) : {e}"
+        log.exception("erreur SQL (activités)")
+        return tool_error(f"Erreur SQL (Activités) : {e}")
 
 
-def search_restaurants(city: str, keyword: str = None) -> str:
+@cached_tool(ttl=3600, depends_on=(ACTIVITIES_DB_PATH,))
+def search_restaurants(city: str, keyword: str = None, limit: int = DEFAULT_LIMIT) -> dict:
     """
     Récupère la liste des restaurants.
     Args:
         city: La ville où chercher des restaurants (ex: Paris, Tokyo, Madrid).
-        keyword: Optionnel. Mot-clé pour filtrer (ex: "vegan", "tapas", "italien"). None si non précisé.
+        keyword: Optionnel. Un ou plusieurs mots-clés pour filtrer (ex: "vegan", "tapas", "italien"). None si non précisé.
+        limit: Optionnel. Nombre maximum de résultats, les plus pertinents d'abord (défaut 20).
     Returns:
-        Liste textuelle des restaurants trouvés.
+        Liste textuelle des restaurants trouvés ("result") et les mêmes restaurants structurés ("activities").
     """
-    print(f"🍴 [ActivityAgent] Recherche de restaurants à : {city} (keyword: {keyword})")
+    log.debug("recherche de restaurants à %s (keyword : %s)", city, keyword)
     try:
-        conn = sqlite3.connect(ACTIVITIES_DB_PATH)
-        cursor = conn.cursor()
-
-        if keyword:
-            query = """
-                SELECT name, price, description 
-                FROM activities 
-                WHERE LOWER(city) = LOWER(?) 
-                  AND type = 'Restaurant'
-                  AND (LOWER(name) LIKE LOWER(?) OR LOWER(description) LIKE LOWER(?))
-            """
-            keyword_pattern = f"%{keyword}%"
-            cursor.execute(query, (city, keyword_pattern, keyword_pattern))
-        else:
-            query = """
-                SELECT name, price, description 
-                FROM activities 
-                WHERE LOWER(city) = LOWER(?) AND type = 'Restaurant'
-            """
-            cursor.execute(query, (city,))
-
-        results = cursor.fetchall()
-        conn.close()
+        results = _query_places('Restaurant', city, keyword, limit)
 
         if not results:
             keyword_msg = f" avec '{keyword}'" if keyword else ""
-            return f"Désolé, je n'ai trouvé aucun restaurant à {city}{keyword_msg}."
+            return tool_response(f"Désolé, je n'ai trouvé aucun restaurant à {city}{keyword_msg}.", "activities")
 
+        places = [PlaceRecord("Restaurant", *row) for row in results]
         response = ""
-        for row in results:
-            response += f"Restaurant, {row[0]}, {row[1]}€, {row[2]}\n"
+        for p in places:
+            response += p.line() + "\n"
 
-        return response
+        return tool_response(response, "activities", places)
 
     except Exception as e:
-        return f"Erreur SQL (Restaurants) : {e}"
+        log.exception("erreur SQL (restaurants)")
+        return tool_error(f"Erreur SQL (Restaurants) : {e}")
+
+
+# Variante async (pool de threads borné) utilisée par les agents : la boucle asyncio reste libre
+search_activities_async = async_tool(search_activities)
+search_restaurants_async = async_tool(search_restaurants)
 
 
 activity_agent = Agent(
@@ -128,5 +137,6 @@ activity_agent = Agent(
     - Ne reformule PAS les résultats.
     - N'ajoute PAS de commentaires ou phrases d'introduction.
     """,
-    tools=[search_activities, search_restaurants]
+    tools=[search_activities_async, search_restaurants_async],
+    after_tool_callback=keep_records
 )
\ No newline at end of file
@@ -1,50 +1,33 @@
 from google.adk.agents.llm_agent import Agent
+from google.adk.tools import ToolContext
 
 # Import tools
-from .flight_agent import search_flights
-from .hotel_agent import search_hotels
-from .activity_agent import search_activities, search_restaurants
+from .flight_agent import search_flights_async
+from .hotel_agent import search_hotels_async
+from .activity_agent import search_activities_async, search_restaurants_async
 
 # Import sub-agents for root_agent
 from .flight_agent import flight_agent
 from .hotel_agent import hotel_agent
 from .activity_agent import activity_agent
-import os
-import sqlite3
+
+from core.aio import async_tool
+from core.memory import get_memory_store, split_preferences
+from core.records import keep_records
 
 # ═══════════════════════════════════════════════════════
 # AGENT 1 : root_agent (recherche initiale)
 # Utilise les tools DIRECTEMENT pour appeler les 4 en parallèle
 # ═══════════════════════════════════════════════════════
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MEMORY_DB_PATH = os.path.join(BASE_DIR, '..', 'data', 'memory.db')
-
-def save_memory(preferences: str) -> str:
+def save_memory(preferences: str, tool_context: ToolContext = None) -> str:
     """
     Sauvegarde une ou plusieurs préférences (séparées par des virgules).
     Exemple d'entrée : "cuisine japonaise, budget serré, terrasse"
     """
-    saved_items = []
-    ignored_items = []
-
     try:
-        # 1. On nettoie et on découpe la chaîne (ex: "Japonais, Pas cher" -> ["Japonais", "Pas cher"])
-        # On enlève les espaces inutiles autour
-        items = [p.strip().lower() for p in preferences.split(',') if p.strip()]
-
-        conn = sqlite3.connect(MEMORY_DB_PATH)
-        cursor = conn.cursor()
-
-        for item in items:
-            cursor.execute("SELECT 1 FROM memory WHERE preferences = ?", (item,))
-            if not cursor.fetchone():
-                cursor.execute('INSERT INTO memory (preferences) VALUES (?)', (item,))
-                saved_items.append(item)
-            else:
-                ignored_items.append(item)
-
-        conn.commit()
-        conn.close()
+        # Une ligne par (utilisateur, préférence) : l'utilisateur est celui de la session ADK
+        user_id = tool_context.user_id if tool_context is not None else None
+        saved_items, ignored_items = get_memory_store().save(user_id, split_preferences(preferences))
 
         msg = ""
         if saved_items:
@@ -57,6 +40,9 @@ def save_memory(preferences: str) -> str:
     except Exception as e:
         return f"Erreur lors de la sauvegarde multiple : {e}"
 
+
+save_memory_async = async_tool(save_memory)
+
 root_agent = Agent(
     model='gemini-2.5-flash',
     name='Travel_Supervisor',
@@ -97,7 +83,8 @@ root_agent = Agent(
     - N'inclus QUE les sections pour lesquelles tu as appelé un outil
     - Ne pose AUCUNE question
     """,
-    tools=[search_flights, search_hotels, search_activities, search_restaurants],
+    tools=[search_flights_async, search_hotels_async, search_activities_async, search_restaurants_async],
+    after_tool_callback=keep_records,
     sub_agents=[flight_agent, hotel_agent, activity_agent]
 )
 
@@ -123,7 +110,8 @@ refine_flight_agent = Agent(
     
     Retourne le résultat de l'outil EXACTEMENT tel quel. Ne pose jamais de questions.
     """,
-    tools=[search_flights]
+    tools=[search_flights_async],
+    after_tool_callback=keep_records
 )
 
 refine_hotel_agent = Agent(
@@ -138,7 +126,8 @@ refine_hotel_agent = Agent(
     
     Retourne le résultat de l'outil EXACTEMENT tel quel. Ne pose jamais de questions.
     """,
-    tools=[search_hotels]
+    tools=[search_hotels_async],
+    after_tool_callback=keep_records
 )
 
 refine_activity_agent = Agent(
@@ -164,7 +153,8 @@ refine_activity_agent = Agent(
        Affiche UNIQUEMENT les résultats qui ont passé ton filtre intelligent.
        Garde la structure technique de base par ligne : `Type, Nom, Prix, Description`.
     """,
-    tools=[search_activities, search_restaurants]
+    tools=[search_activities_async, search_restaurants_async],
+    after_tool_callback=keep_records
 )
 
 refine_supervisor = Agent(
@@ -203,5 +193,5 @@ refine_supervisor = Agent(
     
     """,
     sub_agents=[refine_flight_agent, refine_hotel_agent, refine_activity_agent],
-    tools=[save_memory]
+    tools=[save_memory_async]
 )
\ No newline at end of file
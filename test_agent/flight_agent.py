@@ -1,13 +1,26 @@
 from google.adk.agents.llm_agent import Agent
-import sqlite3
-import os
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-FLIGHTS_DB_PATH = os.path.join(BASE_DIR, '..', 'data', 'flights.db')
+from core.aio import async_tool
+from core.cache import cached_tool
+from core.cities import airline_key, city_key, match_known_key
+from core.db import FLIGHTS_DB_PATH, get_pool
+from core.log import get_logger
+from core.records import FlightRecord, keep_records, tool_error, tool_response
+from core.schema import ensure_flights_schema, flight_key_sets
 
+log = get_logger("flight_agent")
 
+
+def _key_filter(column: str, keys: list) -> str:
+    # "=" pour le cas courant (une seule clé), sinon IN : les deux utilisent l'index
+    if len(keys) == 1:
+        return f" AND {column} = ?"
+    return f" AND {column} IN ({', '.join('?' * len(keys))})"
+
+
+@cached_tool(ttl=300, depends_on=(FLIGHTS_DB_PATH,))
 def search_flights(origin: str, destination: str = None, preferred_date: str = None,
-                   max_price: float = None, preferred_airline: str = None) -> str:
+                   max_price: float = None, preferred_airline: str = None) -> dict:
     """
     Recherche des vols dans la base de données.
     Args:
@@ -17,7 +30,7 @@ def search_flights(origin: str, destination: str = None, preferred_date: str = N
         max_price: Budget maximum en euros. Optionnel.
         preferred_airline: Compagnie aérienne préférée. Optionnel.
     Returns:
-        Liste textuelle des vols trouvés.
+        Liste textuelle des vols trouvés ("result") et les mêmes vols structurés ("flights").
     """
     # --- NETTOYAGE DES PARAMÈTRES ---
     if destination and destination.lower() in ["partout", "n'importe où", "anywhere", "none"]:
@@ -25,18 +38,28 @@ def search_flights(origin: str, destination: str = None, preferred_date: str = N
     if preferred_airline and preferred_airline.lower() in ["n'importe laquelle", "none"]:
         preferred_airline = None
 
-    print(f"✈️ [DEBUG] SQL -> Origin: {origin} | Dest: {destination} | Date: {preferred_date} | Budget: {max_price} | Cie: {preferred_airline}")
+    log.debug("vols : %s -> %s | date %s | budget %s | cie %s",
+              origin, destination, preferred_date, max_price, preferred_airline)
 
     try:
-        conn = sqlite3.connect(FLIGHTS_DB_PATH)
-        cursor = conn.cursor()
+        pool = get_pool(FLIGHTS_DB_PATH)
+        ensure_flights_schema(pool)
+        known_cities, known_airlines = flight_key_sets(pool)
 
-        query = "SELECT airline, flight_number, origin, destination, departure_time, arrival_time, price FROM flights WHERE origin LIKE ?"
-        params = [f"%{origin}%"]
+        # --- RÉSOLUTION DES CLÉS (alias "Lisbon"/"LIS" -> "lisbonne", saisie partielle) ---
+        origin_keys = match_known_key(city_key(origin), known_cities)
+        dest_keys = match_known_key(city_key(destination), known_cities) if destination else []
+        airline_keys = match_known_key(airline_key(preferred_airline), known_airlines) if preferred_airline else []
+        if not origin_keys or (destination and not dest_keys) or (preferred_airline and not airline_keys):
+            return tool_response("Désolé, aucun vol ne correspond. Modifiez vos filtres (budget, date ou destination).", "flights")
 
-        if destination:
-            query += " AND destination LIKE ?"
-            params.append(f"%{destination}%")
+        query = "SELECT airline, flight_number, origin, destination, departure_time, arrival_time, price FROM flights WHERE 1 = 1"
+        query += _key_filter("origin_key", origin_keys)
+        params = list(origin_keys)
+
+        if dest_keys:
+            query += _key_filter("destination_key", dest_keys)
+            params.extend(dest_keys)
 
         if preferred_date:
             query += " AND departure_time >= ?"
@@ -46,24 +69,28 @@ def search_flights(origin: str, destination: str = None, preferred_date: str = N
             query += " AND price <= ?"
             params.append(max_price)
 
-        if preferred_airline:
-            query += " AND airline LIKE ?"
-            params.append(f"%{preferred_airline}%")
+        if airline_keys:
+            query += _key_filter("airline_key", airline_keys)
+            params.extend(airline_keys)
 
         query += " ORDER BY price ASC"
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
+        results = pool.fetchall(query, params)
 
         if not results:
-            return "Désolé, aucun vol ne correspond. Modifiez vos filtres (budget, date ou destination)."
+            return tool_response("Désolé, aucun vol ne correspond. Modifiez vos filtres (budget, date ou destination).", "flights")
 
+        flights = [FlightRecord(*r) for r in results]
         resp = f"Voici les vols trouvés au départ de {origin} :\n"
-        for r in results:
-            resp += f"- {r[0]} ({r[1]}) : {r[2]} -> {r[3]} | départ {r[4]} arrivée {r[5]} pour {r[6]}€\n"
-        return resp
+        for f in flights:
+            resp += f.line() + "\n"
+        return tool_response(resp, "flights", flights)
     except Exception as e:
-        return f"Erreur technique : {e}"
+        log.exception("erreur SQL (vols)")
+        return tool_error(f"Erreur technique : {e}")
+
+
+# Variante async (pool de threads borné) utilisée par les agents : la boucle asyncio reste libre
+search_flights_async = async_tool(search_flights)
 
 
 flight_agent = Agent(
@@ -89,5 +116,6 @@ flight_agent = Agent(
     - Ne reformule PAS les résultats.
     - N'ajoute PAS de commentaires ou phrases d'introduction.
     """,
-    tools=[search_flights]
+    tools=[search_flights_async],
+    after_tool_callback=keep_records
 )
\ No newline at end of file
@@ -1,15 +1,24 @@
 from google.adk.agents.llm_agent import Agent
-import sqlite3
 import os
-import random
 from datetime import datetime, timedelta
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-HOTELS_DB_PATH = os.path.join(BASE_DIR, '..', 'data', 'hotels.db')
+from core.aio import async_tool
+from core.cache import cached_tool
+from core.cities import city_key, match_known_key
+from core.db import HOTELS_DB_PATH, get_pool
+from core.inventory import fallback_hotels
+from core.log import get_logger
+from core.records import HotelRecord, keep_records, tool_error, tool_response
+from core.schema import amenity_filter, date_to_day, ensure_hotels_schema, hotel_key_sets, price_to_cents
 
+_INT32_MAX = 2**31 - 1
 
+log = get_logger("hotel_agent")
+
+
+@cached_tool(ttl=120, depends_on=(HOTELS_DB_PATH,))
 def search_hotels(city: str, budget: float = 1000000, amenities: str = None,
-                  date_start: str = None, date_end: str = None) -> str:
+                  date_start: str = None, date_end: str = None) -> dict:
     """
     Recherche les hotels dans la base de données.
     Args:
@@ -19,13 +28,13 @@ def search_hotels(city: str, budget: float = 1000000, amenities: str = None,
         date_start: Optionnel. Date de début du séjour au format YYYY-MM-DD. None si non précisé.
         date_end: Optionnel. Date de fin du séjour au format YYYY-MM-DD. None si non précisé.
     Returns:
-        Une liste textuelle des hotels trouvés.
+        Une liste textuelle des hotels trouvés ("result") et les mêmes hotels structurés ("hotels").
     """
-    print(f"\n🏨 [DEBUG] Recherche : {city}, budget={budget}€, amenities={amenities}, dates={date_start} -> {date_end}")
+    log.debug("hôtels : %s, budget=%s€, amenities=%s, dates=%s -> %s", city, budget, amenities, date_start, date_end)
 
     try:
         if not os.path.exists(HOTELS_DB_PATH):
-            return f"ERREUR: Le fichier database est introuvable ici : {HOTELS_DB_PATH}"
+            return tool_error(f"ERREUR: Le fichier database est introuvable ici : {HOTELS_DB_PATH}")
 
         # --- Logique de dates par défaut ---
         # Si on a une date de début mais pas de fin, on suppose un séjour de 7 jours
@@ -34,92 +43,64 @@ def search_hotels(city: str, budget: float = 1000000, amenities: str = None,
                 start_dt = datetime.strptime(date_start, "%Y-%m-%d")
                 end_dt = start_dt + timedelta(days=7)
                 date_end = end_dt.strftime("%Y-%m-%d")
-                print(f"🏨 [DEBUG] Date fin calculée par défaut : {date_end}")
+                log.debug("date de fin calculée par défaut : %s", date_end)
             except ValueError:
                 pass # Si format date invalide, on laisse tomber
 
-        conn = sqlite3.connect(HOTELS_DB_PATH)
-        cursor = conn.cursor()
-
-        query = """
-                SELECT city, name, price, amenities, available_start, available_end 
-                FROM hotels WHERE city LIKE ? AND price <= ?
-                """
-        params = [f"%{city}%", budget]
-
-        if amenities is not None:
-            for amenity in amenities.split(","):
-                amenity = amenity.strip()
-                if amenity:
-                    if amenity == "Gym" or amenity == "gym":
-                        amenity = "salle de sport"
-                    query += " AND amenities LIKE ?"
-                    params.append(f"%{amenity}%")
-
-        if date_start and date_end:
-            query += " AND available_start <= ? AND available_end >= ?"
-            params.extend([date_start, date_end])
-
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-
-        # --- GÉNÉRATION DYNAMIQUE SI AUCUN RÉSULTAT ---
+        pool = get_pool(HOTELS_DB_PATH)
+        ensure_hotels_schema(pool)
+        known_cities, known_amenities = hotel_key_sets(pool)
+
+        # --- RECHERCHE DANS LE R*TREE : ville + budget + fenêtre de dates ---
+        city_ids = [known_cities[k] for k in match_known_key(city_key(city), known_cities.keys())]
+        amenity_sql = amenity_filter(known_amenities, amenities) if amenities is not None else ("", [])
+
+        results = []
+        if city_ids and amenity_sql is not None:
+            query = """
+                    SELECT h.city, h.name, h.price, h.amenities, h.available_start, h.available_end
+                    FROM hotels_rtree r JOIN hotels h ON h.id = r.id
+                    WHERE r.city_min >= ? AND r.city_max <= ? AND r.price_max <= ?
+                    """
+            params = [min(city_ids), max(city_ids), min(price_to_cents(budget), _INT32_MAX)]
+            if len(city_ids) > 1:
+                query += f" AND r.city_min IN ({', '.join('?' * len(city_ids))})"
+                params.extend(city_ids)
+
+            day_start, day_end = date_to_day(date_start), date_to_day(date_end)
+            if day_start is not None and day_end is not None:
+                query += " AND r.day_min <= ? AND r.day_max >= ?"
+                params.extend([day_start, day_end])
+
+            query += amenity_sql[0] + " ORDER BY h.price ASC"
+            params.extend(amenity_sql[1])
+            results = pool.fetchall(query, params)
+
+        # --- INVENTAIRE DE SECOURS SI AUCUN RÉSULTAT ---
+        # Généré en mémoire : la recherche reste une lecture (persistance optionnelle, par lots)
         if not results:
-            print(f"🏨 [INFO] Aucun hôtel trouvé pour le {date_start}. Génération d'un nouvel hôtel...")
-            
-            # Génération d'un hôtel compatible
-            new_hotel_name = f"{city} {random.choice(['Plaza', 'Royal', 'Grand', 'View', 'Palace'])} Hotel"
-            
-            # Prix cohérent avec le budget (ou par défaut)
-            max_price = budget if budget < 10000 else 300
-            new_price = random.randint(max(50, int(max_price/2)), int(max_price))
-            
-            # Services demandés + bonus
-            base_amenities = ["WiFi", "Climatisation"]
-            if amenities:
-                requested = [a.strip() for a in amenities.split(",") if a.strip()]
-                base_amenities.extend(requested)
-            # Dédoublonnage et string
-            new_amenities = ", ".join(list(set(base_amenities)))
-            
-            # Dates compatibles (englobent la demande)
-            if date_start:
-                # Dispo commence un peu avant et finit un peu après
-                req_start = datetime.strptime(date_start, "%Y-%m-%d")
-                new_start = req_start - timedelta(days=random.randint(1, 5))
-                new_end = req_start + timedelta(days=random.randint(7, 30))
-                
-                new_start_str = new_start.strftime("%Y-%m-%d")
-                new_end_str = new_end.strftime("%Y-%m-%d")
-            else:
-                # Dates par défaut si aucune date demandée (prochains mois)
-                new_start_str = "2026-04-01"
-                new_end_str = "2026-08-31"
-
-            # Insertion en base
-            cursor.execute('''
-                INSERT INTO hotels (city, name, price, amenities, available_start, available_end)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (city, new_hotel_name, new_price, new_amenities, new_start_str, new_end_str))
-            
-            conn.commit()
-            
-            # On récupère le résultat qu'on vient de créer pour l'afficher
-            results = [(city, new_hotel_name, new_price, new_amenities, new_start_str, new_end_str)]
-
-        conn.close()
-
-        print(f"Résultats finaux : {results}")
+            log.info("aucun hôtel trouvé à %s pour le %s, proposition d'un hôtel de secours", city, date_start)
+            results = fallback_hotels(city, budget, amenities, date_start)
+            if not results:
+                return tool_response(f"Désolé, aucun hôtel ne correspond à votre recherche à {city}.", "hotels")
+
+        log.debug("%d hôtel(s) trouvé(s)", len(results))
 
+        hotels = [HotelRecord(name=r[1], city=r[0], price=r[2], available_start=r[4], available_end=r[5],
+                              amenities=r[3]) for r in results]
         response = ""
-        for r in results:
-            response += f"- {r[1]} à {r[0]} pour {r[2]}€/nuit (Dispo: {r[4]} au {r[5]}, Services: {r[3]})\n"
+        for h in hotels:
+            response += h.line() + "\n"
 
-        return response
+        return tool_response(response, "hotels", hotels)
 
     except Exception as e:
-        print(f"Erreur SQL : {e}")
-        return f"Erreur technique lors de la recherche : {e}"
+        log.exception("erreur SQL (hôtels)")
+        return tool_error(f"Erreur technique lors de la recherche : {e}")
+
+
+# Variante async (pool de threads borné) utilisée par les agents : la boucle asyncio reste libre
+search_hotels_async = async_tool(search_hotels)
 
 
 hotel_agent = Agent(
@@ -145,5 +126,6 @@ hotel_agent = Agent(
     - Ne reformule PAS les résultats.
     - N'ajoute PAS de commentaires ou phrases d'introduction.
     """,
-    tools=[search_hotels]
+    tools=[search_hotels_async],
+    after_tool_callback=keep_records
 )
\ No newline at end of file
@@ -10,6 +10,8 @@ from .flight_agent import flight_agent
 from .hotel_agent import hotel_agent
 from .activity_agent import activity_agent
 
+from core.records import keep_records
+
 
 # ═══════════════════════════════════════════════════════
 # AGENT 1 : root_agent (recherche initiale)
@@ -62,6 +64,7 @@ root_agent = Agent(
     - Ne pose AUCUNE question
     """,
     tools=[search_flights, search_hotels, search_activities, search_restaurants],
+    after_tool_callback=keep_records,
     sub_agents=[flight_agent, hotel_agent, activity_agent]
 )
 
@@ -87,7 +90,8 @@ refine_flight_agent = Agent(
     
     Retourne le résultat de l'outil EXACTEMENT tel quel. Ne pose jamais de questions.
     """,
-    tools=[search_flights]
+    tools=[search_flights],
+    after_tool_callback=keep_records
 )
 
 refine_hotel_agent = Agent(
@@ -103,7 +107,8 @@ refine_hotel_agent = Agent(
     
     Retourne le résultat de l'outil EXACTEMENT tel quel. Ne pose jamais de questions.
     """,
-    tools=[search_hotels]
+    tools=[search_hotels],
+    after_tool_callback=keep_records
 )
 
 refine_activity_agent = Agent(
@@ -129,7 +134,8 @@ refine_activity_agent = Agent(
        Affiche UNIQUEMENT les résultats qui ont passé ton filtre intelligent.
        Garde la structure technique de base par ligne : `Type, Nom, Prix, Description`.
     """,
-    tools=[search_activities, search_restaurants]
+    tools=[search_activities, search_restaurants],
+    after_tool_callback=keep_records
 )
 
 refine_supervisor = Agent(
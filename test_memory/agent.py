@@ -1,58 +1,33 @@
 from google.adk.agents.llm_agent import Agent
 from google.adk.runners import Runner
-import sqlite3
-import os
+from google.adk.tools import ToolContext
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Dossier test_agent
-ACTIVTIES_DB_PATH = os.path.join(BASE_DIR, '..', 'data', 'activities.db')
-MEMORY_DB_PATH = os.path.join(BASE_DIR, '..', 'data', 'memory.db')
+from core.cities import city_key
+from core.db import ACTIVITIES_DB_PATH, get_pool
+from core.memory import get_memory_store, split_preferences
+from core.schema import ensure_activities_schema
 
-def load_memory() -> str:
+def load_memory(tool_context: ToolContext = None) -> str:
     """
     Récupère la mémoire de l'utilisateur.
     """
     try:
-        conn = sqlite3.connect(MEMORY_DB_PATH)
-        cursor = conn.cursor()
-       
-        query = """
-            SELECT preferences FROM memory
-        """
-        cursor.execute(query)
-        results = cursor.fetchall()
-        conn.close()
-        prefs = [row[0] for row in results]
-        return f"Préférences connues de l'utilisateur : {', '.join(prefs)}"
+        # Préférences de l'utilisateur de la session seulement (lecture en cache, voir core.memory)
+        user_id = tool_context.user_id if tool_context is not None else None
+        return get_memory_store().prompt(user_id)
            
     except Exception as e:
         return f"Erreur SQL (Mémoire) : {e}"
 
-def save_memory(preferences: str) -> str:
+def save_memory(preferences: str, tool_context: ToolContext = None) -> str:
     """
     Sauvegarde une ou plusieurs préférences (séparées par des virgules).
     Exemple d'entrée : "cuisine japonaise, budget serré, terrasse"
     """
-    saved_items = []
-    ignored_items = []
-
     try:
-        # 1. On nettoie et on découpe la chaîne (ex: "Japonais, Pas cher" -> ["Japonais", "Pas cher"])
-        # On enlève les espaces inutiles autour
-        items = [p.strip().lower() for p in preferences.split(',') if p.strip()]
-
-        conn = sqlite3.connect(MEMORY_DB_PATH)
-        cursor = conn.cursor()
-
-        for item in items:
-            cursor.execute("SELECT 1 FROM memory WHERE preferences = ?", (item,))
-            if not cursor.fetchone():
-                cursor.execute('INSERT INTO memory (preferences) VALUES (?)', (item,))
-                saved_items.append(item)
-            else:
-                ignored_items.append(item)
-
-        conn.commit()
-        conn.close()
+        # Une ligne par (utilisateur, préférence) : l'utilisateur est celui de la session ADK
+        user_id = tool_context.user_id if tool_context is not None else None
+        saved_items, ignored_items = get_memory_store().save(user_id, split_preferences(preferences))
 
         msg = ""
         if saved_items:
@@ -71,17 +46,14 @@ def search_activities(city: str) -> str:
     Récupère la liste des activités touristiques.
     """
     try:
-        conn = sqlite3.connect(ACTIVTIES_DB_PATH) 
-        cursor = conn.cursor()
-        
+        pool = get_pool(ACTIVITIES_DB_PATH)
+        ensure_activities_schema(pool)
         query = """
             SELECT name, price, description 
             FROM activities 
-            WHERE LOWER(city) = LOWER(?) AND type = 'Activity'
+            WHERE city_key = ? AND type = 'Activity'
         """
-        cursor.execute(query, (city,))
-        results = cursor.fetchall()
-        conn.close()
+        results = pool.fetchall(query, (city_key(city),))
 
         if not results:
             return f"Désolé, je n'ai trouvé aucune activité à {city}."
@@ -100,17 +72,14 @@ def search_restaurants(city: str) -> str:
     Récupère la liste des restaurants.
     """
     try:
-        conn = sqlite3.connect(ACTIVTIES_DB_PATH)
-        cursor = conn.cursor()
-        
+        pool = get_pool(ACTIVITIES_DB_PATH)
+        ensure_activities_schema(pool)
         query = """
             SELECT name, price, description 
             FROM activities 
-            WHERE LOWER(city) = LOWER(?) AND type = 'Restaurant'
+            WHERE city_key = ? AND type = 'Restaurant'
         """
-        cursor.execute(query, (city,))
-        results = cursor.fetchall()
-        conn.close()
+        results = pool.fetchall(query, (city_key(city),))
 
         if not results:
             return f"Désolé, je n'ai trouvé aucun restaurant à {city}."
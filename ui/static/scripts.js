@@ -43,7 +43,6 @@ document.addEventListener('DOMContentLoaded', () => {
             console.log("Lancement de la demande Streaming...");
 
             // 1. AFFICHER L'ANIMATION + CACHER LE CONTENU
-            const startTime = Date.now();
             const mainEl = document.querySelector('main');
             if (mainEl) mainEl.style.display = 'none';
             modal.style.display = 'none';
@@ -62,6 +61,43 @@ document.addEventListener('DOMContentLoaded', () => {
             }
             let progressCount = 0;
 
+            // Page de résultats (événement 'shell') et records reçus au fil de l'eau
+            let shellReady = null;   // promesse du HTML statique de la page (cache navigateur + ETag)
+            let shellContext = {};
+            let shellShown = false;
+            const results = { flight: [], hotel: [], activity: [] };
+
+            // Remplace la page par la page de résultats, une seule fois :
+            // ses fonctions updateFlights / updateHotels / updateActivities deviennent disponibles
+            const showResults = (shellHtml) => {
+                if (shellShown || !shellHtml) return;
+                shellShown = true;
+                // Contexte de la recherche lu par le script de la page (échappé pour rester dans le <script>)
+                const context = JSON.stringify(shellContext).replace(/</g, '\\u003c');
+                document.open();
+                document.write(shellHtml.replace('<head>', `<head><script>window.RESULTS_CONTEXT = ${context};</script>`));
+                document.close();
+            };
+
+            // Affiche la page dès qu'elle est chargée : au premier affichage tous les records
+            // déjà reçus y sont reportés, ensuite seulement l'onglet du type mis à jour
+            const refreshResults = (type) => {
+                if (!shellReady) return;
+                shellReady.then((shellHtml) => {
+                    const firstShow = !shellShown;
+                    showResults(shellHtml);
+                    if ((firstShow || type === 'flight') && window.updateFlights) window.updateFlights(results.flight);
+                    if ((firstShow || type === 'hotel') && window.updateHotels) window.updateHotels(results.hotel);
+                    if ((firstShow || type === 'activity') && window.updateActivities) window.updateActivities(results.activity);
+                });
+            };
+
+            // Ajoute les records reçus dans l'onglet correspondant
+            const patchResults = (type, items) => {
+                results[type].push(...items);
+                refreshResults(type);
+            };
+
             // 2. RÉCUPÉRATION DES PARAMÈTRES
             const formData = new FormData(travelForm);
             const params = new URLSearchParams();
@@ -94,26 +130,23 @@ document.addEventListener('DOMContentLoaded', () => {
                         }
                     }
 
-                    // --- B. ARRIVÉE / MODIFICATION DE PAGE ---
-                    else if (data.type === 'complete') {
-                        console.log("🛬 Terminé ! Affichage des résultats.");
-                        eventSource.close();
-
-                        // CALCUL DU DELAI RESTANT (Minimum 6 secondes d'animation)
-                        const elapsedTime = Date.now() - startTime;
-                        const remainingTime = Math.max(0, 6000 - elapsedTime);
-
-                        console.log(`Temps écoulé: ${elapsedTime}ms. Attente de: ${remainingTime}ms.`);
+                    // --- B. PAGE DE RÉSULTATS (vide, remplie au fil de l'eau) ---
+                    else if (data.type === 'shell') {
+                        shellContext = data.context || {};
+                        shellReady = fetch(data.url).then((resp) => resp.text());
+                    }
 
-                        setTimeout(() => {
-                            // Option 1 : Remplacer le contenu de la page (effet SPA)
-                            document.open();
-                            document.write(data.html);
-                            document.close();
+                    // --- C. RÉSULTATS : ajoutés au DOM dès la réponse de chaque outil ---
+                    else if (data.type === 'flight' || data.type === 'hotel' || data.type === 'activity') {
+                        patchResults(data.type, data.items);
+                    }
 
-                            // MAJ de l'URL pour faire "propre" (Optionnel)
-                            // window.history.pushState({}, "Résultats", "/search");
-                        }, remainingTime);
+                    // --- D. FIN DU STREAM ---
+                    else if (data.type === 'complete') {
+                        console.log("🛬 Terminé !", data.counts);
+                        eventSource.close();
+                        // Aucun résultat reçu : afficher quand même la page (onglets vides)
+                        refreshResults();
                     }
 
                 } catch (err) {